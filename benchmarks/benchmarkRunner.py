@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from common_utility import IReusableTimer
+from context_logger import setup_logging
+from package_downloader import ReleaseConfig
+
+from benchmarks.fakeGithub import FakeGithub, FakeGithubConfig, FakeRepositoryProvider, FakeAssetDownloader
+from package_collector import SourceRegistry, ReleaseMonitor, WebhookServer, WebhookServerConfig
+
+SCENARIOS = ['register', 'check_all', 'webhook']
+
+
+@dataclass
+class BenchmarkConfig:
+    sources: int
+    latency: float
+    error_rate: float
+    changed_fraction: float
+    monitor_workers: int
+    webhook_workers: int
+    log_level: str = 'WARNING'
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    sources: int
+    cycle_time: float
+    throughput: float
+    api_calls: int
+    errors: int
+    peak_rss_kb: int
+
+
+class IdleTimer(IReusableTimer):
+
+    def start(self, interval: float, callback: Callable[..., None], args: Any = None, kwargs: Any = None) -> None:
+        pass
+
+    def restart(self) -> None:
+        pass
+
+    def cancel(self) -> None:
+        pass
+
+
+def main() -> None:
+    arguments = _get_arguments()
+
+    setup_logging('debian-package-collector-benchmark', arguments.log_level, warn_on_overwrite=False)
+
+    results = []
+
+    for sources in arguments.sources:
+        config = BenchmarkConfig(sources, arguments.latency, arguments.error_rate, arguments.changed_fraction,
+                                 arguments.monitor_workers, arguments.webhook_workers, arguments.log_level)
+
+        for scenario in arguments.scenarios:
+            result = _run_isolated(scenario, config)
+            results.append(result)
+            _print_result(result)
+
+    if arguments.save_baseline:
+        _save_baseline(arguments.save_baseline, results)
+
+    if arguments.baseline:
+        regressions = _compare_with_baseline(arguments.baseline, results, arguments.tolerance)
+
+        if regressions:
+            for regression in regressions:
+                print(f'REGRESSION {regression}')
+            sys.exit(1)
+
+
+def run_scenario(scenario: str, config: BenchmarkConfig) -> BenchmarkResult:
+    setup_logging('debian-package-collector-benchmark', config.log_level, warn_on_overwrite=False)
+
+    if scenario == 'register':
+        return _benchmark_register(config)
+    elif scenario == 'check_all':
+        return _benchmark_check_all(config)
+    elif scenario == 'webhook':
+        return _benchmark_webhook(config)
+
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def _run_isolated(scenario: str, config: BenchmarkConfig) -> BenchmarkResult:
+    # Each scenario runs in a fresh process, so the peak RSS is not inherited from the previous one
+    context = multiprocessing.get_context('spawn')
+
+    with context.Pool(1) as pool:
+        result: BenchmarkResult = pool.apply(run_scenario, (scenario, config))
+        return result
+
+
+def _benchmark_register(config: BenchmarkConfig) -> BenchmarkResult:
+    github = FakeGithub(FakeGithubConfig(config.latency, config.error_rate))
+    source_registry = SourceRegistry(FakeRepositoryProvider(github))
+    release_configs = _create_release_configs(config.sources)
+
+    start_time = time.perf_counter()
+
+    for release_config in release_configs:
+        source_registry.register(release_config)
+
+    duration = time.perf_counter() - start_time
+
+    return _create_result('register', config, duration, github)
+
+
+def _benchmark_check_all(config: BenchmarkConfig) -> BenchmarkResult:
+    github = FakeGithub(FakeGithubConfig(config.latency, config.error_rate))
+    source_registry = SourceRegistry(FakeRepositoryProvider(github))
+    repo_names = []
+
+    for release_config in _create_release_configs(config.sources):
+        source_registry.register(release_config)
+        github.publish(release_config.full_name, '1.0.0')
+        repo_names.append(release_config.full_name)
+
+    release_monitor = ReleaseMonitor(source_registry, FakeAssetDownloader(), IdleTimer(), 3600,
+                                     config.monitor_workers)
+    release_monitor.start()
+
+    # The first cycle collects every release, the measured one only the changed fraction
+    release_monitor.check_all()
+    github.publish_fraction(repo_names, config.changed_fraction, '1.1.0')
+    api_calls = github.get_api_calls()
+    errors = github.get_errors()
+
+    start_time = time.perf_counter()
+    release_monitor.check_all()
+    duration = time.perf_counter() - start_time
+
+    release_monitor.stop()
+
+    return _create_result('check_all', config, duration, github, api_calls, errors)
+
+
+def _benchmark_webhook(config: BenchmarkConfig) -> BenchmarkResult:
+    github = FakeGithub(FakeGithubConfig(config.latency, config.error_rate))
+    source_registry = SourceRegistry(FakeRepositoryProvider(github))
+    asset_downloader = FakeAssetDownloader(config.latency)
+    payloads = []
+
+    for release_config in _create_release_configs(config.sources):
+        source_registry.register(release_config)
+        release = github.publish(release_config.full_name, '1.0.0')
+        payloads.append({'action': 'published', 'release': release,
+                         'repository': {'full_name': release_config.full_name}})
+
+    server_config = WebhookServerConfig(0, '', 1, 1, config.webhook_workers, queue_high_water=0)
+
+    with WebhookServer(source_registry, asset_downloader, server_config) as webhook_server:
+        webhook_server.start()
+        client = webhook_server._app.test_client()
+        headers = {'X-GitHub-Event': 'release', 'X-Hub-Signature-256': 'sha256=unsigned'}
+
+        start_time = time.perf_counter()
+
+        for payload in payloads:
+            client.post('/webhook', json=payload, headers=headers)
+
+        while (stats := webhook_server.get_queue_stats()).depth or stats.running:
+            time.sleep(0.001)
+
+        duration = time.perf_counter() - start_time
+
+    return _create_result('webhook', config, duration, github)
+
+
+def _create_release_configs(count: int) -> list[ReleaseConfig]:
+    return [ReleaseConfig(owner=f'owner{index % 100}', repo=f'repo{index}', token='token') for index in range(count)]
+
+
+def _create_result(scenario: str, config: BenchmarkConfig, duration: float, github: FakeGithub,
+                   api_calls_before: int = 0, errors_before: int = 0) -> BenchmarkResult:
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return BenchmarkResult(
+        scenario=scenario,
+        sources=config.sources,
+        cycle_time=round(duration, 4),
+        throughput=round(config.sources / duration, 1) if duration else 0.0,
+        api_calls=github.get_api_calls() - api_calls_before,
+        errors=github.get_errors() - errors_before,
+        peak_rss_kb=peak_rss_kb,
+    )
+
+
+def _print_result(result: BenchmarkResult) -> None:
+    print(f'{result.scenario:<10} sources={result.sources:<6} cycle_time={result.cycle_time:<9}s '
+          f'throughput={result.throughput:<10}/s api_calls={result.api_calls:<6} errors={result.errors:<5} '
+          f'peak_rss={result.peak_rss_kb}KB')
+
+
+def _save_baseline(path: Path, results: list[BenchmarkResult]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([asdict(result) for result in results], indent=2) + '\n')
+    print(f'Saved baseline to {path}')
+
+
+def _compare_with_baseline(path: Path, results: list[BenchmarkResult], tolerance: float) -> list[str]:
+    baseline = {(entry['scenario'], entry['sources']): entry for entry in json.loads(path.read_text())}
+    regressions = []
+
+    for result in results:
+        if not (expected := baseline.get((result.scenario, result.sources))):
+            continue
+
+        for key in ['cycle_time', 'api_calls', 'peak_rss_kb']:
+            if (regression := _check_regression(result, expected, key, tolerance)) is not None:
+                regressions.append(regression)
+
+    return regressions
+
+
+def _check_regression(result: BenchmarkResult, expected: dict[str, Any], key: str,
+                      tolerance: float) -> Optional[str]:
+    actual_value = getattr(result, key)
+    expected_value = expected[key]
+
+    if expected_value and actual_value > expected_value * (1 + tolerance):
+        return f'{result.scenario} sources={result.sources} {key}: {actual_value} > {expected_value}'
+
+    return None
+
+
+def _get_arguments() -> Any:
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--sources', help='number of release sources', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--scenarios', help='scenarios to run', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--latency', help='simulated API latency in seconds', type=float, default=0.0)
+    parser.add_argument('--error-rate', help='simulated API error rate', type=float, default=0.0)
+    parser.add_argument('--changed-fraction', help='fraction of sources with a new release', type=float,
+                        default=0.1)
+    parser.add_argument('--monitor-workers', help='number of concurrent release checks', type=int, default=4)
+    parser.add_argument('--webhook-workers', help='number of concurrent webhook downloads', type=int, default=3)
+    parser.add_argument('--baseline', help='baseline file to compare results with', type=Path)
+    parser.add_argument('--save-baseline', help='file to save results to as baseline', type=Path)
+    parser.add_argument('--tolerance', help='allowed relative regression', type=float, default=0.25)
+    parser.add_argument('-l', '--log-level', help='logging level', default='WARNING')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    main()
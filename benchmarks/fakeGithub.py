@@ -0,0 +1,327 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import json
+import random
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Optional
+
+from github import Github
+from github.GitRelease import GitRelease
+from github.Requester import Requester
+from package_downloader import IRepositoryProvider, IAssetDownloader, ReleaseConfig
+
+API_URL = 'https://api.github.com'
+
+
+@dataclass
+class FakeGithubConfig:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    assets_per_release: int = 2
+    seed: int = 42
+    api_url: str = API_URL
+    asset_size: int = 1024
+    rate_limit: int = 0
+
+
+class FakeGithub(object):
+
+    def __init__(self, config: FakeGithubConfig) -> None:
+        self._config = config
+        self._api_url = config.api_url.rstrip('/')
+        self._random = random.Random(config.seed)
+        self._lock = Lock()
+        self._repositories: dict[str, dict[str, Any]] = {}
+        # Releases of each repository from the oldest, the last one is the latest release
+        self._releases: dict[str, list[dict[str, Any]]] = {}
+        self._assets: dict[int, tuple[str, dict[str, Any]]] = {}
+        self._next_id = 0
+        self._api_calls = 0
+        self._errors = 0
+        self._rate_limit_used = 0
+        self._rate_limit_reset = 0
+
+    def load(self, fixture: dict[str, Any]) -> list[str]:
+        repo_names = []
+
+        for repository in fixture.get('repositories', []):
+            repo_name = f'{repository["owner"]}/{repository["repo"]}'
+            self.add_repository(repo_name, bool(repository.get('private', False)))
+
+            # Releases are listed from the oldest, so the last one becomes the latest release
+            for release in repository.get('releases', []):
+                self.publish(repo_name, release['tag_name'], release.get('assets'))
+
+            repo_names.append(repo_name)
+
+        return repo_names
+
+    def add_repository(self, repo_name: str, private: bool = False) -> dict[str, Any]:
+        owner, name = repo_name.split('/')
+
+        repository = {
+            'id': self._get_next_id(),
+            'name': name,
+            'full_name': repo_name,
+            'owner': {'login': owner},
+            'private': private,
+            'url': f'{self._api_url}/repos/{repo_name}',
+        }
+
+        with self._lock:
+            self._repositories[repo_name] = repository
+
+        return repository
+
+    def publish(self, repo_name: str, tag_name: str, asset_names: Optional[list[str]] = None) -> dict[str, Any]:
+        if asset_names is None:
+            name = repo_name.split('/')[-1]
+            asset_names = [f'{name}_{tag_name}_{index}.deb' for index in range(self._config.assets_per_release)]
+
+        assets = []
+
+        for asset_name in asset_names:
+            asset_id = self._get_next_id()
+            assets.append({
+                'id': asset_id,
+                'name': asset_name,
+                'size': self._config.asset_size,
+                'updated_at': '2024-01-01T00:00:00Z',
+                'url': f'{self._api_url}/repos/{repo_name}/releases/assets/{asset_id}',
+                'browser_download_url': f'{self._api_url}/{repo_name}/releases/download/{tag_name}/{asset_name}',
+            })
+
+        release_id = self._get_next_id()
+        release = {'id': release_id, 'tag_name': tag_name, 'draft': False, 'prerelease': False,
+                   'published_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                   'url': f'{self._api_url}/repos/{repo_name}/releases/{release_id}', 'assets': assets}
+
+        with self._lock:
+            self._releases.setdefault(repo_name, []).append(release)
+
+            for asset in assets:
+                self._assets[asset['id']] = (repo_name, asset)
+
+        return release
+
+    def get_repository_names(self) -> list[str]:
+        with self._lock:
+            return sorted(set(self._repositories) | set(self._releases))
+
+    def is_private(self, repo_name: str) -> bool:
+        with self._lock:
+            return bool(self._repositories.get(repo_name, {}).get('private', False))
+
+    def publish_fraction(self, repo_names: list[str], fraction: float, tag_name: str) -> list[str]:
+        with self._lock:
+            count = int(len(repo_names) * fraction)
+            changed = self._random.sample(repo_names, count)
+
+        for repo_name in changed:
+            self.publish(repo_name, tag_name)
+
+        return changed
+
+    def get_repository(self, repo_name: str) -> tuple[int, dict[str, Any], str]:
+        if (failure := self._handle_request()) is not None:
+            return failure
+
+        with self._lock:
+            repository = self._repositories.get(repo_name)
+
+        if not repository:
+            return self._respond(404, {}, json.dumps({'message': 'Not Found'}))
+
+        return self._respond(200, {}, json.dumps(repository))
+
+    def get_latest_release(self, repo_name: str, headers: dict[str, Any]) -> tuple[int, dict[str, Any], str]:
+        if (failure := self._handle_request()) is not None:
+            return failure
+
+        with self._lock:
+            release = self._releases.get(repo_name, [None])[-1]
+
+        if not release:
+            return self._respond(404, {}, json.dumps({'message': 'Not Found'}))
+
+        etag = f'"{repo_name}@{release["tag_name"]}"'
+
+        if headers.get('If-None-Match') == etag:
+            return self._respond(304, {'etag': etag}, '')
+
+        return self._respond(200, {'etag': etag}, json.dumps(release))
+
+    def get_releases(self, repo_name: str, page: int, per_page: int,
+                     headers: dict[str, Any]) -> tuple[int, dict[str, Any], str]:
+        if (failure := self._handle_request()) is not None:
+            return failure
+
+        with self._lock:
+            exists = repo_name in self._repositories or repo_name in self._releases
+            releases = self._releases.get(repo_name, [])[::-1]
+
+        if not exists:
+            return self._respond(404, {}, json.dumps({'message': 'Not Found'}))
+
+        # The listing changes with every published release, so its count identifies it
+        etag = f'"{repo_name}@{len(releases)}"'
+
+        if page == 1 and headers.get('If-None-Match') == etag:
+            return self._respond(304, {'etag': etag}, '')
+
+        start = (max(1, page) - 1) * per_page
+
+        return self._respond(200, {'etag': etag}, json.dumps(releases[start:start + per_page]))
+
+    def get_release_asset(self, repo_name: str, tag_name: str,
+                          asset_name: str) -> tuple[int, dict[str, Any], Optional[dict[str, Any]]]:
+        if (failure := self._handle_request()) is not None:
+            return failure[0], failure[1], None
+
+        with self._lock:
+            releases = self._releases.get(repo_name, [])
+
+        for release in releases:
+            if release['tag_name'] == tag_name:
+                for asset in release['assets']:
+                    if asset['name'] == asset_name:
+                        return self._respond(200, {}, asset)
+
+        return self._respond(404, {}, None)
+
+    def get_asset(self, repo_name: str, asset_id: int) -> tuple[int, dict[str, Any], Optional[dict[str, Any]]]:
+        if (failure := self._handle_request()) is not None:
+            return failure[0], failure[1], None
+
+        with self._lock:
+            owner, asset = self._assets.get(asset_id, ('', None))
+
+        if owner != repo_name or asset is None:
+            return self._respond(404, {}, None)
+
+        return self._respond(200, {}, asset)
+
+    def get_asset_content(self, asset: dict[str, Any]) -> bytes:
+        # Deterministic content, so repeated downloads of the same asset are identical
+        seed = asset['name'].encode()
+        return (seed * (asset['size'] // len(seed) + 1))[:asset['size']]
+
+    def get_rate_limit_headers(self) -> dict[str, Any]:
+        with self._lock:
+            return self._get_rate_limit_headers()
+
+    def get_api_calls(self) -> int:
+        with self._lock:
+            return self._api_calls
+
+    def get_errors(self) -> int:
+        with self._lock:
+            return self._errors
+
+    def _get_next_id(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _handle_request(self) -> Optional[tuple[int, dict[str, Any], str]]:
+        if self._config.latency:
+            time.sleep(self._config.latency)
+
+        with self._lock:
+            self._api_calls += 1
+            now = int(time.time())
+
+            if now >= self._rate_limit_reset:
+                self._rate_limit_used = 0
+                self._rate_limit_reset = now + 3600
+
+            if self._config.rate_limit and self._rate_limit_used >= self._config.rate_limit:
+                self._errors += 1
+                return 403, self._get_rate_limit_headers(), json.dumps({'message': 'API rate limit exceeded'})
+
+            self._rate_limit_used += 1
+
+            if self._random.random() < self._config.error_rate:
+                self._errors += 1
+                return 502, self._get_rate_limit_headers(), json.dumps({'message': 'Bad gateway'})
+
+        return None
+
+    def _respond(self, status: int, headers: dict[str, Any], body: Any) -> tuple[int, dict[str, Any], Any]:
+        return status, {**self.get_rate_limit_headers(), **headers}, body
+
+    def _get_rate_limit_headers(self) -> dict[str, Any]:
+        if not self._config.rate_limit:
+            return {}
+
+        return {
+            'x-ratelimit-limit': str(self._config.rate_limit),
+            'x-ratelimit-remaining': str(max(0, self._config.rate_limit - self._rate_limit_used)),
+            'x-ratelimit-used': str(self._rate_limit_used),
+            'x-ratelimit-reset': str(self._rate_limit_reset),
+        }
+
+
+def create_requester(github: FakeGithub) -> Requester:
+    # A real requester keeps GitRelease and error handling intact, only the HTTP round-trip is served locally
+    requester = Github(base_url=API_URL).requester
+
+    def request_json(verb: str, url: str, parameters: Optional[dict[str, Any]] = None,
+                     headers: Optional[dict[str, Any]] = None, **kwargs: Any) -> tuple[int, dict[str, Any], str]:
+        path = url.removeprefix(API_URL).removeprefix('/repos/')
+
+        if path.endswith('/releases/latest'):
+            return github.get_latest_release(path.removesuffix('/releases/latest'), headers or {})
+
+        if path.endswith('/releases'):
+            parameters = parameters or {}
+            return github.get_releases(path.removesuffix('/releases'), int(parameters.get('page', 1)),
+                                       int(parameters.get('per_page', 30)), headers or {})
+
+        return github.get_repository(path)
+
+    requester.requestJson = request_json  # type: ignore[method-assign]
+
+    return requester
+
+
+class FakeRepository(object):
+
+    def __init__(self, config: ReleaseConfig, requester: Requester) -> None:
+        self.url = f'{API_URL}/repos/{config.full_name}'
+        self.private = False
+        self.requester = requester
+
+
+class FakeRepositoryProvider(IRepositoryProvider):
+
+    def __init__(self, github: FakeGithub) -> None:
+        self._requester = create_requester(github)
+
+    def get_repository(self, config: ReleaseConfig) -> Any:
+        return FakeRepository(config, self._requester)
+
+
+class FakeAssetDownloader(IAssetDownloader):
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self._latency = latency
+        self._lock = Lock()
+        self._downloads = 0
+
+    def download(self, config: ReleaseConfig, release: Optional[GitRelease] = None) -> list[str]:
+        if self._latency:
+            time.sleep(self._latency)
+
+        with self._lock:
+            self._downloads += 1
+
+        return []
+
+    def get_downloads(self) -> int:
+        with self._lock:
+            return self._downloads
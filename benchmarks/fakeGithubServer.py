@@ -0,0 +1,240 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import hmac
+import json
+import random
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from pathlib import Path
+from signal import signal, SIGINT, SIGTERM
+from threading import Thread, Event
+from typing import Any, Optional
+
+import requests
+from context_logger import get_logger, setup_logging
+from flask import Flask, Response, request
+from waitress.server import create_server
+
+from benchmarks.fakeGithub import FakeGithub, FakeGithubConfig
+
+log = get_logger('FakeGithubServer')
+
+
+def load_fixture(path: Path) -> dict[str, Any]:
+    if path.suffix in ['.yaml', '.yml']:
+        # PyYAML is only needed for YAML fixtures
+        import yaml
+
+        fixture: dict[str, Any] = yaml.safe_load(path.read_text())
+        return fixture
+
+    fixture = json.loads(path.read_text())
+    return fixture
+
+
+def generate_fixture(count: int) -> dict[str, Any]:
+    return {'repositories': [{'owner': f'owner{index % 100}', 'repo': f'repo{index}',
+                              'releases': [{'tag_name': '1.0.0'}]} for index in range(count)]}
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return 'sha256=' + hmac.new(secret.encode(), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+class FakeGithubServer(object):
+
+    def __init__(self, github: FakeGithub, port: int, webhook_url: Optional[str] = None,
+                 webhook_secret: str = '') -> None:
+        self._github = github
+        self._port = port
+        self._webhook_url = webhook_url
+        self._webhook_secret = webhook_secret
+        self._app = Flask(__name__)
+        self._server = create_server(self._app, listen=f'*:{self._port}')
+        self._thread = Thread(target=self._server.run)
+
+        self._set_up_api_endpoints()
+        self._set_up_control_endpoints()
+
+    def __enter__(self) -> 'FakeGithubServer':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        log.info('Starting server', port=self._port)
+        self._thread.start()
+
+    def stop(self) -> None:
+        log.info('Shutting down')
+        self._server.close()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def publish(self, repo_name: str, tag_name: str, asset_names: Optional[list[str]] = None) -> dict[str, Any]:
+        release = self._github.publish(repo_name, tag_name, asset_names)
+        log.info('Published release', repo=repo_name, tag=tag_name)
+
+        if self._webhook_url:
+            self.send_release_webhook(repo_name, release)
+
+        return release
+
+    def send_release_webhook(self, repo_name: str, release: dict[str, Any], action: str = 'published') -> int:
+        if not self._webhook_url:
+            raise ValueError('Webhook URL is not configured')
+
+        payload = {
+            'action': action,
+            'release': release,
+            'repository': {'full_name': repo_name, 'private': self._github.is_private(repo_name)},
+        }
+        body = json.dumps(payload).encode()
+        headers = {
+            'Content-Type': 'application/json',
+            'X-GitHub-Event': 'release',
+            'X-Hub-Signature-256': sign_payload(self._webhook_secret, body),
+        }
+
+        try:
+            response = requests.post(self._webhook_url, data=body, headers=headers, timeout=10)
+            log.info('Sent release webhook', repo=repo_name, tag=release['tag_name'], status=response.status_code)
+            return response.status_code
+        except requests.RequestException as error:
+            log.warn('Failed to send release webhook', repo=repo_name, error=str(error))
+            return 0
+
+    def _set_up_api_endpoints(self) -> None:
+
+        @self._app.route('/repos/<owner>/<repo>', methods=['GET'])
+        def get_repository(owner: str, repo: str) -> Response:
+            return self._create_response(*self._github.get_repository(f'{owner}/{repo}'))
+
+        @self._app.route('/repos/<owner>/<repo>/releases/latest', methods=['GET'])
+        def get_latest_release(owner: str, repo: str) -> Response:
+            return self._create_response(*self._github.get_latest_release(f'{owner}/{repo}', dict(request.headers)))
+
+        @self._app.route('/repos/<owner>/<repo>/releases', methods=['GET'])
+        def get_releases(owner: str, repo: str) -> Response:
+            page = request.args.get('page', 1, type=int)
+            per_page = request.args.get('per_page', 30, type=int)
+            return self._create_response(*self._github.get_releases(f'{owner}/{repo}', page, per_page,
+                                                                    dict(request.headers)))
+
+        @self._app.route('/repos/<owner>/<repo>/releases/assets/<int:asset_id>', methods=['GET'])
+        def get_asset(owner: str, repo: str, asset_id: int) -> Response:
+            status, headers, asset = self._github.get_asset(f'{owner}/{repo}', asset_id)
+
+            if asset is None:
+                return self._create_response(status, headers, json.dumps({'message': 'Not Found'}))
+
+            if request.accept_mimetypes.best == 'application/octet-stream':
+                return self._create_content_response(status, headers, asset)
+
+            return self._create_response(status, headers, json.dumps(asset))
+
+        @self._app.route('/<owner>/<repo>/releases/download/<tag_name>/<asset_name>', methods=['GET'])
+        def download_asset(owner: str, repo: str, tag_name: str, asset_name: str) -> Response:
+            status, headers, asset = self._github.get_release_asset(f'{owner}/{repo}', tag_name, asset_name)
+
+            if asset is None:
+                return self._create_response(status, headers, json.dumps({'message': 'Not Found'}))
+
+            # Browser download URLs always serve the asset content
+            return self._create_content_response(status, headers, asset)
+
+        @self._app.route('/rate_limit', methods=['GET'])
+        def get_rate_limit() -> Response:
+            headers = self._github.get_rate_limit_headers()
+            core = {key.removeprefix('x-ratelimit-'): int(value) for key, value in headers.items()}
+            return self._create_response(200, headers, json.dumps({'resources': {'core': core}, 'rate': core}))
+
+    def _set_up_control_endpoints(self) -> None:
+
+        @self._app.route('/_fake/release-config.json', methods=['GET'])
+        def get_release_config() -> Response:
+            configs = [dict(zip(['owner', 'repo'], name.split('/'))) for name in self._github.get_repository_names()]
+            return self._create_response(200, {}, json.dumps(configs))
+
+        @self._app.route('/_fake/repos/<owner>/<repo>/releases', methods=['POST'])
+        def publish_release(owner: str, repo: str) -> Response:
+            data = request.get_json(force=True)
+            release = self.publish(f'{owner}/{repo}', data['tag_name'], data.get('assets'))
+            return self._create_response(201, {}, json.dumps(release))
+
+        @self._app.route('/_fake/stats', methods=['GET'])
+        def get_stats() -> Response:
+            stats = {'api_calls': self._github.get_api_calls(), 'errors': self._github.get_errors()}
+            return self._create_response(200, {}, json.dumps(stats))
+
+    def _create_response(self, status: int, headers: dict[str, Any], body: str) -> Response:
+        return Response(body, status=status, headers=headers, content_type='application/json')
+
+    def _create_content_response(self, status: int, headers: dict[str, Any], asset: dict[str, Any]) -> Response:
+        content = self._github.get_asset_content(asset)
+        response = Response(content, status=status, headers=headers, content_type='application/octet-stream')
+
+        # Range requests are answered with 206 and Content-Range, so interrupted downloads can be resumed
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(content))
+
+
+def main() -> None:
+    arguments = _get_arguments()
+
+    setup_logging('fake-github-server', arguments.log_level, warn_on_overwrite=False)
+
+    api_url = arguments.api_url or f'http://localhost:{arguments.port}'
+    config = FakeGithubConfig(arguments.latency, arguments.error_rate, api_url=api_url,
+                              asset_size=arguments.asset_size, rate_limit=arguments.rate_limit)
+    github = FakeGithub(config)
+    repo_names = github.load(load_fixture(arguments.fixture) if arguments.fixture
+                             else generate_fixture(arguments.repositories))
+
+    log.info('Loaded repositories', repositories=len(repo_names), api_url=api_url)
+
+    stop_event = Event()
+
+    def handler(signum: int, frame: Any) -> None:
+        stop_event.set()
+
+    signal(SIGINT, handler)
+    signal(SIGTERM, handler)
+
+    with FakeGithubServer(github, arguments.port, arguments.webhook_url, arguments.webhook_secret) as server:
+        server.start()
+
+        version = 1
+
+        # Without a publish interval the server only answers requests until it is stopped
+        while not stop_event.wait(arguments.publish_interval or None):
+            if repo_names:
+                version += 1
+                server.publish(random.choice(repo_names), f'1.{version}.0')
+
+
+def _get_arguments() -> Any:
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('fixture', help='JSON or YAML fixture of repositories and releases', type=Path, nargs='?')
+    parser.add_argument('--repositories', help='number of generated repositories without a fixture', type=int,
+                        default=100)
+    parser.add_argument('--port', help='server port to listen on', type=int, default=8000)
+    parser.add_argument('--api-url', help='base URL advertised in responses, defaults to localhost and the port')
+    parser.add_argument('--latency', help='simulated API latency in seconds', type=float, default=0.0)
+    parser.add_argument('--error-rate', help='simulated API error rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', help='API requests allowed per hour, 0 for unlimited', type=int, default=0)
+    parser.add_argument('--asset-size', help='size of generated assets in bytes', type=int, default=1024)
+    parser.add_argument('--webhook-url', help='webhook server URL to send release events to')
+    parser.add_argument('--webhook-secret', help='secret to sign release events with', default='')
+    parser.add_argument('--publish-interval', help='seconds between publishing random releases, 0 to disable',
+                        type=float, default=0.0)
+    parser.add_argument('-l', '--log-level', help='logging level', default='INFO')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,23 +8,52 @@ import os
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, BooleanOptionalAction
 from collections import OrderedDict
 from pathlib import Path
-from signal import signal, SIGINT, SIGTERM
-from typing import Any, Optional
+from signal import signal, SIGINT, SIGTERM, SIGHUP
+from typing import Any, Optional, TYPE_CHECKING
+from urllib.parse import urlparse
 
-from common_utility import SessionProvider, FileDownloader, ReusableTimer, ConfigLoader
+from common_utility import ReusableTimer, ConfigLoader
 from common_utility.jsonLoader import JsonLoader
 from context_logger import get_logger, setup_logging
-from package_downloader import RepositoryProvider, AssetDownloader
+from package_downloader import AssetDownloader
 
 from package_collector import (
     PackageCollector,
     SourceRegistry,
     ReleaseMonitor,
-    WebhookServer,
     PackageCollectorConfig,
-    WebhookServerConfig,
+    IReleasePoller,
+    GraphqlReleasePoller,
+    RequesterProvider,
+    ApiRepositoryProvider,
+    IRateLimiter,
+    IRequesterProvider,
+    DEFAULT_API_URL,
+    RateLimiter,
+    IPollScheduler,
+    PollScheduler,
+    ReleaseStateStore,
+    ParallelAssetDownloader,
+    ResumableFileDownloader,
+    IDownloadListener,
+    NotifyingAssetDownloader,
+    PackageIndex,
+    PostDownloadHook,
+    PostDownloadHookConfig,
+    PackageStore,
+    STORE_SUB_DIR,
+    IReleaseMonitor,
+    AsyncReleaseMonitor,
+    AiohttpClient,
+    MetricsRegistry,
+    ReleaseConfigLoader,
+    ReleaseHistoryConfig,
+    create_shard_ring,
 )
 
+if TYPE_CHECKING:
+    from package_collector import IWebhookServer, IMetricsServer
+
 APPLICATION_NAME = 'debian-package-collector'
 
 log = get_logger('PackageCollectorApp')
@@ -44,49 +73,153 @@ def main() -> None:
 
     initial_collect = bool(config.get('initial_collect', True))
     github_token = config.get('github_token')
+    github_api_url = config.get('github_api_url') or DEFAULT_API_URL
     download_dir = Path(config.get('download_dir', '/tmp/packages'))
     distro_sub_dirs = config.get('distro_sub_dirs')
     private_sub_dir = Path(config.get('private_sub_dir', 'private'))
+    state_file = Path(config.get('state_file') or download_dir / '.package-collector.db')
+    download_workers = int(config.get('download_workers', 4))
+    download_workers_per_release = int(config.get('download_workers_per_release', 2))
+    metrics_port = int(config.get('metrics_port', 0))
+    reload_interval = int(config.get('release_config_reload_interval', 0))
+    prefetch_workers = int(config.get('prefetch_workers', 0))
+    shard_index = int(config.get('shard_index', 0))
+    shard_count = int(config.get('shard_count', 1))
+    shard_peers = _get_list(config.get('shard_peers'))
+    shard_node = config.get('shard_node')
+    apt_index_enable = bool(config.get('apt_index_enable', False))
+    post_download_command = config.get('post_download_command')
+    post_download_batch_window = float(config.get('post_download_batch_window', 10))
+    post_download_retry = int(config.get('post_download_retry', 5))
+    post_download_delay = float(config.get('post_download_delay', 30))
+    history_sources = _get_list(config.get('history_sources'))
+    history_prereleases = bool(config.get('history_prereleases', False))
+    history_page_size = int(config.get('history_page_size', 10))
+    history_max_pages = int(config.get('history_max_pages', 10))
 
     monitor_enable = bool(config.get('monitor_enable', True))
     monitor_interval = int(config.get('monitor_interval', 600))
+    monitor_workers = int(config.get('monitor_workers', 1))
+    monitor_engine = config.get('monitor_engine', 'thread')
+    monitor_max_in_flight = int(config.get('monitor_max_in_flight', 100))
+    monitor_backend = config.get('monitor_backend', 'rest')
+    monitor_batch_size = int(config.get('monitor_batch_size', 50))
+    monitor_rate_limit_reserve = int(config.get('monitor_rate_limit_reserve', 100))
+    monitor_schedule = config.get('monitor_schedule', 'fixed')
+    monitor_min_interval = int(config.get('monitor_min_interval', 300))
+    monitor_max_interval = int(config.get('monitor_max_interval', 86400))
 
     webhook_enable = bool(config.get('webhook_enable', True))
     webhook_secret = config.get('webhook_secret', '')
     webhook_port = int(config.get('webhook_port', 8080))
     webhook_retry = int(config.get('webhook_retry', 10))
     webhook_delay = int(config.get('webhook_delay', 60))
+    webhook_workers = int(config.get('webhook_workers', 3))
+    webhook_max_delay = int(config.get('webhook_max_delay', 600))
+    webhook_queue_high_water = int(config.get('webhook_queue_high_water', 1000))
+    webhook_queue_low_water = int(config.get('webhook_queue_low_water', 800))
+    webhook_retry_after = int(config.get('webhook_retry_after', 60))
 
     release_config = config['release_config']
 
-    repository_provider = RepositoryProvider()
-    source_registry = SourceRegistry(repository_provider, github_token)
-
-    session_provider = SessionProvider()
-    file_downloader = FileDownloader(session_provider, download_dir)
-    asset_downloader = AssetDownloader(file_downloader, _get_distro_map(distro_sub_dirs), private_sub_dir)
+    metrics = MetricsRegistry()
+    shard_ring = create_shard_ring(shard_index, shard_count, shard_peers, shard_node)
+    rate_limiter = RateLimiter(monitor_rate_limit_reserve)
+    requester_provider = RequesterProvider(github_api_url)
+    repository_provider = ApiRepositoryProvider(requester_provider)
+    state_store = ReleaseStateStore(state_file)
+    history_config = _get_history_config(history_sources, history_prereleases, history_page_size, history_max_pages)
+    source_registry = SourceRegistry(
+        repository_provider, github_token, rate_limiter, state_store, metrics, history_config, requester_provider
+    )
 
-    reusable_timer = ReusableTimer()
-    release_monitor = ReleaseMonitor(source_registry, asset_downloader, reusable_timer, monitor_interval)
-    server_config = WebhookServerConfig(webhook_port, webhook_secret, webhook_retry, webhook_delay)
-    webhook_server = WebhookServer(source_registry, asset_downloader, server_config)
-    config_path = file_downloader.download(release_config, skip_if_exists=False)
-    collector_config = PackageCollectorConfig(config_path, initial_collect, monitor_enable, webhook_enable)
-    json_loader = JsonLoader()
+    package_store = PackageStore(download_dir / STORE_SUB_DIR)
+    package_store.prune()
+    file_downloader = ResumableFileDownloader(download_dir, package_store=package_store)
+    release_downloader = AssetDownloader(file_downloader, _get_distro_map(distro_sub_dirs), private_sub_dir)
+    parallel_downloader = ParallelAssetDownloader(
+        release_downloader, download_workers, download_workers_per_release, metrics, file_downloader
+    )
+    post_download_hook = _get_post_download_hook(
+        post_download_command, post_download_batch_window, post_download_retry, post_download_delay, metrics
+    )
+    download_listeners = _get_download_listeners(apt_index_enable, post_download_hook, metrics)
+    asset_downloader = NotifyingAssetDownloader(parallel_downloader, download_listeners)
+
+    release_poller = _get_release_poller(monitor_backend, monitor_batch_size, requester_provider, rate_limiter)
+    poll_scheduler = _get_poll_scheduler(monitor_schedule, monitor_interval, monitor_min_interval, monitor_max_interval)
+
+    release_monitor: IReleaseMonitor
+    if monitor_engine == 'asyncio':
+        _warn_ignored_async_settings(monitor_workers, monitor_backend, monitor_schedule)
+        release_monitor = AsyncReleaseMonitor(
+            source_registry, asset_downloader, requester_provider, AiohttpClient(monitor_max_in_flight),
+            monitor_interval, monitor_max_in_flight, github_api_url, rate_limiter, metrics
+        )
+    else:
+        reusable_timer = ReusableTimer()
+        release_monitor = ReleaseMonitor(
+            source_registry, asset_downloader, reusable_timer, monitor_interval, monitor_workers, release_poller,
+            rate_limiter, poll_scheduler, metrics
+        )
+
+    # The servers are imported only when enabled, so a monitor-only run does not load Flask and waitress
+    webhook_server: Optional['IWebhookServer'] = None
+    metrics_server: Optional['IMetricsServer'] = None
+
+    if webhook_enable:
+        from package_collector import WebhookServer, WebhookServerConfig
+
+        server_config = WebhookServerConfig(
+            webhook_port, webhook_secret, webhook_retry, webhook_delay, webhook_workers, webhook_max_delay,
+            webhook_queue_high_water, webhook_queue_low_water, webhook_retry_after
+        )
+        webhook_server = WebhookServer(source_registry, asset_downloader, server_config, metrics=metrics,
+                                       shard_ring=shard_ring)
+    elif metrics_port:
+        # Metrics are served by the webhook server, a separate server is only needed when it is disabled
+        from package_collector import MetricsServer
+
+        metrics_server = MetricsServer(metrics, metrics_port)
+
+    config_download_path = download_dir / Path(urlparse(release_config).path).name
+    config_loader = ReleaseConfigLoader(release_config, JsonLoader(), config_download_path)
+    collector_config = PackageCollectorConfig(
+        initial_collect, monitor_enable, webhook_enable, reload_interval, prefetch_workers
+    )
 
     package_collector = PackageCollector(
-        collector_config, json_loader, source_registry, release_monitor, webhook_server
+        collector_config, config_loader, source_registry, release_monitor, webhook_server, shard_ring
     )
 
     def handler(signum: int, frame: Any) -> None:
         log.info(f'Shutting down {APPLICATION_NAME}', signum=signum)
         package_collector.shutdown()
 
+    def reload_handler(signum: int, frame: Any) -> None:
+        package_collector.request_reload()
+
     signal(SIGINT, handler)
     signal(SIGTERM, handler)
+    signal(SIGHUP, reload_handler)
+
+    if metrics_server:
+        metrics_server.start()
+
+    if post_download_hook:
+        post_download_hook.start()
 
     package_collector.run()
 
+    if metrics_server:
+        metrics_server.stop()
+
+    parallel_downloader.shutdown()
+
+    if post_download_hook:
+        post_download_hook.shutdown()
+    state_store.close()
+
 
 def _get_arguments() -> dict[str, Any]:
     parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
@@ -102,18 +235,56 @@ def _get_arguments() -> dict[str, Any]:
 
     parser.add_argument('--initial-collect', help='enable initial collection', action=BooleanOptionalAction)
     parser.add_argument('--github-token', help='global token to use if not specified, supports env variables with $')
+    parser.add_argument('--github-api-url', help='GitHub API base URL, e.g. of GitHub Enterprise or a fake server')
     parser.add_argument('--download-dir', help='package download location')
     parser.add_argument('--distro-sub-dirs', help='distribution subdirectories')
     parser.add_argument('--private-sub-dir', help='subdirectory for private packages')
+    parser.add_argument('--state-file', help='release state database file path')
+    parser.add_argument('--download-workers', help='max concurrent asset downloads', type=int)
+    parser.add_argument('--download-workers-per-release', help='max concurrent asset downloads per release', type=int)
+    parser.add_argument('--release-config-reload-interval', help='release config reload interval in seconds, 0 to '
+                        'reload only on SIGHUP', type=int)
+    parser.add_argument('--prefetch-workers', help='concurrent repository lookups at startup, 0 to disable', type=int)
+    parser.add_argument('--shard-index', help='index of this instance when sharding by count', type=int)
+    parser.add_argument('--shard-count', help='number of instances sharing the release sources', type=int)
+    parser.add_argument('--shard-peers', help='comma separated webhook base URLs of all instances')
+    parser.add_argument('--shard-node', help='webhook base URL of this instance, one of the shard peers')
+    parser.add_argument('--apt-index-enable', help='maintain APT package indexes of the download directories',
+                        action=BooleanOptionalAction)
+    parser.add_argument('--post-download-command', help='command to run with the files of each download batch')
+    parser.add_argument('--post-download-batch-window', help='seconds to collect downloads into one hook run',
+                        type=float)
+    parser.add_argument('--post-download-retry', help='max attempts of a failed hook run', type=int)
+    parser.add_argument('--post-download-delay', help='initial delay between hook retries in seconds', type=float)
+    parser.add_argument('--history-sources', help='comma separated repository patterns to collect every release of')
+    parser.add_argument('--history-prereleases', help='collect pre-releases of the history sources',
+                        action=BooleanOptionalAction)
+    parser.add_argument('--history-page-size', help='releases per page when listing the release history', type=int)
+    parser.add_argument('--history-max-pages', help='max pages to list when looking for missed releases', type=int)
+    parser.add_argument('--metrics-port', help='metrics server port when the webhook server is disabled', type=int)
 
     parser.add_argument('--monitor-interval', help='release monitor interval in seconds')
+    parser.add_argument('--monitor-workers', help='number of concurrent release checks', type=int)
+    parser.add_argument('--monitor-engine', help='release monitor engine', choices=['thread', 'asyncio'])
+    parser.add_argument('--monitor-max-in-flight', help='max concurrent requests of the asyncio engine', type=int)
+    parser.add_argument('--monitor-backend', help='release polling backend', choices=['rest', 'graphql'])
+    parser.add_argument('--monitor-batch-size', help='repositories per GraphQL query', type=int)
+    parser.add_argument('--monitor-rate-limit-reserve', help='API quota kept in reserve when pacing', type=int)
+    parser.add_argument('--monitor-schedule', help='release polling schedule', choices=['fixed', 'adaptive'])
+    parser.add_argument('--monitor-min-interval', help='adaptive schedule minimum interval in seconds', type=int)
+    parser.add_argument('--monitor-max-interval', help='adaptive schedule maximum interval in seconds', type=int)
     parser.add_argument('--monitor-enable', help='enable periodic monitoring', action=BooleanOptionalAction)
 
     parser.add_argument('--webhook-enable', help='enable the webhook server', action=BooleanOptionalAction)
     parser.add_argument('--webhook-secret', help='secret to verify requests, supports env variables with $')
     parser.add_argument('--webhook-port', help='webhook server port to listen on')
     parser.add_argument('--webhook-retries', help='max retries to download assets', type=int)
-    parser.add_argument('--webhook-delay', help='delay between retries in seconds', type=int)
+    parser.add_argument('--webhook-delay', help='initial delay between retries in seconds', type=int)
+    parser.add_argument('--webhook-max-delay', help='max delay between retries in seconds', type=int)
+    parser.add_argument('--webhook-queue-high-water', help='queue depth to start rejecting events at', type=int)
+    parser.add_argument('--webhook-queue-low-water', help='queue depth to accept events again at', type=int)
+    parser.add_argument('--webhook-retry-after', help='Retry-After seconds of rejected events', type=int)
+    parser.add_argument('--webhook-workers', help='number of concurrent webhook downloads', type=int)
 
     parser.add_argument('release_config', help='release config JSON file path or URL')
 
@@ -130,15 +301,76 @@ def _update_logging(configuration: dict[str, Any]) -> None:
     setup_logging(APPLICATION_NAME, log_level, log_file, warn_on_overwrite=False)
 
 
+def _get_release_poller(backend: str, batch_size: int, requester_provider: IRequesterProvider,
+                        rate_limiter: IRateLimiter) -> Optional[IReleasePoller]:
+    if backend == 'graphql':
+        return GraphqlReleasePoller(requester_provider, batch_size, rate_limiter)
+
+    return None
+
+
+def _get_poll_scheduler(schedule: str, interval: int, min_interval: int,
+                        max_interval: int) -> Optional[IPollScheduler]:
+    if schedule == 'adaptive':
+        return PollScheduler(interval, min_interval, max_interval)
+
+    return None
+
+
+def _warn_ignored_async_settings(workers: int, backend: str, schedule: str) -> None:
+    # The asyncio engine polls the REST API of every source from one event loop on a fixed interval
+    ignored = {
+        'monitor_workers': workers if workers > 1 else None,
+        'monitor_backend': backend if backend != 'rest' else None,
+        'monitor_schedule': schedule if schedule != 'fixed' else None,
+    }
+
+    if settings := {name: value for name, value in ignored.items() if value is not None}:
+        log.warn('Settings not supported by the asyncio monitor engine are ignored', **settings)
+
+
+def _get_history_config(sources: list[str], prereleases: bool, page_size: int,
+                        max_pages: int) -> Optional[ReleaseHistoryConfig]:
+    if sources:
+        return ReleaseHistoryConfig(sources, prereleases, page_size, max_pages)
+
+    return None
+
+
+def _get_post_download_hook(command: Optional[str], batch_window: float, retry: int, delay: float,
+                            metrics: MetricsRegistry) -> Optional[PostDownloadHook]:
+    if command:
+        return PostDownloadHook(PostDownloadHookConfig(command, batch_window, retry, delay), metrics=metrics)
+
+    return None
+
+
+def _get_download_listeners(apt_index_enable: bool, post_download_hook: Optional[PostDownloadHook],
+                            metrics: MetricsRegistry) -> list[IDownloadListener]:
+    listeners: list[IDownloadListener] = []
+
+    if apt_index_enable:
+        listeners.append(PackageIndex(metrics))
+
+    if post_download_hook:
+        # The hook runs after the index update, so it already sees the new packages in the index
+        listeners.append(post_download_hook)
+
+    return listeners
+
+
 def _get_distro_map(distro_sub_dirs: Optional[str]) -> OrderedDict[str, str]:
     distro_map = OrderedDict()
 
-    if distro_sub_dirs:
-        for distro in distro_sub_dirs.split(','):
-            distro_map[distro.strip()] = distro.strip()
+    for distro in _get_list(distro_sub_dirs):
+        distro_map[distro] = distro
 
     return distro_map
 
 
+def _get_list(value: Optional[str]) -> list[str]:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
 if __name__ == '__main__':
     main()
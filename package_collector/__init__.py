@@ -1,5 +1,54 @@
+from importlib import import_module
+from typing import Any
+
+from .metricsRegistry import *
+from .rateLimiter import *
+from .retryBackoff import *
+from .shardRing import *
+from .releaseStateStore import *
+from .requesterProvider import *
 from .releaseSource import *
+from .repositoryProvider import *
+from .releasePoller import *
+from .pollScheduler import *
+from .packageStore import *
+from .resumableFileDownloader import *
+from .parallelAssetDownloader import *
+from .notifyingAssetDownloader import *
+from .packageIndex import *
+from .coalescingWorkQueue import *
+from .postDownloadHook import *
 from .sourceRegistry import *
+from .releaseDownloader import *
 from .releaseMonitor import *
-from .webhookServer import *
+from .asyncReleaseMonitor import *
+from .releaseConfigLoader import *
 from .packageCollector import *
+
+# The servers pull in Flask and waitress, so they are only imported on first use and not in monitor-only runs
+_LAZY_ATTRIBUTES = {
+    'METRICS_CONTENT_TYPE': 'metricsServer',
+    'add_metrics_endpoint': 'metricsServer',
+    'IMetricsServer': 'metricsServer',
+    'MetricsServer': 'metricsServer',
+    'FORWARDED_HEADER': 'webhookServer',
+    'FORWARDED_REQUEST_HEADERS': 'webhookServer',
+    'FORWARD_TIMEOUT': 'webhookServer',
+    'WebhookServerConfig': 'webhookServer',
+    'AssetsNotAvailableError': 'webhookServer',
+    'IWebhookServer': 'webhookServer',
+    'WebhookServer': 'webhookServer',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if module_name := _LAZY_ATTRIBUTES.get(name):
+        value = getattr(import_module(f'.{module_name}', __name__), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
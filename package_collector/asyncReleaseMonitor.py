@@ -0,0 +1,243 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import CancelledError
+from threading import Thread
+from typing import Any, Coroutine, Optional
+
+from context_logger import get_logger
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import (
+    IReleaseMonitor,
+    ISourceRegistry,
+    IReleaseSource,
+    IRequesterProvider,
+    IRateLimiter,
+    RateLimitStats,
+    download_releases,
+    DEFAULT_API_URL,
+    IMetricsRegistry,
+    MetricsRegistry,
+)
+
+log = get_logger('AsyncReleaseMonitor')
+
+
+class IAsyncHttpClient(object):
+
+    async def get(self, url: str, headers: dict[str, str]) -> tuple[int, dict[str, Any], str]:
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        raise NotImplementedError()
+
+
+class AiohttpClient(IAsyncHttpClient):
+
+    def __init__(self, max_connections: int = 100, timeout: float = 30) -> None:
+        self._max_connections = max_connections
+        self._timeout = timeout
+        self._session: Optional[Any] = None
+
+    async def get(self, url: str, headers: dict[str, str]) -> tuple[int, dict[str, Any], str]:
+        async with self._get_session().get(url, headers=headers) as response:
+            body = await response.text()
+            return response.status, {key.lower(): value for key, value in response.headers.items()}, body
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> Any:
+        if not self._session:
+            # Imported on first use, so the default thread based monitor does not load aiohttp
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=self._max_connections)
+            timeout = aiohttp.ClientTimeout(total=self._timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+        return self._session
+
+
+class AsyncReleaseMonitor(IReleaseMonitor):
+
+    def __init__(self, source_registry: ISourceRegistry, asset_downloader: IAssetDownloader,
+                 requester_provider: IRequesterProvider, http_client: IAsyncHttpClient,
+                 monitor_interval: int = 600, max_in_flight: int = 100, api_url: str = DEFAULT_API_URL,
+                 rate_limiter: Optional[IRateLimiter] = None, metrics: Optional[IMetricsRegistry] = None) -> None:
+        self._source_registry = source_registry
+        self._asset_downloader = asset_downloader
+        self._requester_provider = requester_provider
+        self._http_client = http_client
+        self._monitor_interval = monitor_interval
+        self._max_in_flight = max(1, max_in_flight)
+        self._api_url = api_url.rstrip('/')
+        self._rate_limiter = rate_limiter
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._cycle_lock: Optional[asyncio.Lock] = None
+        self._is_running = False
+        metrics = metrics or MetricsRegistry()
+        self._cycle_duration = metrics.histogram('package_collector_monitor_cycle_seconds', 'Monitor cycle duration')
+        self._cycle_overruns = metrics.counter('package_collector_monitor_overruns_total',
+                                               'Monitor cycles that took longer than the monitor interval')
+
+    def start(self) -> None:
+        log.info('Starting monitoring', max_in_flight=self._max_in_flight)
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._run_loop, args=(self._loop,), name='AsyncReleaseMonitor', daemon=True)
+        self._thread.start()
+        self._is_running = True
+        asyncio.run_coroutine_threadsafe(self._start_periodic(), self._loop).result()
+
+    def stop(self) -> None:
+        log.info('Stopping monitoring')
+        self._is_running = False
+
+        if self._loop and self._thread:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    def check_all(self) -> None:
+        if not self._loop or not self._is_running:
+            log.info('Checking interrupted')
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._check_all_tracked(), self._loop).result()
+        except CancelledError:
+            log.info('Checking interrupted')
+
+    def check(self, repo_name: str) -> None:
+        if source := self._source_registry.get(repo_name):
+            if source.check_latest_release():
+                download_releases(source, self._asset_downloader)
+        else:
+            log.warn('No source registered for repository', repo=repo_name)
+
+    def get_rate_limit_stats(self) -> dict[str, RateLimitStats]:
+        return self._rate_limiter.get_stats() if self._rate_limiter else {}
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _start_periodic(self) -> None:
+        self._cycle_lock = asyncio.Lock()
+        self._track(self._run_periodic())
+
+    def _track(self, coroutine: Coroutine[Any, Any, Any]) -> asyncio.Task[Any]:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._http_client.close()
+
+    async def _check_all_tracked(self) -> None:
+        if task := asyncio.current_task():
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        await self._check_all()
+
+    async def _run_periodic(self) -> None:
+        while self._is_running:
+            await asyncio.sleep(self._monitor_interval)
+            await self._check_all()
+
+    async def _check_all(self) -> None:
+        if not self._cycle_lock:
+            return
+
+        async with self._cycle_lock:
+            sources = self._source_registry.get_all()
+
+            log.info('Checking for new releases', sources=len(sources), max_in_flight=self._max_in_flight)
+
+            start_time = time.monotonic()
+            semaphore = asyncio.Semaphore(self._max_in_flight)
+
+            results = await asyncio.gather(*[self._check_source(source, semaphore) for source in sources])
+
+            duration = round(time.monotonic() - start_time, 3)
+            self._cycle_duration.observe(duration)
+
+            if duration > self._monitor_interval:
+                self._cycle_overruns.inc()
+
+            if all(results):
+                log.info('Checking completed', sources=len(sources), duration=duration)
+            else:
+                log.info('Checking interrupted', duration=duration)
+
+    async def _check_source(self, source: IReleaseSource, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            if not self._is_running:
+                return False
+
+            config = source.get_config()
+
+            if self._rate_limiter and (delay := self._rate_limiter.acquire(config.token)) > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                headers = self._get_auth_headers(config.token)
+
+                if config.private is None:
+                    await self._resolve_private(config, headers)
+
+                url = f'{self._api_url}/repos/{config.full_name}/releases/latest'
+                status, response_headers, body = await self._http_client.get(
+                    url, {**headers, **source.get_conditional_headers()}
+                )
+            except Exception as error:
+                log.error('Unexpected error fetching latest release', error=error, repo=config.full_name)
+                return True
+
+        requester = self._requester_provider.get_requester(config.token)
+
+        # Sources following the release history list the missed releases with blocking requests when it changed
+        if await asyncio.to_thread(source.check_release_response, requester, status, response_headers, body):
+            await asyncio.to_thread(download_releases, source, self._asset_downloader)
+
+        return True
+
+    async def _resolve_private(self, config: ReleaseConfig, headers: dict[str, str]) -> None:
+        status, response_headers, body = await self._http_client.get(f'{self._api_url}/repos/{config.full_name}',
+                                                                     headers)
+
+        if self._rate_limiter:
+            self._rate_limiter.update(config.token, response_headers)
+
+        if status == 200:
+            config.private = bool(json.loads(body).get('private'))
+
+    def _get_auth_headers(self, token: Optional[str]) -> dict[str, str]:
+        headers = {'Accept': 'application/vnd.github+json', 'User-Agent': 'debian-package-collector'}
+
+        if token and token.startswith('$'):
+            token = os.getenv(token[1:])
+
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        return headers
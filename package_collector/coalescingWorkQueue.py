@@ -0,0 +1,195 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import heapq
+import time
+from dataclasses import dataclass
+from threading import Condition, Thread
+from typing import Callable, Optional
+
+from context_logger import get_logger
+
+log = get_logger('CoalescingWorkQueue')
+
+
+@dataclass
+class WorkQueueStats:
+    depth: int
+    running: int
+    submitted: int
+    merged: int
+    delayed: int = 0
+    rejected: int = 0
+    saturated: bool = False
+
+
+class WorkQueueFullError(Exception):
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class IWorkQueue(object):
+
+    def start(self) -> None:
+        raise NotImplementedError()
+
+    def submit(self, key: str, job: Callable[[], None], delay: float = 0, replace: bool = True) -> bool:
+        raise NotImplementedError()
+
+    def get_stats(self) -> WorkQueueStats:
+        raise NotImplementedError()
+
+    def shutdown(self) -> None:
+        raise NotImplementedError()
+
+
+class CoalescingWorkQueue(IWorkQueue):
+
+    def __init__(self, workers: int = 3, name: str = 'WorkQueue', high_water: int = 0, low_water: int = 0) -> None:
+        self._workers = max(1, workers)
+        self._name = name
+        self._high_water = max(0, high_water)
+        self._low_water = min(low_water, self._high_water) if low_water > 0 else self._high_water
+        self._condition = Condition()
+        self._queue: list[tuple[float, int, str]] = []
+        self._pending: dict[str, tuple[Callable[[], None], float, int]] = {}
+        self._running: set[str] = set()
+        self._threads: list[Thread] = []
+        self._sequence = 0
+        self._submitted = 0
+        self._merged = 0
+        self._rejected = 0
+        self._is_saturated = False
+        self._is_running = False
+
+    def start(self) -> None:
+        with self._condition:
+            if self._is_running:
+                return
+
+            self._is_running = True
+            self._threads = [Thread(target=self._run_worker, name=f'{self._name}-{index}', daemon=True)
+                             for index in range(self._workers)]
+
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: str, job: Callable[[], None], delay: float = 0, replace: bool = True) -> bool:
+        with self._condition:
+            if not self._is_running:
+                log.warn('Work queue is not running, dropping job', key=key)
+                return False
+
+            self._submitted += 1
+
+            if key in self._pending:
+                self._merged += 1
+
+                if replace:
+                    # Only the latest job per key is kept, the superseded one never runs
+                    self._add_pending(key, job, delay)
+
+                log.debug('Merged pending job', key=key, replaced=replace, merged=self._merged,
+                          depth=len(self._pending))
+                return False
+
+            if not self._admit():
+                self._rejected += 1
+                raise WorkQueueFullError(f'Work queue is full with {len(self._pending)} pending jobs')
+
+            self._add_pending(key, job, delay)
+
+            return True
+
+    def get_stats(self) -> WorkQueueStats:
+        with self._condition:
+            now = time.monotonic()
+            delayed = sum(1 for _, due_time, _ in self._pending.values() if due_time > now)
+            return WorkQueueStats(len(self._pending), len(self._running), self._submitted, self._merged, delayed,
+                                  self._rejected, self._is_saturated)
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._is_running = False
+
+            if self._pending:
+                log.info('Dropping pending jobs', jobs=len(self._pending))
+
+            self._pending.clear()
+            self._queue.clear()
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+
+        self._threads = []
+
+    def _admit(self) -> bool:
+        if not self._high_water:
+            return True
+
+        depth = len(self._pending)
+
+        # Once saturated, new jobs are admitted again only after the queue drained to the low water mark
+        if not self._is_saturated and depth >= self._high_water:
+            log.warn('Work queue saturated, rejecting new jobs', depth=depth, high_water=self._high_water)
+            self._is_saturated = True
+        elif self._is_saturated and depth <= self._low_water:
+            log.info('Work queue drained, accepting new jobs', depth=depth, low_water=self._low_water)
+            self._is_saturated = False
+
+        return not self._is_saturated
+
+    def _add_pending(self, key: str, job: Callable[[], None], delay: float) -> None:
+        self._sequence += 1
+        self._pending[key] = (job, time.monotonic() + max(0.0, delay), self._sequence)
+
+        if key not in self._running:
+            self._schedule(key)
+
+    def _schedule(self, key: str) -> None:
+        _, due_time, sequence = self._pending[key]
+        heapq.heappush(self._queue, (due_time, sequence, key))
+        self._condition.notify()
+
+    def _run_worker(self) -> None:
+        while next_job := self._get_next_job():
+            key, job = next_job
+
+            try:
+                job()
+            except Exception as error:
+                log.error('Job failed', key=key, error=str(error))
+            finally:
+                with self._condition:
+                    self._running.discard(key)
+
+                    if key in self._pending:
+                        # Jobs submitted while the key was running are started only after it finished
+                        self._schedule(key)
+
+    def _get_next_job(self) -> Optional[tuple[str, Callable[[], None]]]:
+        with self._condition:
+            while self._is_running:
+                # Entries of replaced jobs are left in the heap and skipped when they reach the top
+                while self._queue and self._is_stale(self._queue[0]):
+                    heapq.heappop(self._queue)
+
+                timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+
+                if timeout is not None and timeout <= 0:
+                    _, _, key = heapq.heappop(self._queue)
+                    job, _, _ = self._pending.pop(key)
+                    self._running.add(key)
+                    return key, job
+
+                self._condition.wait(timeout)
+
+            return None
+
+    def _is_stale(self, entry: tuple[float, int, str]) -> bool:
+        _, sequence, key = entry
+        return key in self._running or key not in self._pending or self._pending[key][2] != sequence
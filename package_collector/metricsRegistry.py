@@ -0,0 +1,256 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import math
+from threading import Lock, Thread, current_thread, local
+from typing import Any, Callable, Generic, TypeVar
+
+from context_logger import get_logger
+
+log = get_logger('MetricsRegistry')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Labels = tuple[str, ...]
+V = TypeVar('V')
+
+
+class Metric(Generic[V]):
+
+    def __init__(self, name: str, description: str, metric_type: str, label_names: Labels) -> None:
+        self.name = name
+        self.description = description
+        self.metric_type = metric_type
+        self.label_names = label_names
+        self._local = local()
+        self._lock = Lock()
+        self._shards: list[tuple[Thread, dict[Labels, V]]] = []
+        self._retired: dict[Labels, V] = {}
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.metric_type}']
+
+        for labels, value in sorted(self._collect().items()):
+            lines.extend(self._render_value(labels, value))
+
+        return lines
+
+    def _get_shard(self) -> dict[Labels, V]:
+        # Every thread updates its own shard, so the hot path needs no locking
+        try:
+            shard: dict[Labels, V] = self._local.shard
+            return shard
+        except AttributeError:
+            shard = {}
+            self._local.shard = shard
+
+            with self._lock:
+                self._shards.append((current_thread(), shard))
+
+            return shard
+
+    def _collect(self) -> dict[Labels, V]:
+        with self._lock:
+            live_shards = []
+
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live_shards.append((thread, shard))
+                else:
+                    # Shards of finished threads are folded in once, so short-lived workers do not pile up
+                    self._merge(self._retired, shard)
+
+            self._shards = live_shards
+            result = self._copy(self._retired)
+
+            for _, shard in live_shards:
+                self._merge(result, shard)
+
+            return result
+
+    def _format_labels(self, labels: Labels, extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.label_names, labels)) + list(extra)
+
+        if not pairs:
+            return ''
+
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def _merge(self, target: dict[Labels, V], source: dict[Labels, V]) -> None:
+        raise NotImplementedError()
+
+    def _copy(self, values: dict[Labels, V]) -> dict[Labels, V]:
+        raise NotImplementedError()
+
+    def _render_value(self, labels: Labels, value: V) -> list[str]:
+        raise NotImplementedError()
+
+
+class Counter(Metric[float]):
+
+    def __init__(self, name: str, description: str, label_names: Labels = ()) -> None:
+        super().__init__(name, description, 'counter', label_names)
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        shard = self._get_shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        return self._collect().get(labels, 0)
+
+    def _merge(self, target: dict[Labels, float], source: dict[Labels, float]) -> None:
+        for labels, value in dict(source).items():
+            target[labels] = target.get(labels, 0) + value
+
+    def _copy(self, values: dict[Labels, float]) -> dict[Labels, float]:
+        return dict(values)
+
+    def _render_value(self, labels: Labels, value: float) -> list[str]:
+        return [f'{self.name}{self._format_labels(labels)} {_format_number(value)}']
+
+
+class Histogram(Metric[list[float]]):
+
+    def __init__(self, name: str, description: str, label_names: Labels = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, description, 'histogram', label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        shard = self._get_shard()
+
+        # Bucket counts followed by the sum and the count of observations
+        if (values := shard.get(labels)) is None:
+            values = shard[labels] = [0.0] * (len(self.buckets) + 2)
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                values[index] += 1
+                break
+
+        values[-2] += value
+        values[-1] += 1
+
+    def get_count(self, labels: Labels = ()) -> float:
+        return self._collect().get(labels, [0.0])[-1]
+
+    def _merge(self, target: dict[Labels, list[float]], source: dict[Labels, list[float]]) -> None:
+        for labels, values in dict(source).items():
+            if (merged := target.get(labels)) is None:
+                target[labels] = list(values)
+            else:
+                target[labels] = [total + value for total, value in zip(merged, values)]
+
+    def _copy(self, values: dict[Labels, list[float]]) -> dict[Labels, list[float]]:
+        return {labels: list(value) for labels, value in values.items()}
+
+    def _render_value(self, labels: Labels, value: list[float]) -> list[str]:
+        lines = []
+        cumulative = 0.0
+
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{self._format_labels(labels, (("le", _format_number(bound)),))} '
+                         f'{_format_number(cumulative)}')
+
+        lines.append(f'{self.name}_bucket{self._format_labels(labels, (("le", "+Inf"),))} {_format_number(value[-1])}')
+        lines.append(f'{self.name}_sum{self._format_labels(labels)} {_format_number(value[-2])}')
+        lines.append(f'{self.name}_count{self._format_labels(labels)} {_format_number(value[-1])}')
+
+        return lines
+
+
+class Gauge(Metric[float]):
+
+    def __init__(self, name: str, description: str, collect: Callable[[], dict[Labels, float]],
+                 label_names: Labels = ()) -> None:
+        super().__init__(name, description, 'gauge', label_names)
+        self._collect_values = collect
+
+    def _collect(self) -> dict[Labels, float]:
+        try:
+            return self._collect_values()
+        except Exception as error:
+            log.warn('Failed to collect gauge', metric=self.name, error=error)
+            return {}
+
+    def _render_value(self, labels: Labels, value: float) -> list[str]:
+        return [f'{self.name}{self._format_labels(labels)} {_format_number(value)}']
+
+
+M = TypeVar('M', bound=Metric[Any])
+
+
+class IMetricsRegistry(object):
+
+    def counter(self, name: str, description: str, label_names: Labels = ()) -> Counter:
+        raise NotImplementedError()
+
+    def histogram(self, name: str, description: str, label_names: Labels = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        raise NotImplementedError()
+
+    def gauge(self, name: str, description: str, collect: Callable[[], dict[Labels, float]],
+              label_names: Labels = ()) -> Gauge:
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        raise NotImplementedError()
+
+
+class MetricsRegistry(IMetricsRegistry):
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric[Any]] = {}
+        self._lock = Lock()
+
+    def counter(self, name: str, description: str, label_names: Labels = ()) -> Counter:
+        return self._register(Counter, name, lambda: Counter(name, description, label_names))
+
+    def histogram(self, name: str, description: str, label_names: Labels = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, lambda: Histogram(name, description, label_names, buckets))
+
+    def gauge(self, name: str, description: str, collect: Callable[[], dict[Labels, float]],
+              label_names: Labels = ()) -> Gauge:
+        # Gauges are read from their owner on collection, so the latest registration wins
+        gauge = Gauge(name, description, collect, label_names)
+
+        with self._lock:
+            self._metrics[name] = gauge
+
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric_class: type[M], name: str, create: Callable[[], M]) -> M:
+        # Components sharing a registry get the same metric for the same name
+        with self._lock:
+            if (metric := self._metrics.get(name)) is None:
+                metric = self._metrics[name] = create()
+
+            if not isinstance(metric, metric_class):
+                raise ValueError(f'Metric {name} is already registered as {metric.metric_type}')
+
+            return metric
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+
+    return repr(float(value))
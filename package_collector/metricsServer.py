@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+from threading import Thread
+from typing import Any
+
+from context_logger import get_logger
+from flask import Flask, Response
+from waitress.server import create_server
+
+from package_collector import IMetricsRegistry
+
+log = get_logger('MetricsServer')
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def add_metrics_endpoint(app: Flask, metrics: IMetricsRegistry) -> None:
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics() -> Response:
+        return Response(metrics.render(), status=200, content_type=METRICS_CONTENT_TYPE)
+
+
+class IMetricsServer(object):
+
+    def start(self) -> None:
+        raise NotImplementedError()
+
+    def stop(self) -> None:
+        raise NotImplementedError()
+
+    def is_running(self) -> bool:
+        raise NotImplementedError()
+
+
+class MetricsServer(IMetricsServer):
+
+    def __init__(self, metrics: IMetricsRegistry, port: int) -> None:
+        self._port = port
+        self._app = Flask(__name__)
+        self._server: Any = None
+        self._thread = Thread(target=self._start_server)
+        self._is_running = False
+
+        add_metrics_endpoint(self._app, metrics)
+
+    def __enter__(self) -> 'MetricsServer':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        log.info('Starting server', port=self._port)
+        # The port is bound only when the server is started, not when it is created
+        self._server = create_server(self._app, listen=f'*:{self._port}')
+        self._thread.start()
+
+    def stop(self) -> None:
+        log.info('Shutting down')
+
+        if self._server:
+            self._server.close()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+        self._is_running = False
+
+    def is_running(self) -> bool:
+        return self._is_running
+
+    def _start_server(self) -> None:
+        try:
+            self._is_running = True
+            self._server.run()
+        except Exception as error:
+            self._is_running = False
+            log.info('Shutdown', reason=error)
@@ -0,0 +1,49 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+from typing import Optional
+
+from context_logger import get_logger
+from github.GitRelease import GitRelease
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import AssetDownloadError
+
+log = get_logger('NotifyingAssetDownloader')
+
+
+class IDownloadListener(object):
+
+    def on_downloaded(self, config: ReleaseConfig, files: list[str]) -> None:
+        raise NotImplementedError()
+
+
+class NotifyingAssetDownloader(IAssetDownloader):
+
+    def __init__(self, asset_downloader: IAssetDownloader, listeners: list[IDownloadListener]) -> None:
+        self._asset_downloader = asset_downloader
+        self._listeners = listeners
+
+    def download(self, config: ReleaseConfig, release: Optional[GitRelease] = None) -> list[str]:
+        try:
+            files = self._asset_downloader.download(config, release)
+        except AssetDownloadError as error:
+            # The assets downloaded before the failure are complete, so the listeners are notified of them
+            self._notify(config, error.files)
+            raise
+
+        self._notify(config, files or [])
+
+        return files
+
+    def _notify(self, config: ReleaseConfig, files: list[str]) -> None:
+        if not files:
+            return
+
+        for listener in self._listeners:
+            try:
+                listener.on_downloaded(config, files)
+            except Exception as error:
+                log.error('Download listener failed', repo=config.full_name, listener=type(listener).__name__,
+                          error=str(error))
@@ -2,38 +2,51 @@
 # SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
 # SPDX-License-Identifier: MIT
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from threading import Event
-from pathlib import Path
-from typing import Any
+from typing import Any, Optional, TYPE_CHECKING
 
-from common_utility.jsonLoader import IJsonLoader
 from context_logger import get_logger
 from package_downloader import ReleaseConfig
 
-from package_collector import IReleaseMonitor, IWebhookServer, ISourceRegistry
+from package_collector import (
+    IReleaseMonitor,
+    ISourceRegistry,
+    IReleaseConfigLoader,
+    IShardRing,
+    IReleaseSource,
+)
+
+if TYPE_CHECKING:
+    from package_collector.webhookServer import IWebhookServer
 
 log = get_logger('PackageCollector')
 
 
 @dataclass
 class PackageCollectorConfig:
-    release_config_path: Path
     initial_collect: bool
     enable_monitor: bool
     enable_webhook: bool
+    reload_interval: int = 0
+    prefetch_workers: int = 0
 
 
 class PackageCollector(object):
 
-    def __init__(self, config: PackageCollectorConfig, json_loader: IJsonLoader, source_registry: ISourceRegistry,
-                 release_monitor: IReleaseMonitor, webhook_server: IWebhookServer) -> None:
+    def __init__(self, config: PackageCollectorConfig, config_loader: IReleaseConfigLoader,
+                 source_registry: ISourceRegistry, release_monitor: IReleaseMonitor,
+                 webhook_server: Optional['IWebhookServer'] = None, shard_ring: Optional[IShardRing] = None) -> None:
         self._config = config
-        self._json_loader = json_loader
+        self._config_loader = config_loader
         self._source_registry = source_registry
         self._release_monitor = release_monitor
         self._webhook_server = webhook_server
+        self._shard_ring = shard_ring
         self._shutdown_event = Event()
+        self._reload_event = Event()
 
     def __enter__(self) -> 'PackageCollector':
         return self
@@ -42,32 +55,97 @@ class PackageCollector(object):
         self.shutdown()
 
     def run(self) -> None:
-        config_list = self._json_loader.load_list(self._config.release_config_path, ReleaseConfig)
+        start_time = time.perf_counter()
+        config_list = self._get_owned(self._config_loader.load() or [])
 
         for config in config_list:
             self._source_registry.register(config)
 
+        registered_time = time.perf_counter()
+
         if self._config.enable_monitor:
             log.info('Starting release monitor')
             self._release_monitor.start()
 
-        if self._config.enable_webhook:
+        if self._config.enable_webhook and self._webhook_server:
             log.info('Starting webhook server')
             self._webhook_server.start()
 
+        self._prefetch_repositories()
+        prefetched_time = time.perf_counter()
+
         if self._config.initial_collect:
             log.info('Initial package collection')
             self._release_monitor.check_all()
 
-        self._shutdown_event.wait()
+        log.info('Startup completed', sources=len(config_list),
+                 registration=round(registered_time - start_time, 3),
+                 prefetch=round(prefetched_time - registered_time, 3),
+                 initial_collection=round(time.perf_counter() - prefetched_time, 3))
+
+        # Reloads run on this thread, either periodically or when requested, until shutdown
+        while not self._shutdown_event.is_set():
+            self._reload_event.wait(self._config.reload_interval or None)
+            self._reload_event.clear()
+
+            if not self._shutdown_event.is_set():
+                self._reload()
+
+    def request_reload(self) -> None:
+        log.info('Release config reload requested')
+        self._reload_event.set()
 
     def shutdown(self) -> None:
         if self._config.enable_monitor:
             log.info('Stopping release monitor')
             self._release_monitor.stop()
 
-        if self._config.enable_webhook:
+        if self._config.enable_webhook and self._webhook_server:
             log.info('Stopping webhook server')
             self._webhook_server.stop()
 
         self._shutdown_event.set()
+        self._reload_event.set()
+
+    def _reload(self) -> None:
+        try:
+            if (config_list := self._config_loader.load()) is None:
+                return
+
+            changes = self._source_registry.sync(self._get_owned(config_list))
+
+            if self._config.initial_collect:
+                for repo_name in changes.added + changes.updated:
+                    self._release_monitor.check(repo_name)
+        except Exception as error:
+            log.error('Failed to reload release config', error=str(error))
+
+    def _get_owned(self, config_list: list[ReleaseConfig]) -> list[ReleaseConfig]:
+        if not self._shard_ring:
+            return config_list
+
+        owned = [config for config in config_list if self._shard_ring.owns(config.full_name)]
+        log.info('Selected sources of this shard', owned=len(owned), sources=len(config_list))
+
+        return owned
+
+    def _prefetch_repositories(self) -> None:
+        if not self._config.prefetch_workers or not (sources := self._source_registry.get_all()):
+            return
+
+        log.info('Prefetching repositories', repositories=len(sources), workers=self._config.prefetch_workers)
+
+        # Repositories are resolved up front and concurrently, so the first checks only look up releases
+        with ThreadPoolExecutor(self._config.prefetch_workers, thread_name_prefix='RepositoryPrefetch') as executor:
+            results = list(executor.map(self._prefetch_repository, sources))
+
+        log.info('Prefetched repositories', repositories=len(sources), failed=results.count(False))
+
+    def _prefetch_repository(self, source: IReleaseSource) -> bool:
+        try:
+            source.prefetch_repository()
+            return True
+        except Exception as error:
+            # The repository is resolved again on the first check of the source
+            log.warn('Failed to prefetch repository', repo=source.get_config().full_name, error=str(error))
+            return False
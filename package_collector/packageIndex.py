@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import gzip
+import hashlib
+import io
+import os
+import re
+import subprocess
+import tarfile
+import time
+from email.utils import formatdate
+from itertools import zip_longest
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from context_logger import get_logger
+from package_downloader import ReleaseConfig
+
+from package_collector import IDownloadListener, IMetricsRegistry, MetricsRegistry
+
+log = get_logger('PackageIndex')
+
+PACKAGES_FILE = 'Packages'
+PACKAGES_GZ_FILE = 'Packages.gz'
+RELEASE_FILE = 'Release'
+AR_MAGIC = b'!<arch>\n'
+AR_HEADER_SIZE = 60
+VERSION_PART_PATTERN = re.compile(r'(\D*)(\d*)')
+
+
+class PackageIndex(IDownloadListener):
+
+    def __init__(self, metrics: Optional[IMetricsRegistry] = None) -> None:
+        self._entries: dict[Path, dict[str, dict[str, str]]] = {}
+        self._lock = Lock()
+        metrics = metrics or MetricsRegistry()
+        self._update_duration = metrics.histogram('package_collector_index_update_seconds',
+                                                  'Package index update duration')
+        self._update_failures = metrics.counter('package_collector_index_update_failures_total',
+                                                'Failed package index updates')
+
+    def on_downloaded(self, config: ReleaseConfig, files: list[str]) -> None:
+        directories: dict[Path, list[Path]] = {}
+
+        for file in files:
+            if (path := Path(file)).suffix == '.deb':
+                directories.setdefault(path.parent, []).append(path)
+
+        with self._lock:
+            for directory, packages in directories.items():
+                self._update(directory, packages)
+
+    def _update(self, directory: Path, packages: list[Path]) -> None:
+        start_time = time.perf_counter()
+
+        try:
+            entries = self._get_entries(directory)
+
+            for package in packages:
+                self._add_entry(entries, package)
+
+            self._write_index(directory, entries)
+        except Exception as error:
+            log.error('Failed to update package index', directory=str(directory), error=str(error))
+            self._update_failures.inc()
+            # The cached entries may not match the files any more, they are loaded again on the next update
+            self._entries.pop(directory, None)
+            return
+        finally:
+            self._update_duration.observe(time.perf_counter() - start_time)
+
+        log.info('Updated package index', directory=str(directory), packages=len(entries),
+                 added=[package.name for package in packages])
+
+    def _get_entries(self, directory: Path) -> dict[str, dict[str, str]]:
+        if directory not in self._entries:
+            if (directory / PACKAGES_FILE).exists():
+                # The index written before is the state, so the packages already in the pool are not parsed again
+                self._entries[directory] = _parse_packages((directory / PACKAGES_FILE).read_text())
+            else:
+                self._entries[directory] = self._scan_directory(directory)
+
+        return self._entries[directory]
+
+    def _scan_directory(self, directory: Path) -> dict[str, dict[str, str]]:
+        log.info('Building package index of directory', directory=str(directory))
+        entries: dict[str, dict[str, str]] = {}
+
+        # Older files are added first, so of packages with the same version the most recent file is indexed
+        for package in sorted(directory.glob('*.deb'), key=lambda path: path.stat().st_mtime):
+            try:
+                self._add_entry(entries, package)
+            except Exception as error:
+                log.warn('Skipping invalid package', package=str(package), error=str(error))
+
+        return entries
+
+    def _add_entry(self, entries: dict[str, dict[str, str]], package: Path) -> None:
+        entry = _create_entry(package)
+        key = (entry.get('Package'), entry.get('Architecture'))
+        others = [file_name for file_name, other in entries.items()
+                  if file_name != package.name and (other.get('Package'), other.get('Architecture')) == key]
+
+        # Older releases may be downloaded after newer ones, so the version decides which package is indexed
+        for file_name in others:
+            if compare_versions(entries[file_name].get('Version', ''), entry.get('Version', '')) > 0:
+                log.info('Newer package version already indexed', package=key[0], indexed=file_name,
+                         skipped=package.name)
+                return
+
+        for file_name in others:
+            log.info('Package superseded', package=key[0], old=file_name, new=package.name)
+            del entries[file_name]
+
+        entries[package.name] = entry
+
+    def _write_index(self, directory: Path, entries: dict[str, dict[str, str]]) -> None:
+        packages = '\n'.join(_format_entry(entry) for entry in entries.values()).encode()
+        packages_gz = gzip.compress(packages, mtime=0)
+
+        _write_file(directory / PACKAGES_FILE, packages)
+        _write_file(directory / PACKAGES_GZ_FILE, packages_gz)
+        # The release file is written last, so it never lists checksums of index files not yet replaced
+        _write_file(directory / RELEASE_FILE, _create_release({PACKAGES_FILE: packages, PACKAGES_GZ_FILE: packages_gz}))
+
+
+def compare_versions(version1: str, version2: str) -> int:
+    # Debian version ordering as implemented by dpkg, the epoch, upstream version and revision are compared in turn
+    epoch1, upstream1, revision1 = _split_version(version1)
+    epoch2, upstream2, revision2 = _split_version(version2)
+
+    return _compare_numbers(epoch1, epoch2) or _compare_version_parts(upstream1, upstream2) or \
+        _compare_version_parts(revision1, revision2)
+
+
+def _split_version(version: str) -> tuple[int, str, str]:
+    epoch, _, rest = version.strip().partition(':') if ':' in version else ('0', '', version.strip())
+    upstream, _, revision = rest.rpartition('-') if '-' in rest else (rest, '', '')
+
+    return int(epoch or 0), upstream, revision
+
+
+def _compare_version_parts(version1: str, version2: str) -> int:
+    # Versions are compared as alternating runs of non-digits and digits
+    for (letters1, digits1), (letters2, digits2) in zip_longest(VERSION_PART_PATTERN.findall(version1),
+                                                                VERSION_PART_PATTERN.findall(version2),
+                                                                fillvalue=('', '')):
+        if result := _compare_letters(letters1, letters2) or _compare_numbers(int(digits1 or 0), int(digits2 or 0)):
+            return result
+
+    return 0
+
+
+def _compare_letters(letters1: str, letters2: str) -> int:
+    for char1, char2 in zip_longest(letters1, letters2, fillvalue=''):
+        if result := _compare_numbers(_get_char_order(char1), _get_char_order(char2)):
+            return result
+
+    return 0
+
+
+def _get_char_order(char: str) -> int:
+    # A tilde sorts before anything, even the end of the part, letters sort before other characters
+    if char == '~':
+        return -1
+
+    if not char:
+        return 0
+
+    return ord(char) if char.isalpha() else ord(char) + 256
+
+
+def _compare_numbers(number1: int, number2: int) -> int:
+    return (number1 > number2) - (number1 < number2)
+
+
+def _create_entry(package: Path) -> dict[str, str]:
+    entry = _parse_packages(_read_control(package)).popitem()[1]
+    md5, sha1, sha256 = hashlib.md5(), hashlib.sha1(), hashlib.sha256()
+
+    with open(package, 'rb') as file:
+        while chunk := file.read(1024 * 1024):
+            for hasher in [md5, sha1, sha256]:
+                hasher.update(chunk)
+
+    entry.update({'Filename': f'./{package.name}', 'Size': str(package.stat().st_size), 'MD5sum': md5.hexdigest(),
+                  'SHA1': sha1.hexdigest(), 'SHA256': sha256.hexdigest()})
+
+    return entry
+
+
+def _read_control(package: Path) -> str:
+    with open(package, 'rb') as file:
+        if file.read(len(AR_MAGIC)) != AR_MAGIC:
+            raise ValueError(f'Not a Debian package: {package.name}')
+
+        while len(header := file.read(AR_HEADER_SIZE)) == AR_HEADER_SIZE:
+            name = header[:16].decode().strip().rstrip('/')
+            size = int(header[48:58])
+
+            if name.startswith('control.tar'):
+                if name.endswith('.zst'):
+                    # The tarfile module has no Zstandard support before Python 3.14
+                    return subprocess.run(['dpkg-deb', '--info', str(package), 'control'], check=True,
+                                          capture_output=True, text=True).stdout
+
+                with tarfile.open(fileobj=io.BytesIO(file.read(size))) as archive:
+                    for member in archive.getmembers():
+                        if member.name in ['control', './control'] and (control := archive.extractfile(member)):
+                            return control.read().decode()
+
+                break
+
+            # Archive members are padded to an even size
+            file.seek(size + size % 2, os.SEEK_CUR)
+
+    raise ValueError(f'No control file in package: {package.name}')
+
+
+def _parse_packages(content: str) -> dict[str, dict[str, str]]:
+    entries: dict[str, dict[str, str]] = {}
+
+    for paragraph in content.split('\n\n'):
+        entry: dict[str, str] = {}
+        field = None
+
+        for line in paragraph.splitlines():
+            if line.startswith((' ', '\t')) and field:
+                # Continuation lines of multi-line fields like Description are kept as they are
+                entry[field] += f'\n{line}'
+            elif ':' in line:
+                field, value = line.split(':', 1)
+                entry[field] = value.strip()
+
+        if entry:
+            entries[entry.get('Filename', '').removeprefix('./') or entry.get('Package', '')] = entry
+
+    return entries
+
+
+def _format_entry(entry: dict[str, str]) -> str:
+    return ''.join(f'{field}: {value}\n' for field, value in entry.items())
+
+
+def _create_release(files: dict[str, bytes]) -> bytes:
+    lines = [f'Date: {formatdate(usegmt=True)}']
+
+    for field, algorithm in [('MD5Sum', 'md5'), ('SHA1', 'sha1'), ('SHA256', 'sha256')]:
+        lines.append(f'{field}:')
+        lines.extend(f' {hashlib.new(algorithm, content).hexdigest()} {len(content)} {name}'
+                     for name, content in files.items())
+
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def _write_file(path: Path, content: bytes) -> None:
+    temp_path = path.with_name(f'.{path.name}.tmp')
+    temp_path.write_bytes(content)
+    os.replace(temp_path, path)
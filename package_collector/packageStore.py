@@ -0,0 +1,85 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from context_logger import get_logger
+
+log = get_logger('PackageStore')
+
+STORE_SUB_DIR = '.store'
+
+
+class IPackageStore(object):
+
+    def get(self, digest: str) -> Optional[Path]:
+        raise NotImplementedError()
+
+    def add(self, path: Path, digest: str) -> Path:
+        raise NotImplementedError()
+
+    def link(self, blob_path: Path, target: Path) -> None:
+        raise NotImplementedError()
+
+    def prune(self) -> int:
+        raise NotImplementedError()
+
+
+class PackageStore(IPackageStore):
+
+    def __init__(self, store_dir: Path) -> None:
+        self._store_dir = store_dir
+
+    def get(self, digest: str) -> Optional[Path]:
+        blob_path = self._get_blob_path(digest)
+        return blob_path if blob_path.exists() else None
+
+    def add(self, path: Path, digest: str) -> Path:
+        blob_path = self._get_blob_path(digest)
+
+        if blob_path.exists():
+            # The same content was stored before, the new copy is not needed
+            path.unlink()
+            log.debug('Package already stored', digest=digest)
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, blob_path)
+            log.debug('Stored package', digest=digest)
+
+        return blob_path
+
+    def link(self, blob_path: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f'.{target.name}.link')
+        temp_path.unlink(missing_ok=True)
+
+        try:
+            os.link(blob_path, temp_path)
+        except OSError as error:
+            # Hardlinks do not cross file systems, the package is copied then
+            log.warn('Failed to hardlink package, copying', target=str(target), error=str(error))
+            shutil.copy2(blob_path, temp_path)
+
+        # Replacing the target keeps readers from seeing a missing or partial file
+        os.replace(temp_path, target)
+
+    def prune(self) -> int:
+        # A blob linked from no distro directory has a link count of one
+        pruned = 0
+
+        for blob_path in self._store_dir.glob('*/*/*'):
+            if blob_path.is_file() and blob_path.stat().st_nlink == 1:
+                blob_path.unlink()
+                pruned += 1
+
+        log.info('Pruned package store', pruned=pruned)
+
+        return pruned
+
+    def _get_blob_path(self, digest: str) -> Path:
+        algorithm, _, value = digest.lower().partition(':')
+        return self._store_dir / algorithm / value[:2] / value
@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import BoundedSemaphore
+from typing import Any, Optional
+
+from context_logger import get_logger
+from github.GitRelease import GitRelease
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import IMetricsRegistry, MetricsRegistry, IResumableFileDownloader
+
+log = get_logger('ParallelAssetDownloader')
+
+
+class AssetDownloadError(Exception):
+
+    def __init__(self, message: str, failures: dict[str, str], files: Optional[list[str]] = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.failures = failures
+        self.files = files or []
+
+
+class ParallelAssetDownloader(IAssetDownloader):
+
+    def __init__(self, asset_downloader: IAssetDownloader, max_workers: int = 4,
+                 max_workers_per_release: int = 2, metrics: Optional[IMetricsRegistry] = None,
+                 file_downloader: Optional[IResumableFileDownloader] = None) -> None:
+        self._asset_downloader = asset_downloader
+        self._file_downloader = file_downloader
+        self._max_workers_per_release = max(1, max_workers_per_release)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='AssetDownloader')
+        metrics = metrics or MetricsRegistry()
+        self._download_duration = metrics.histogram('package_collector_download_seconds', 'Asset download duration')
+        self._downloaded_bytes = metrics.counter('package_collector_downloaded_bytes_total', 'Downloaded asset bytes')
+        self._download_failures = metrics.counter('package_collector_download_failures_total',
+                                                  'Failed asset downloads')
+
+    def download(self, config: ReleaseConfig, release: Optional[GitRelease] = None) -> list[str]:
+        if not release or len(assets := release.raw_data.get('assets', [])) < 2:
+            return self._download(config, release)
+
+        semaphore = BoundedSemaphore(self._max_workers_per_release)
+        futures: dict[str, Future[list[str]]] = {}
+
+        for asset in assets:
+            semaphore.acquire()
+            asset_release = self._create_release(release, asset)
+            future = self._executor.submit(self._download, config, asset_release)
+            future.add_done_callback(lambda _: semaphore.release())
+            futures[asset['name']] = future
+
+        files: list[str] = []
+        failures: dict[str, str] = {}
+
+        for name, future in futures.items():
+            try:
+                files.extend(future.result() or [])
+            except Exception as error:
+                log.error('Failed to download asset', repo=config.full_name, tag=release.tag_name, asset=name,
+                          error=str(error))
+                failures[name] = str(error)
+
+        if failures:
+            raise AssetDownloadError(f'Failed to download {len(failures)} of {len(assets)} assets', failures, files)
+
+        return files
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    def _download(self, config: ReleaseConfig, release: Optional[GitRelease]) -> list[str]:
+        start_time = time.perf_counter()
+        urls = self._expect_assets(release)
+
+        try:
+            files = self._asset_downloader.download(config, release)
+        except Exception:
+            self._download_failures.inc()
+            raise
+        finally:
+            self._download_duration.observe(time.perf_counter() - start_time)
+            self._forget_assets(urls)
+
+        self._downloaded_bytes.inc(sum(self._get_size(file) for file in files or []))
+
+        return files
+
+    def _expect_assets(self, release: Optional[GitRelease]) -> list[str]:
+        if not release or not self._file_downloader:
+            return []
+
+        urls = []
+
+        # The file downloader only sees URLs, so it is told the size and digest to verify each asset against, and the
+        # update time to tell a re-uploaded asset from the file downloaded before
+        for asset in release.raw_data.get('assets', []):
+            for url in [asset.get('url'), asset.get('browser_download_url')]:
+                if url:
+                    self._file_downloader.expect(url, asset.get('size'), asset.get('digest'), asset.get('updated_at'))
+                    urls.append(url)
+
+        return urls
+
+    def _forget_assets(self, urls: list[str]) -> None:
+        # The metadata is only needed while the release is downloaded, so it does not pile up across releases
+        if self._file_downloader:
+            for url in urls:
+                self._file_downloader.forget(url)
+
+    def _get_size(self, file: str) -> int:
+        try:
+            return os.path.getsize(file)
+        except OSError:
+            return 0
+
+    def _create_release(self, release: GitRelease, asset: dict[str, Any]) -> GitRelease:
+        data = {**release.raw_data, 'assets': [asset]}
+        return GitRelease(release.requester, release.raw_headers, data, completed=True)
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import heapq
+import time
+from threading import Lock
+
+from context_logger import get_logger
+
+from package_collector import IReleaseSource
+
+log = get_logger('PollScheduler')
+
+
+class IPollScheduler(object):
+
+    def get_tick_interval(self) -> float:
+        raise NotImplementedError()
+
+    def pop_due(self, sources: list[IReleaseSource]) -> list[IReleaseSource]:
+        raise NotImplementedError()
+
+    def reschedule(self, source: IReleaseSource, changed: bool) -> None:
+        raise NotImplementedError()
+
+    def get_interval(self, repo_name: str) -> float:
+        raise NotImplementedError()
+
+
+class PollScheduler(IPollScheduler):
+
+    def __init__(self, initial_interval: float, min_interval: float, max_interval: float,
+                 backoff_factor: float = 2.0) -> None:
+        self._min_interval = max(1.0, min_interval)
+        self._max_interval = max(self._min_interval, max_interval)
+        self._initial_interval = min(max(initial_interval, self._min_interval), self._max_interval)
+        self._backoff_factor = max(1.0, backoff_factor)
+        self._heap: list[tuple[float, str]] = []
+        self._due_times: dict[str, float] = {}
+        self._intervals: dict[str, float] = {}
+        self._lock = Lock()
+
+    def get_tick_interval(self) -> float:
+        return self._min_interval
+
+    def pop_due(self, sources: list[IReleaseSource]) -> list[IReleaseSource]:
+        now = time.monotonic()
+        sources_by_name = {source.get_config().full_name: source for source in sources}
+        due_sources = []
+
+        with self._lock:
+            for repo_name in sources_by_name:
+                if repo_name not in self._due_times:
+                    self._push(repo_name, now, self._initial_interval)
+
+            while self._heap and self._heap[0][0] <= now:
+                due_time, repo_name = heapq.heappop(self._heap)
+
+                if self._due_times.get(repo_name) != due_time:
+                    continue
+
+                if not (source := sources_by_name.get(repo_name)):
+                    log.debug('Source no longer registered, dropping from schedule', repo=repo_name)
+                    del self._due_times[repo_name]
+                    self._intervals.pop(repo_name, None)
+                    continue
+
+                del self._due_times[repo_name]
+                due_sources.append(source)
+
+            for source in due_sources:
+                # Keep in-flight sources scheduled, so an unfinished check does not make them due again
+                repo_name = source.get_config().full_name
+                self._push(repo_name, now + self._intervals[repo_name], self._intervals[repo_name])
+
+        return due_sources
+
+    def reschedule(self, source: IReleaseSource, changed: bool) -> None:
+        repo_name = source.get_config().full_name
+
+        with self._lock:
+            interval = self._intervals.get(repo_name, self._initial_interval)
+
+            if changed:
+                interval = self._min_interval
+            else:
+                interval = min(interval * self._backoff_factor, self._max_interval)
+
+            self._push(repo_name, time.monotonic() + interval, interval)
+
+        log.debug('Rescheduled release source', repo=repo_name, changed=changed, interval=interval)
+
+    def get_interval(self, repo_name: str) -> float:
+        with self._lock:
+            return self._intervals.get(repo_name, self._initial_interval)
+
+    def _push(self, repo_name: str, due_time: float, interval: float) -> None:
+        self._due_times[repo_name] = due_time
+        self._intervals[repo_name] = interval
+        heapq.heappush(self._heap, (due_time, repo_name))
@@ -0,0 +1,138 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import shlex
+import subprocess
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+from context_logger import get_logger
+from package_downloader import ReleaseConfig
+
+from package_collector import (
+    IDownloadListener,
+    IWorkQueue,
+    CoalescingWorkQueue,
+    IMetricsRegistry,
+    MetricsRegistry,
+    get_retry_delay,
+)
+
+log = get_logger('PostDownloadHook')
+
+BATCH_KEY = 'batch'
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+@dataclass
+class PostDownloadHookConfig:
+    command: str
+    batch_window: float = 10
+    retry: int = 5
+    delay: float = 30
+    max_delay: float = 600
+    timeout: float = 600
+
+
+class IPostDownloadHook(IDownloadListener):
+
+    def start(self) -> None:
+        raise NotImplementedError()
+
+    def shutdown(self) -> None:
+        raise NotImplementedError()
+
+
+class PostDownloadHook(IPostDownloadHook):
+
+    def __init__(self, config: PostDownloadHookConfig, work_queue: Optional[IWorkQueue] = None,
+                 metrics: Optional[IMetricsRegistry] = None) -> None:
+        self._command = shlex.split(config.command)
+        self._batch_window = max(0.0, config.batch_window)
+        self._retry = max(1, config.retry)
+        self._delay = config.delay
+        self._max_delay = max(config.delay, config.max_delay)
+        self._timeout = config.timeout
+        # A single worker runs the hook, so batches never overlap
+        self._work_queue = work_queue or CoalescingWorkQueue(1, 'PostDownloadHook')
+        self._pending: dict[str, None] = {}
+        self._lock = Lock()
+        metrics = metrics or MetricsRegistry()
+        self._hook_runs = metrics.counter('package_collector_hook_runs_total', 'Post-download hook runs by outcome',
+                                          ('outcome',))
+        self._hook_duration = metrics.histogram('package_collector_hook_seconds', 'Post-download hook duration')
+        self._hook_batch_size = metrics.histogram('package_collector_hook_batch_files', 'Files per hook run',
+                                                  buckets=BATCH_SIZE_BUCKETS)
+
+    def start(self) -> None:
+        self._work_queue.start()
+
+    def shutdown(self) -> None:
+        self._work_queue.shutdown()
+
+        # Files still waiting for their batch are handed to the hook once before exiting
+        if files := self._take_pending():
+            log.info('Running hook for pending files before exiting', files=len(files))
+            self._run_hook(files)
+
+    def on_downloaded(self, config: ReleaseConfig, files: list[str]) -> None:
+        with self._lock:
+            self._pending.update(dict.fromkeys(files))
+
+        # The batch window starts with the first file, later files join the pending batch without extending it
+        self._work_queue.submit(BATCH_KEY, lambda: self._run_batch(1), self._batch_window, replace=False)
+
+        log.debug('Queued files for post-download hook', repo=config.full_name, files=files)
+
+    def _run_batch(self, attempt: int) -> None:
+        if not (files := self._take_pending()):
+            return
+
+        if self._run_hook(files):
+            return
+
+        if attempt >= self._retry:
+            log.error('Post-download hook failed, giving up', attempt=attempt, files=files)
+            self._hook_runs.inc(labels=('dropped',))
+            return
+
+        with self._lock:
+            # The failed files are retried together with the ones downloaded since
+            self._pending = {**dict.fromkeys(files), **self._pending}
+
+        delay = get_retry_delay(attempt, self._delay, self._max_delay)
+        log.info('Scheduling post-download hook retry', attempt=attempt + 1, delay=round(delay, 3))
+        self._work_queue.submit(BATCH_KEY, lambda: self._run_batch(attempt + 1), delay)
+
+    def _take_pending(self) -> list[str]:
+        with self._lock:
+            files = list(self._pending)
+            self._pending.clear()
+            return files
+
+    def _run_hook(self, files: list[str]) -> bool:
+        start_time = time.perf_counter()
+        self._hook_batch_size.observe(len(files))
+
+        try:
+            result = subprocess.run(self._command + files, capture_output=True, text=True, timeout=self._timeout)
+        except Exception as error:
+            log.error('Failed to run post-download hook', command=self._command, error=str(error))
+            self._hook_runs.inc(labels=('failure',))
+            return False
+        finally:
+            self._hook_duration.observe(time.perf_counter() - start_time)
+
+        if result.returncode != 0:
+            log.error('Post-download hook failed', command=self._command, returncode=result.returncode,
+                      stderr=result.stderr.strip())
+            self._hook_runs.inc(labels=('failure',))
+            return False
+
+        log.info('Post-download hook completed', command=self._command, files=len(files))
+        self._hook_runs.inc(labels=('success',))
+
+        return True
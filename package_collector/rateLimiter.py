@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Optional
+
+from context_logger import get_logger
+
+log = get_logger('RateLimiter')
+
+
+@dataclass
+class RateLimitStats:
+    limit: int = 0
+    remaining: int = 0
+    reset_time: float = 0.0
+    interval: float = 0.0
+    paced_count: int = 0
+    exhausted_count: int = 0
+
+
+class IRateLimiter(object):
+
+    def update(self, token: Optional[str], headers: dict[str, Any]) -> None:
+        raise NotImplementedError()
+
+    def acquire(self, token: Optional[str]) -> float:
+        raise NotImplementedError()
+
+    def get_stats(self) -> dict[str, RateLimitStats]:
+        raise NotImplementedError()
+
+
+class RateLimiter(IRateLimiter):
+
+    def __init__(self, reserve: int = 100, pace_threshold: float = 0.2) -> None:
+        self._reserve = reserve
+        self._pace_threshold = pace_threshold
+        self._stats: dict[tuple[str, str], RateLimitStats] = {}
+        self._next_slots: dict[str, float] = {}
+        self._lock = Lock()
+
+    def update(self, token: Optional[str], headers: dict[str, Any]) -> None:
+        if 'x-ratelimit-remaining' not in headers:
+            return
+
+        key = (self._get_fingerprint(token), str(headers.get('x-ratelimit-resource', 'core')))
+
+        with self._lock:
+            stats = self._stats.setdefault(key, RateLimitStats())
+            stats.limit = int(headers.get('x-ratelimit-limit', stats.limit))
+            stats.remaining = int(headers['x-ratelimit-remaining'])
+            stats.reset_time = float(headers.get('x-ratelimit-reset', stats.reset_time))
+
+    def acquire(self, token: Optional[str]) -> float:
+        fingerprint = self._get_fingerprint(token)
+        now = time.time()
+
+        with self._lock:
+            interval = 0.0
+            wait_until = now
+
+            for (key_fingerprint, resource), stats in self._stats.items():
+                if key_fingerprint != fingerprint or now >= stats.reset_time:
+                    stats.interval = 0.0
+                    continue
+
+                budget = stats.remaining - self._reserve
+
+                if budget <= 0:
+                    stats.exhausted_count += 1
+                    wait_until = max(wait_until, stats.reset_time)
+                elif stats.remaining < stats.limit * self._pace_threshold:
+                    stats.interval = (stats.reset_time - now) / budget
+                    stats.paced_count += 1
+                    interval = max(interval, stats.interval)
+                else:
+                    stats.interval = 0.0
+
+            if wait_until > now:
+                log.warn('Rate limit quota exhausted, waiting for reset', delay=round(wait_until - now, 1))
+                self._next_slots[fingerprint] = wait_until
+                return wait_until - now
+
+            if interval > 0:
+                slot = max(now, self._next_slots.get(fingerprint, now))
+                self._next_slots[fingerprint] = slot + interval
+                return slot - now
+
+            return 0.0
+
+    def get_stats(self) -> dict[str, RateLimitStats]:
+        with self._lock:
+            return {
+                f'{resource}:{fingerprint}': RateLimitStats(**vars(stats))
+                for (fingerprint, resource), stats in self._stats.items()
+            }
+
+    def _get_fingerprint(self, token: Optional[str]) -> str:
+        if not token:
+            return 'anonymous'
+        return hashlib.sha256(token.encode()).hexdigest()[:8]
@@ -0,0 +1,82 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+from common_utility.jsonLoader import IJsonLoader
+from context_logger import get_logger
+from package_downloader import ReleaseConfig
+
+log = get_logger('ReleaseConfigLoader')
+
+
+class IReleaseConfigLoader(object):
+
+    def load(self) -> Optional[list[ReleaseConfig]]:
+        raise NotImplementedError()
+
+
+class ReleaseConfigLoader(IReleaseConfigLoader):
+
+    def __init__(self, release_config: str, json_loader: IJsonLoader, download_path: Path,
+                 session: Optional[requests.Session] = None, timeout: float = 30) -> None:
+        self._release_config = release_config
+        self._json_loader = json_loader
+        self._download_path = download_path
+        self._session = session or requests.Session()
+        self._timeout = timeout
+        self._is_remote = release_config.startswith(('http://', 'https://'))
+        self._version: Optional[tuple[Any, ...]] = None
+
+    def load(self) -> Optional[list[ReleaseConfig]]:
+        # Returns None when the release config did not change since the last load
+        path, version = self._download() if self._is_remote else self._check_file()
+
+        if not path:
+            log.debug('Release config not modified', release_config=self._release_config)
+            return None
+
+        configs = self._json_loader.load_list(path, ReleaseConfig)
+        log.info('Loaded release config', release_config=self._release_config, sources=len(configs))
+
+        # The version is only kept after a successful load, so a broken config is loaded again once fixed
+        self._version = version
+
+        return configs
+
+    def _download(self) -> tuple[Optional[Path], tuple[Any, ...]]:
+        headers = {}
+
+        if self._version:
+            etag, last_modified = self._version
+
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self._session.get(self._release_config, headers=headers, timeout=self._timeout)
+
+        if response.status_code == 304:
+            return None, self._version or ()
+
+        response.raise_for_status()
+
+        # The config is replaced atomically, so a failed download never leaves a partial file behind
+        self._download_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self._download_path.with_name(f'.{self._download_path.name}.tmp')
+        temp_path.write_bytes(response.content)
+        os.replace(temp_path, self._download_path)
+
+        return self._download_path, (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def _check_file(self) -> tuple[Optional[Path], tuple[Any, ...]]:
+        path = Path(self._release_config)
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        return (None if version == self._version else path), version
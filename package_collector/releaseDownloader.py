@@ -0,0 +1,29 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+from context_logger import get_logger
+from package_downloader import IAssetDownloader
+
+from package_collector import IReleaseSource, AssetDownloadError
+
+log = get_logger('ReleaseDownloader')
+
+
+def download_releases(source: IReleaseSource, asset_downloader: IAssetDownloader) -> None:
+    repo_name = source.get_config().full_name
+
+    # Missed releases are downloaded in the order they were published
+    for release in source.get_releases():
+        try:
+            asset_downloader.download(source.get_config(), release)
+        except AssetDownloadError as error:
+            log.error('Failed to download some release assets', repo=repo_name, release=release.tag_name,
+                      failed_assets=list(error.failures))
+            source.commit_release(release, list(error.failures))
+        except Exception as exception:
+            log.error('Failed to download release', repo=repo_name, release=release.tag_name, error=str(exception))
+            source.commit_release(release, [asset['name'] for asset in release.raw_data.get('assets', [])])
+        else:
+            # The release is only recorded as collected once its assets are downloaded
+            source.commit_release(release)
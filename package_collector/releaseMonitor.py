@@ -2,14 +2,31 @@
 # SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
 # SPDX-License-Identifier: MIT
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Callable, Optional, TypeVar
+
 from common_utility import IReusableTimer
 from context_logger import get_logger
 from package_downloader import IAssetDownloader
 
-from package_collector import ISourceRegistry, IReleaseSource
+from package_collector import (
+    ISourceRegistry,
+    IReleaseSource,
+    IReleasePoller,
+    IRateLimiter,
+    RateLimitStats,
+    IPollScheduler,
+    download_releases,
+    IMetricsRegistry,
+    MetricsRegistry,
+)
 
 log = get_logger('ReleaseMonitor')
 
+_T = TypeVar('_T')
+
 
 class IReleaseMonitor(object):
 
@@ -25,38 +42,49 @@ class IReleaseMonitor(object):
     def check(self, package: str) -> None:
         raise NotImplementedError()
 
+    def get_rate_limit_stats(self) -> dict[str, RateLimitStats]:
+        raise NotImplementedError()
+
 
 class ReleaseMonitor(IReleaseMonitor):
 
     def __init__(self, source_registry: ISourceRegistry, asset_downloader: IAssetDownloader,
-                 monitor_timer: IReusableTimer, monitor_interval: int = 600) -> None:
+                 monitor_timer: IReusableTimer, monitor_interval: int = 600, monitor_workers: int = 1,
+                 release_poller: Optional[IReleasePoller] = None, rate_limiter: Optional[IRateLimiter] = None,
+                 poll_scheduler: Optional[IPollScheduler] = None, metrics: Optional[IMetricsRegistry] = None) -> None:
         self._source_registry = source_registry
         self._asset_downloader = asset_downloader
         self._monitor_timer = monitor_timer
         self._monitor_interval = monitor_interval
+        self._monitor_workers = max(1, monitor_workers)
+        self._release_poller = release_poller
+        self._rate_limiter = rate_limiter
+        self._poll_scheduler = poll_scheduler
         self._is_running = False
+        self._stop_event = Event()
+        self._cycle_lock = Lock()
+        metrics = metrics or MetricsRegistry()
+        self._cycle_duration = metrics.histogram('package_collector_monitor_cycle_seconds', 'Monitor cycle duration')
+        self._cycle_overruns = metrics.counter('package_collector_monitor_overruns_total',
+                                               'Monitor cycles that took longer than the monitor interval')
+        self._skipped_cycles = metrics.counter('package_collector_monitor_skipped_cycles_total',
+                                               'Monitor cycles skipped as the previous one was still running')
 
     def start(self) -> None:
         log.info('Starting monitoring')
-        self._monitor_timer.start(self._monitor_interval, self._check_all_periodic)
+        self._stop_event.clear()
+        interval = self._poll_scheduler.get_tick_interval() if self._poll_scheduler else self._monitor_interval
+        self._monitor_timer.start(interval, self._check_all_periodic)
         self._is_running = True
 
     def stop(self) -> None:
         log.info('Stopping monitoring')
         self._monitor_timer.cancel()
         self._is_running = False
+        self._stop_event.set()
 
     def check_all(self) -> None:
-        log.info('Checking for new releases')
-
-        for source in self._source_registry.get_all():
-            if not self._is_running:
-                log.info('Checking interrupted')
-                return
-
-            self._check_source(source)
-
-        log.info('Checking completed')
+        self._check_sources(self._source_registry.get_all())
 
     def check(self, repo_name: str) -> None:
         if source := self._source_registry.get(repo_name):
@@ -64,16 +92,103 @@ class ReleaseMonitor(IReleaseMonitor):
         else:
             log.warn('No source registered for repository', repo=repo_name)
 
+    def get_rate_limit_stats(self) -> dict[str, RateLimitStats]:
+        return self._rate_limiter.get_stats() if self._rate_limiter else {}
+
+    def _check_due(self, poll_scheduler: IPollScheduler) -> None:
+        if sources := poll_scheduler.pop_due(self._source_registry.get_all()):
+            self._check_sources(sources)
+        else:
+            log.debug('No release sources due for checking')
+
+    def _check_sources(self, sources: list[IReleaseSource]) -> None:
+        log.info('Checking for new releases', sources=len(sources), workers=self._monitor_workers)
+
+        start_time = time.monotonic()
+
+        if self._release_poller:
+            completed = self._run_all(self._check_batch_if_running, self._release_poller.get_batches(sources))
+        else:
+            completed = self._run_all(self._check_source_if_running, sources)
+
+        duration = round(time.monotonic() - start_time, 3)
+        self._cycle_duration.observe(duration)
+
+        if completed:
+            log.info('Checking completed', sources=len(sources), duration=duration)
+        else:
+            log.info('Checking interrupted', duration=duration)
+
+        if self._rate_limiter:
+            log.info('Rate limit status', stats=self._rate_limiter.get_stats())
+
     def _check_all_periodic(self) -> None:
         self._monitor_timer.restart()
 
-        self.check_all()
+        if not self._cycle_lock.acquire(blocking=False):
+            log.warn('Previous check cycle still running, skipping', interval=self._monitor_interval)
+            self._skipped_cycles.inc()
+            return
+
+        start_time = time.monotonic()
+
+        try:
+            if self._poll_scheduler:
+                self._check_due(self._poll_scheduler)
+            else:
+                self.check_all()
+        finally:
+            self._cycle_lock.release()
+
+        if time.monotonic() - start_time > self._monitor_interval:
+            self._cycle_overruns.inc()
+
+    def _run_all(self, check: Callable[[_T], bool], items: list[_T]) -> bool:
+        if self._monitor_workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self._monitor_workers, thread_name_prefix='ReleaseMonitor') as executor:
+                return all(executor.map(check, items))
+
+        return all(check(item) for item in items)
+
+    def _check_batch_if_running(self, batch: list[IReleaseSource]) -> bool:
+        if not self._wait_for_quota(batch[0]) or not self._release_poller:
+            return False
+
+        changed_sources = self._release_poller.poll(batch)
+
+        if self._poll_scheduler:
+            for source in batch:
+                self._poll_scheduler.reschedule(source, source in changed_sources)
+
+        for source in changed_sources:
+            if not self._is_running:
+                return False
+
+            download_releases(source, self._asset_downloader)
+
+        return True
+
+    def _check_source_if_running(self, source: IReleaseSource) -> bool:
+        if not self._wait_for_quota(source):
+            return False
+
+        self._check_source(source)
+
+        return True
+
+    def _wait_for_quota(self, source: IReleaseSource) -> bool:
+        if self._is_running and self._rate_limiter:
+            if (delay := self._rate_limiter.acquire(source.get_config().token)) > 0:
+                log.debug('Pacing release check', repo=source.get_config().full_name, delay=round(delay, 3))
+                self._stop_event.wait(delay)
+
+        return self._is_running
 
     def _check_source(self, source: IReleaseSource) -> None:
-        if source.check_latest_release():
-            if release := source.get_release():
-                try:
-                    self._asset_downloader.download(source.get_config(), release)
-                except Exception as exception:
-                    log.error('Failed to download release',
-                              repo=source.get_config().full_name, release=release.tag_name, error=str(exception))
+        changed = source.check_latest_release()
+
+        if self._poll_scheduler:
+            self._poll_scheduler.reschedule(source, changed)
+
+        if changed:
+            download_releases(source, self._asset_downloader)
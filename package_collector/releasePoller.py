@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+from typing import Any, Optional
+
+from context_logger import get_logger
+
+from package_collector import IReleaseSource, IRequesterProvider, IRateLimiter
+
+log = get_logger('ReleasePoller')
+
+RELEASE_FIELDS = '''
+fragment ReleaseFields on Repository {
+  latestRelease {
+    tagName
+    releaseAssets(first: 100) {
+      nodes {
+        name
+        size
+        updatedAt
+      }
+    }
+  }
+}
+'''
+
+
+class IReleasePoller(object):
+
+    def get_batches(self, sources: list[IReleaseSource]) -> list[list[IReleaseSource]]:
+        raise NotImplementedError()
+
+    def poll(self, sources: list[IReleaseSource]) -> list[IReleaseSource]:
+        raise NotImplementedError()
+
+
+class GraphqlReleasePoller(IReleasePoller):
+
+    def __init__(self, requester_provider: IRequesterProvider, batch_size: int = 50,
+                 rate_limiter: Optional[IRateLimiter] = None) -> None:
+        self._requester_provider = requester_provider
+        self._batch_size = max(1, batch_size)
+        self._rate_limiter = rate_limiter
+
+    def get_batches(self, sources: list[IReleaseSource]) -> list[list[IReleaseSource]]:
+        sources_by_token: dict[Optional[str], list[IReleaseSource]] = {}
+
+        for source in sources:
+            sources_by_token.setdefault(source.get_config().token, []).append(source)
+
+        batches = []
+
+        for token_sources in sources_by_token.values():
+            for index in range(0, len(token_sources), self._batch_size):
+                batches.append(token_sources[index:index + self._batch_size])
+
+        return batches
+
+    def poll(self, sources: list[IReleaseSource]) -> list[IReleaseSource]:
+        if not sources:
+            return []
+
+        repositories: list[Optional[dict[str, Any]]] = [None] * len(sources)
+
+        if not sources[0].get_config().token:
+            log.debug('No token for GraphQL query, falling back to REST', sources=len(sources))
+        else:
+            try:
+                repositories = self._query_repositories(sources)
+            except Exception as error:
+                log.error('Failed to query latest releases, falling back to REST', error=error, sources=len(sources))
+
+        changed_sources = [source for source, data in zip(sources, repositories) if self._is_changed(source, data)]
+
+        log.debug('Polled latest releases', sources=len(sources), changed=len(changed_sources))
+
+        return [source for source in changed_sources if source.check_latest_release()]
+
+    def _query_repositories(self, sources: list[IReleaseSource]) -> list[Optional[dict[str, Any]]]:
+        token = sources[0].get_config().token
+        requester = self._requester_provider.get_requester(token)
+
+        parameters = []
+        selections = []
+        variables = {}
+
+        for index, source in enumerate(sources):
+            config = source.get_config()
+            parameters.append(f'$owner{index}: String!, $name{index}: String!')
+            selections.append(f'r{index}: repository(owner: $owner{index}, name: $name{index}) {{ ...ReleaseFields }}')
+            variables[f'owner{index}'] = config.owner
+            variables[f'name{index}'] = config.repo
+
+        query = f'query({", ".join(parameters)}) {{\n{chr(10).join(selections)}\n}}\n{RELEASE_FIELDS}'
+
+        headers, response = requester.requestJsonAndCheck(
+            'POST', requester.graphql_url, input={'query': query, 'variables': variables}
+        )
+
+        if self._rate_limiter:
+            self._rate_limiter.update(token, headers)
+
+        data = response.get('data') or {}
+
+        return [data.get(f'r{index}') for index in range(len(sources))]
+
+    def _is_changed(self, source: IReleaseSource, repository: Optional[dict[str, Any]]) -> bool:
+        if repository is None:
+            return True
+
+        if not (latest_release := repository.get('latestRelease')):
+            log.debug('No release found', repo=source.get_config().full_name)
+            return False
+
+        if not (current_state := source.get_state()):
+            return True
+
+        if current_state.tag_name != latest_release['tagName']:
+            return True
+
+        current_assets = {asset.name: asset for asset in current_state.assets}
+
+        for asset in latest_release['releaseAssets']['nodes']:
+            if not (current_asset := current_assets.get(asset['name'])):
+                return True
+
+            if current_asset.id is not None and \
+                    (current_asset.size, current_asset.updated_at) != (asset['size'], asset['updatedAt']):
+                return True
+
+        return False
@@ -2,17 +2,45 @@
 # SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
 # SPDX-License-Identifier: MIT
 
+import json
+import time
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from threading import Lock
-from typing import Optional
+from typing import Optional, Any, Callable, TypeVar
 
 from context_logger import get_logger
-from github import UnknownObjectException
+from github import UnknownObjectException, RateLimitExceededException
 from github.GitRelease import GitRelease
 from github.Repository import Repository
+from github.Requester import Requester
 from package_downloader import IRepositoryProvider, ReleaseConfig
 
+from package_collector import (
+    IRateLimiter,
+    IReleaseStateStore,
+    ReleaseState,
+    AssetIdentity,
+    IMetricsRegistry,
+    MetricsRegistry,
+    IRequesterProvider,
+)
+
 log = get_logger('ReleaseSource')
 
+_T = TypeVar('_T')
+
+
+@dataclass
+class ReleaseHistoryConfig:
+    sources: list[str] = field(default_factory=list)
+    prereleases: bool = False
+    page_size: int = 10
+    max_pages: int = 10
+
+    def matches(self, repo_name: str) -> bool:
+        return any(fnmatch(repo_name.lower(), pattern.lower()) for pattern in self.sources)
+
 
 class IReleaseSource(object):
 
@@ -22,18 +50,62 @@ class IReleaseSource(object):
     def get_release(self) -> Optional[GitRelease]:
         raise NotImplementedError()
 
+    def get_releases(self) -> list[GitRelease]:
+        raise NotImplementedError()
+
+    def get_state(self) -> Optional[ReleaseState]:
+        raise NotImplementedError()
+
     def check_latest_release(self) -> bool:
         raise NotImplementedError()
 
+    def check_release_response(self, requester: Requester, status: int, headers: dict[str, Any], body: str) -> bool:
+        raise NotImplementedError()
+
+    def check_release_data(self, data: dict[str, Any]) -> bool:
+        raise NotImplementedError()
+
+    def commit_release(self, release: GitRelease, failed_assets: Optional[list[str]] = None) -> None:
+        raise NotImplementedError()
+
+    def get_conditional_headers(self) -> dict[str, Any]:
+        raise NotImplementedError()
+
+    def prefetch_repository(self) -> None:
+        raise NotImplementedError()
+
 
 class ReleaseSource(IReleaseSource):
 
-    def __init__(self, config: ReleaseConfig, repository_provider: IRepositoryProvider) -> None:
+    def __init__(self, config: ReleaseConfig, repository_provider: IRepositoryProvider,
+                 rate_limiter: Optional[IRateLimiter] = None, state_store: Optional[IReleaseStateStore] = None,
+                 metrics: Optional[IMetricsRegistry] = None,
+                 history_config: Optional[ReleaseHistoryConfig] = None,
+                 requester_provider: Optional[IRequesterProvider] = None) -> None:
         self._config = config
+        self._history_config = history_config
         self._repository_provider = repository_provider
+        self._requester_provider = requester_provider
+        self._rate_limiter = rate_limiter
+        self._state_store = state_store
         self._repository: Optional[Repository] = None
         self._release: Optional[GitRelease] = None
+        self._releases: list[GitRelease] = []
+        self._state = self._load_state()
+        self._etag = self._state.etag if self._state else None
+        self._last_modified = self._state.last_modified if self._state else None
+        # The last saved state, checks only advance the state in memory until their release is committed
+        self._committed_state = self._state
+        self._committed_validators = (self._etag, self._last_modified)
+        self._failed_tag: Optional[str] = None
         self._lock = Lock()
+        metrics = metrics or MetricsRegistry()
+        self._check_latency = metrics.histogram('package_collector_release_check_seconds',
+                                                'Latest release check latency', ('repo',))
+        self._api_requests = metrics.counter('package_collector_api_requests_total',
+                                             'Latest release API responses by status', ('status',))
+        self._api_errors = metrics.counter('package_collector_api_errors_total',
+                                           'Latest release API errors by exception type', ('type',))
 
     def get_config(self) -> ReleaseConfig:
         return self._config
@@ -42,39 +114,242 @@ class ReleaseSource(IReleaseSource):
         with self._lock:
             return self._release
 
+    def get_releases(self) -> list[GitRelease]:
+        # The releases found by the last check, oldest first, more than one only when releases were missed
+        with self._lock:
+            return list(self._releases)
+
+    def get_state(self) -> Optional[ReleaseState]:
+        with self._lock:
+            return self._state
+
     def check_latest_release(self) -> bool:
+        start_time = time.perf_counter()
+
+        try:
+            with self._lock:
+                return self._check_latest_release()
+        finally:
+            self._check_latency.observe(time.perf_counter() - start_time, (self._config.full_name,))
+
+    def check_release_response(self, requester: Requester, status: int, headers: dict[str, Any], body: str) -> bool:
         with self._lock:
-            if latest_release := self._get_latest_release():
-                current_tag = self._release.tag_name if self._release else None
-                latest_tag = latest_release.tag_name
-                repo_name = self._config.full_name
-
-                if not current_tag:
-                    log.info('Initial release', repo=repo_name, tag=latest_tag)
-                    update = True
-                elif current_tag != latest_tag:
-                    log.info('New release found', repo=repo_name, old_tag=current_tag, new_tag=latest_tag)
-                    update = True
-                else:
-                    update = self._check_for_new_assets(latest_release)
-
-                if update:
-                    self._release = latest_release
-                    return self._check_for_any_assets(latest_release)
+            return self._check_release(lambda: self._process_response(requester, status, headers, body))
 
-            return False
+    def check_release_data(self, data: dict[str, Any]) -> bool:
+        with self._lock:
+            if not self._is_newer_or_collected(data):
+                # Events of older releases, like edited release notes, must not replace the collected release
+                log.info('Release event not newer than collected release, checking latest release',
+                         repo=self._config.full_name, tag=data.get('tag_name'))
+                return self._check_latest_release()
 
-    def _check_for_new_assets(self, release: GitRelease) -> bool:
-        current_assets = [asset.name for asset in self._release.assets] if self._release else []
-        latest_assets = [asset.name for asset in release.assets]
-        new_assets = list(set(latest_assets) - set(current_assets))
+            return self._check_release(lambda: GitRelease(self._get_requester(), {}, data, completed=True))
 
-        if new_assets:
-            log.info('New assets for release', repo=self._config.full_name, tag=release.tag_name, new_assets=new_assets)
+    def commit_release(self, release: GitRelease, failed_assets: Optional[list[str]] = None) -> None:
+        with self._lock:
+            if self._failed_tag and self._failed_tag != release.tag_name:
+                # A release published before this one failed to download, the state stays on it until it is collected
+                log.info('Not saving release state after failed download', repo=self._config.full_name,
+                         tag=release.tag_name, failed_tag=self._failed_tag)
+                return
+
+            if failed_assets:
+                # The check is rolled back to the committed state, so the next check fetches the release again
+                log.warn('Release not fully collected, retrying on next check', repo=self._config.full_name,
+                         tag=release.tag_name, failed_assets=failed_assets)
+                self._etag, self._last_modified = self._committed_validators
+
+            self._failed_tag = release.tag_name if failed_assets else None
+
+            if release is self._release:
+                etag, last_modified = self._etag, self._last_modified
+            else:
+                # Releases followed by newer ones are saved with the validators from before the check, so the newer
+                # ones are listed again when the collector stops before downloading them
+                etag, last_modified = self._committed_validators
+
+            state = self._create_state(self._committed_state, release, etag, last_modified, failed_assets)
+
+            if failed_assets:
+                # Assets that failed to download are left out, so the next check finds them as new or changed again
+                self._state = state
+
+            self._save_state(state)
+            self._committed_state = state
+            self._committed_validators = (etag, last_modified)
+
+    def get_conditional_headers(self) -> dict[str, Any]:
+        with self._lock:
+            return self._get_conditional_headers()
+
+    def _check_latest_release(self) -> bool:
+        if self._history_config:
+            return self._check_release_history(self._history_config)
+
+        return self._check_release(lambda: self._request_latest_release(self._get_repository()))
+
+    def _is_newer_or_collected(self, data: dict[str, Any]) -> bool:
+        if not self._state or self._state.tag_name == data.get('tag_name'):
             return True
 
+        published_at = data.get('published_at')
+
+        # Publish times are ISO 8601 UTC timestamps, so they are ordered as strings
+        return bool(published_at and self._state.published_at and published_at > self._state.published_at)
+
+    def _check_release(self, fetch: Callable[[], Optional[GitRelease]]) -> bool:
+        if latest_release := self._get_latest_release(fetch):
+            current_tag = self._state.tag_name if self._state else None
+            latest_tag = latest_release.tag_name
+            repo_name = self._config.full_name
+
+            if not current_tag:
+                log.info('Initial release', repo=repo_name, tag=latest_tag)
+            elif current_tag != latest_tag and self._history_config:
+                # The releases published since the collected one are listed, so none of them is skipped
+                return self._check_release_history(self._history_config, conditional=False)
+            elif current_tag != latest_tag:
+                log.info('New release found', repo=repo_name, old_tag=current_tag, new_tag=latest_tag)
+            elif changed_assets := self._get_changed_assets(latest_release):
+                latest_release = self._create_release(latest_release, changed_assets)
+            else:
+                return False
+
+            self._set_releases([latest_release])
+            self._update_state(latest_release)
+            return self._check_for_any_assets(latest_release)
+
         return False
 
+    def _set_releases(self, releases: list[GitRelease]) -> None:
+        self._release = releases[-1]
+        self._releases = releases
+
+        if self._failed_tag not in [release.tag_name for release in releases]:
+            # The release that failed to download is not collected any more, so newer releases are saved again
+            self._failed_tag = None
+
+    def _check_release_history(self, history_config: ReleaseHistoryConfig, conditional: bool = True) -> bool:
+        current_tag = self._state.tag_name if self._state else None
+
+        if not (result := self._get_latest_release(
+                lambda: self._request_new_releases(history_config, current_tag, conditional))):
+            return False
+
+        releases, known_release = result
+
+        if known_release and (changed_assets := self._get_changed_assets(known_release)):
+            # Assets of the collected release that changed or failed to download come before the newer releases
+            releases = [self._create_release(known_release, changed_assets), *releases]
+
+        if not releases:
+            return False
+
+        log.info('New releases found', repo=self._config.full_name, old_tag=current_tag,
+                 new_tags=[release.tag_name for release in releases])
+
+        self._set_releases(releases)
+
+        for release in releases:
+            self._update_state(release)
+
+        return any([self._check_for_any_assets(release) for release in releases])
+
+    def _request_new_releases(self, history_config: ReleaseHistoryConfig, current_tag: Optional[str],
+                              conditional: bool) -> Optional[tuple[list[GitRelease], Optional[GitRelease]]]:
+        if (result := self._list_new_releases(history_config, current_tag, conditional)) is None:
+            return None
+
+        releases, known_release, first_page_headers = result
+
+        if conditional:
+            # The validators are only taken once every page is listed, so a failed scan is repeated on the next check
+            self._update_validators(first_page_headers)
+
+        return releases, known_release
+
+    def _list_new_releases(self, history_config: ReleaseHistoryConfig, current_tag: Optional[str], conditional: bool
+                           ) -> Optional[tuple[list[GitRelease], Optional[GitRelease], dict[str, Any]]]:
+        repository = self._get_repository()
+        requester = repository.requester
+        url = f'{repository.url}/releases'
+        collected_at = self._state.published_at if self._state else None
+        releases: list[GitRelease] = []
+        first_page_headers: dict[str, Any] = {}
+
+        for page in range(1, history_config.max_pages + 1):
+            parameters = {'per_page': history_config.page_size, 'page': page}
+            # Only the first page is requested conditionally, so an unchanged repository costs a single request, the
+            # validators of the latest release response are not used when the history is listed after receiving it
+            headers = self._get_conditional_headers() if conditional and page == 1 else {}
+            status, response_headers, body = requester.requestJson('GET', url, parameters, headers)
+
+            if (data := self._read_response(requester, status, response_headers, body)) is None:
+                return None
+
+            if page == 1:
+                first_page_headers = response_headers
+
+            for release_data in data:
+                release = GitRelease(requester, response_headers, release_data, completed=True)
+
+                if release.tag_name == current_tag:
+                    # Releases are listed newest first, the ones before the collected release were seen already
+                    return releases[::-1], release, first_page_headers
+
+                if self._is_published_before(release_data, collected_at):
+                    # The collected release was deleted, the releases published before it were seen already
+                    log.info('Collected release not found in release history, stopping at older release',
+                             repo=self._config.full_name, tag=current_tag, older_tag=release.tag_name)
+                    return releases[::-1], None, first_page_headers
+
+                if self._is_collected(release_data, history_config):
+                    releases.append(release)
+
+                    if not current_tag:
+                        # Without a collected release only the newest is taken, the history is not scanned
+                        return releases, None, first_page_headers
+
+            if len(data) < history_config.page_size:
+                break
+        else:
+            log.warn('Collected release not found in release history', repo=self._config.full_name,
+                     tag=current_tag, pages=history_config.max_pages)
+
+        return releases[::-1], None, first_page_headers
+
+    def _is_published_before(self, release_data: dict[str, Any], collected_at: Optional[str]) -> bool:
+        published_at = release_data.get('published_at')
+        return bool(published_at and collected_at and published_at < collected_at)
+
+    def _is_collected(self, release_data: dict[str, Any], history_config: ReleaseHistoryConfig) -> bool:
+        return not release_data.get('draft') and (history_config.prereleases or not release_data.get('prerelease'))
+
+    def _get_changed_assets(self, release: GitRelease) -> list[dict[str, Any]]:
+        current_assets = {asset.name: asset for asset in self._state.assets} if self._state else {}
+        changed_assets = []
+
+        for asset in release.raw_data.get('assets', []):
+            current_asset = current_assets.get(asset['name'])
+
+            if not current_asset or current_asset.is_changed(self._create_asset_identity(asset)):
+                changed_assets.append(asset)
+
+        if changed_assets:
+            log.info('New or changed assets for release', repo=self._config.full_name, tag=release.tag_name,
+                     assets=[asset['name'] for asset in changed_assets])
+
+        return changed_assets
+
+    def _create_release(self, release: GitRelease, assets: list[dict[str, Any]]) -> GitRelease:
+        data = {**release.raw_data, 'assets': assets}
+        return GitRelease(release.requester, release.raw_headers, data, completed=True)
+
+    def _create_asset_identity(self, asset: dict[str, Any]) -> AssetIdentity:
+        return AssetIdentity(asset['name'], asset.get('id'), asset.get('size'), asset.get('updated_at'),
+                             asset.get('digest'))
+
     def _check_for_any_assets(self, release: GitRelease) -> bool:
         if not release.assets:
             log.warning('No assets for release', repo=self._config.full_name, tag=release.tag_name)
@@ -82,17 +357,116 @@ class ReleaseSource(IReleaseSource):
 
         return True
 
-    def _get_latest_release(self) -> Optional[GitRelease]:
+    def _load_state(self) -> Optional[ReleaseState]:
+        if self._state_store:
+            if state := self._state_store.load(self._config.full_name):
+                log.info('Restored release state', repo=self._config.full_name, tag=state.tag_name)
+                return state
+
+        return None
+
+    def _update_state(self, release: GitRelease) -> None:
+        self._state = self._create_state(self._state, release, self._etag, self._last_modified)
+
+    def _create_state(self, state: Optional[ReleaseState], release: GitRelease, etag: Optional[str],
+                      last_modified: Optional[str], failed_assets: Optional[list[str]] = None) -> ReleaseState:
+        assets = {asset.name: asset for asset in state.assets} if state and state.tag_name == release.tag_name else {}
+
+        for asset in release.raw_data.get('assets', []):
+            if asset['name'] not in (failed_assets or []):
+                assets[asset['name']] = self._create_asset_identity(asset)
+
+        return ReleaseState(release.tag_name, list(assets.values()), etag, last_modified,
+                            release.raw_data.get('published_at'))
+
+    def _save_state(self, state: ReleaseState) -> None:
+        if self._state_store:
+            try:
+                self._state_store.save(self._config.full_name, state)
+            except Exception as error:
+                log.error('Failed to save release state', repo=self._config.full_name, error=error)
+
+    def _get_latest_release(self, fetch: Callable[[], Optional[_T]]) -> Optional[_T]:
         try:
-            repository = self._get_repository()
-            return repository.get_latest_release()
+            return fetch()
         except UnknownObjectException as error:
             log.warn('No release found', status=error.status, reason=error.message, repo=self._config.full_name)
+            self._count_error(error)
+            return None
+        except RateLimitExceededException as error:
+            log.warn('Rate limit exceeded fetching latest release', reason=error.message, repo=self._config.full_name)
+            self._update_rate_limit(error.headers or {})
+            self._count_error(error)
             return None
         except Exception as error:
             log.error('Unexpected error fetching latest release', error=error, repo=self._config.full_name)
+            self._count_error(error)
+            return None
+
+    def _count_error(self, error: Exception) -> None:
+        self._api_errors.inc(labels=(type(error).__name__,))
+
+    def _request_latest_release(self, repository: Repository) -> Optional[GitRelease]:
+        requester = repository.requester
+        url = f'{repository.url}/releases/latest'
+
+        status, headers, body = requester.requestJson('GET', url, headers=self._get_conditional_headers())
+
+        return self._process_response(requester, status, headers, body)
+
+    def _process_response(self, requester: Requester, status: int, headers: dict[str, Any],
+                          body: str) -> Optional[GitRelease]:
+        if (data := self._read_response(requester, status, headers, body)) is None:
+            return None
+
+        self._update_validators(headers)
+
+        return GitRelease(requester, headers, data, completed=True)
+
+    def _read_response(self, requester: Requester, status: int, headers: dict[str, Any], body: str) -> Any:
+        self._update_rate_limit(headers)
+        self._api_requests.inc(labels=(str(status),))
+
+        if status == 304:
+            log.debug('Latest release not modified', repo=self._config.full_name, etag=self._etag)
             return None
 
+        data = json.loads(body) if body else None
+
+        if status >= 400:
+            raise requester.createException(status, headers, data or {})
+
+        return data
+
+    def _update_validators(self, headers: dict[str, Any]) -> None:
+        self._etag = headers.get('etag')
+        self._last_modified = headers.get('last-modified')
+
+    def _update_rate_limit(self, headers: dict[str, Any]) -> None:
+        if self._rate_limiter:
+            self._rate_limiter.update(self._config.token, headers)
+
+    def _get_conditional_headers(self) -> dict[str, Any]:
+        headers = {}
+
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        elif self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+
+        return headers
+
+    def prefetch_repository(self) -> None:
+        with self._lock:
+            self._get_repository()
+
+    def _get_requester(self) -> Requester:
+        # The repository is only looked up while it is not known to be private, the payload itself is complete
+        if self._repository or not self._requester_provider or self._config.private is None:
+            return self._get_repository().requester
+
+        return self._requester_provider.get_requester(self._config.token)
+
     def _get_repository(self) -> Repository:
         if not self._repository:
             self._repository = self._repository_provider.get_repository(self._config)
@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from context_logger import get_logger
+
+log = get_logger('ReleaseStateStore')
+
+
+@dataclass
+class AssetIdentity:
+    name: str
+    id: Optional[int] = None
+    size: Optional[int] = None
+    updated_at: Optional[str] = None
+    digest: Optional[str] = None
+
+    def is_changed(self, other: 'AssetIdentity') -> bool:
+        if self.id is None or other.id is None:
+            # Legacy entries only recorded the asset name
+            return self.name != other.name
+
+        if self.digest and other.digest:
+            return self.digest != other.digest
+
+        return (self.id, self.size, self.updated_at) != (other.id, other.size, other.updated_at)
+
+
+@dataclass
+class ReleaseState:
+    tag_name: str
+    assets: list[AssetIdentity] = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    published_at: Optional[str] = None
+
+
+class IReleaseStateStore(object):
+
+    def load(self, repo_name: str) -> Optional[ReleaseState]:
+        raise NotImplementedError()
+
+    def save(self, repo_name: str, state: ReleaseState) -> None:
+        raise NotImplementedError()
+
+    def delete(self, repo_name: str) -> None:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        raise NotImplementedError()
+
+
+class ReleaseStateStore(IReleaseStateStore):
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db_path = db_path
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = Lock()
+
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS release_state ('
+                'repo TEXT PRIMARY KEY, tag_name TEXT NOT NULL, assets TEXT NOT NULL, '
+                'etag TEXT, last_modified TEXT, updated_at REAL NOT NULL, published_at TEXT)'
+            )
+
+            columns = [row[1] for row in self._connection.execute('PRAGMA table_info(release_state)')]
+
+            if 'published_at' not in columns:
+                # Stores created before the publish time was recorded are extended in place
+                self._connection.execute('ALTER TABLE release_state ADD COLUMN published_at TEXT')
+
+        log.info('Opened release state store', file=str(db_path))
+
+    def load(self, repo_name: str) -> Optional[ReleaseState]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT tag_name, assets, etag, last_modified, published_at FROM release_state WHERE repo = ?',
+                (repo_name,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        tag_name, assets, etag, last_modified, published_at = row
+
+        try:
+            return ReleaseState(tag_name, self._load_assets(assets), etag, last_modified, published_at)
+        except Exception as error:
+            log.warn('Ignoring invalid stored release state', repo=repo_name, error=error)
+            return None
+
+    def save(self, repo_name: str, state: ReleaseState) -> None:
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO release_state '
+                '(repo, tag_name, assets, etag, last_modified, updated_at, published_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (repo_name, state.tag_name, self._dump_assets(state.assets), state.etag, state.last_modified,
+                 time.time(), state.published_at),
+            )
+
+    def delete(self, repo_name: str) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM release_state WHERE repo = ?', (repo_name,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _load_assets(self, assets: str) -> list[AssetIdentity]:
+        return [AssetIdentity(**asset) if isinstance(asset, dict) else AssetIdentity(asset)
+                for asset in json.loads(assets)]
+
+    def _dump_assets(self, assets: list[AssetIdentity]) -> str:
+        return json.dumps([{key: value for key, value in vars(asset).items() if value is not None}
+                           for asset in assets])
@@ -0,0 +1,25 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+from context_logger import get_logger
+from github.Repository import Repository
+from package_downloader import IRepositoryProvider, ReleaseConfig
+
+from package_collector import IRequesterProvider
+
+log = get_logger('ApiRepositoryProvider')
+
+
+class ApiRepositoryProvider(IRepositoryProvider):
+
+    def __init__(self, requester_provider: IRequesterProvider) -> None:
+        self._requester_provider = requester_provider
+
+    def get_repository(self, config: ReleaseConfig) -> Repository:
+        # Repositories are fetched through the shared requesters, so they use the configured API URL
+        requester = self._requester_provider.get_requester(config.token)
+        log.debug('Fetching repository', repo=config.full_name)
+        headers, data = requester.requestJsonAndCheck('GET', f'/repos/{config.full_name}')
+
+        return Repository(requester, headers, data, completed=True)
@@ -0,0 +1,46 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import os
+from threading import Lock
+from typing import Optional
+
+from context_logger import get_logger
+from github import Github, Auth
+from github.Requester import Requester
+
+log = get_logger('RequesterProvider')
+
+DEFAULT_API_URL = 'https://api.github.com'
+
+
+class IRequesterProvider(object):
+
+    def get_requester(self, token: Optional[str] = None) -> Requester:
+        raise NotImplementedError()
+
+
+class RequesterProvider(IRequesterProvider):
+
+    def __init__(self, api_url: str = DEFAULT_API_URL) -> None:
+        self._api_url = api_url
+        self._requesters: dict[Optional[str], Requester] = {}
+        self._lock = Lock()
+
+    def get_requester(self, token: Optional[str] = None) -> Requester:
+        token = self._resolve_token(token)
+
+        with self._lock:
+            if not (requester := self._requesters.get(token)):
+                log.debug('Creating GitHub API requester', api_url=self._api_url, has_token=token is not None)
+                auth = Auth.Token(token) if token else None
+                requester = Github(auth=auth, base_url=self._api_url).requester
+                self._requesters[token] = requester
+
+            return requester
+
+    def _resolve_token(self, token: Optional[str]) -> Optional[str]:
+        if token and token.startswith('$'):
+            return os.getenv(token[1:])
+        return token
@@ -0,0 +1,205 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional
+
+import requests
+from common_utility import IFileDownloader
+from context_logger import get_logger
+
+from package_collector import IPackageStore
+
+log = get_logger('ResumableFileDownloader')
+
+PARTIAL_SUFFIX = '.part'
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_DIGEST_ALGORITHM = 'sha256'
+
+
+@dataclass
+class ExpectedFile:
+    size: Optional[int] = None
+    digest: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class DownloadVerificationError(Exception):
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class IResumableFileDownloader(IFileDownloader):
+
+    def expect(self, url: str, size: Optional[int], digest: Optional[str], updated_at: Optional[str] = None) -> None:
+        raise NotImplementedError()
+
+    def forget(self, url: str) -> None:
+        raise NotImplementedError()
+
+
+class ResumableFileDownloader(IResumableFileDownloader):
+
+    def __init__(self, download_location: Path, session: Optional[requests.Session] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: float = 60,
+                 package_store: Optional[IPackageStore] = None) -> None:
+        self._download_location = download_location
+        self._package_store = package_store
+        self._session = session or requests.Session()
+        self._chunk_size = chunk_size
+        self._timeout = timeout
+        self._expected: dict[str, ExpectedFile] = {}
+        self._lock = Lock()
+
+    def expect(self, url: str, size: Optional[int], digest: Optional[str], updated_at: Optional[str] = None) -> None:
+        with self._lock:
+            self._expected[url] = ExpectedFile(size, digest, updated_at)
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._expected.pop(url, None)
+
+    def download(self, url: str, file_name: Optional[str] = None, headers: Optional[dict[str, str]] = None,
+                 skip_if_exists: bool = True, chunk_size: Optional[int] = None) -> Path:
+        file_path = self._download_location / (file_name or url.split('/')[-1])
+        expected = self._get_expected(url)
+
+        if skip_if_exists and self._is_downloaded(file_path, expected):
+            log.info('File already exists', file=str(file_path))
+            return file_path
+
+        if self._package_store and expected.digest and (blob_path := self._package_store.get(expected.digest)):
+            # The same content is already stored for another distro or release, so it is not downloaded again
+            self._package_store.link(blob_path, file_path)
+            log.info('Linked stored file', file=str(file_path), digest=expected.digest)
+            return file_path
+
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = file_path.with_name(file_path.name + PARTIAL_SUFFIX)
+
+        log.info('Downloading file', url=url, file_name=file_name, headers=list((headers or {}).keys()))
+
+        digest = self._download_partial(url, partial_path, headers or {}, expected, chunk_size or self._chunk_size)
+        self._verify(partial_path, expected, digest)
+
+        # Only a complete and verified file is moved to its final name, a truncated one never shows up in the pool
+        if self._package_store:
+            self._package_store.link(self._package_store.add(partial_path, digest), file_path)
+        else:
+            os.replace(partial_path, file_path)
+
+        with self._lock:
+            # The digest is kept until the asset is forgotten, so the same asset downloaded into other directories is
+            # linked from the store, a download that was not expected leaves nothing behind
+            if url in self._expected:
+                self._expected[url] = ExpectedFile(file_path.stat().st_size, digest, expected.updated_at)
+
+        log.info('Downloaded file', file=str(file_path), digest=digest)
+
+        return file_path
+
+    def _get_expected(self, url: str) -> ExpectedFile:
+        with self._lock:
+            return self._expected.get(url) or ExpectedFile()
+
+    def _download_partial(self, url: str, partial_path: Path, headers: dict[str, str], expected: ExpectedFile,
+                          chunk_size: int) -> str:
+        hasher = hashlib.new(_get_algorithm(expected.digest))
+        offset = self._get_resume_offset(partial_path, expected)
+
+        if offset:
+            # The data already on disk is hashed again, so the digest covers the whole file
+            self._hash_file(partial_path, hasher, chunk_size)
+            headers = {**headers, 'Range': f'bytes={offset}-'}
+            log.info('Resuming download', url=url, offset=offset)
+
+        with self._session.get(url, headers=headers, stream=True, timeout=self._timeout) as response:
+            if offset and response.status_code == 416:
+                if offset == expected.size:
+                    return f'{hasher.name}:{hasher.hexdigest()}'
+
+                partial_path.unlink()
+
+            response.raise_for_status()
+
+            if offset and response.status_code != 206:
+                log.warn('Server does not support ranges, restarting download', url=url)
+                hasher = hashlib.new(hasher.name)
+                offset = 0
+
+            with open(partial_path, 'ab' if offset else 'wb') as file:
+                for chunk in response.iter_content(chunk_size):
+                    file.write(chunk)
+                    hasher.update(chunk)
+
+        return f'{hasher.name}:{hasher.hexdigest()}'
+
+    def _get_resume_offset(self, partial_path: Path, expected: ExpectedFile) -> int:
+        if not partial_path.exists():
+            return 0
+
+        offset = partial_path.stat().st_size
+
+        # Without an expected size a partial file cannot be told apart from a stale one of another version
+        if not expected.size or offset > expected.size:
+            partial_path.unlink()
+            return 0
+
+        return offset
+
+    def _hash_file(self, path: Path, hasher: Any, chunk_size: int) -> None:
+        with open(path, 'rb') as file:
+            while chunk := file.read(chunk_size):
+                hasher.update(chunk)
+
+    def _verify(self, partial_path: Path, expected: ExpectedFile, digest: str) -> None:
+        size = partial_path.stat().st_size
+
+        if expected.size is not None and size != expected.size:
+            error = f'Size mismatch of {partial_path.name}: expected {expected.size}, got {size}'
+        elif expected.digest and expected.digest.lower() != digest:
+            error = f'Digest mismatch of {partial_path.name}: expected {expected.digest}, got {digest}'
+        else:
+            return
+
+        # A corrupt file cannot be resumed, the next attempt starts over
+        partial_path.unlink()
+        log.error('Downloaded file verification failed', error=error)
+
+        raise DownloadVerificationError(error)
+
+    def _is_downloaded(self, file_path: Path, expected: ExpectedFile) -> bool:
+        if not file_path.exists() or (expected.size is not None and file_path.stat().st_size != expected.size):
+            return False
+
+        if expected.digest:
+            # A re-uploaded asset may keep its name and size, so the content of the existing file is compared
+            hasher = hashlib.new(_get_algorithm(expected.digest))
+            self._hash_file(file_path, hasher, self._chunk_size)
+            return expected.digest.lower() == f'{hasher.name}:{hasher.hexdigest()}'
+
+        if expected.updated_at:
+            # Without a digest a file written before the asset was last updated is taken as stale
+            return file_path.stat().st_mtime >= _parse_time(expected.updated_at)
+
+        return True
+
+
+def _get_algorithm(digest: Optional[str]) -> str:
+    # GitHub reports asset digests as <algorithm>:<hex>
+    if digest and ':' in digest and (algorithm := digest.split(':', 1)[0].lower()) in hashlib.algorithms_available:
+        return algorithm
+
+    return DEFAULT_DIGEST_ALGORITHM
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
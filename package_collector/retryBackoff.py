@@ -0,0 +1,11 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import random
+
+
+def get_retry_delay(attempt: int, delay: float, max_delay: float) -> float:
+    # Exponential backoff with jitter, so retries of many failures do not arrive at the same time
+    backoff = min(max_delay, delay * 2.0 ** (attempt - 1))
+    return backoff / 2 + random.uniform(0, backoff / 2)
@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: 2024 Ferenc Nandor Janky <ferenj@effective-range.com>
+# SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
+# SPDX-License-Identifier: MIT
+
+import hashlib
+from bisect import bisect
+from typing import Optional
+
+from context_logger import get_logger
+
+log = get_logger('ShardRing')
+
+
+class IShardRing(object):
+
+    def owns(self, repo_name: str) -> bool:
+        raise NotImplementedError()
+
+    def get_owner(self, repo_name: str) -> str:
+        raise NotImplementedError()
+
+    def get_peer_url(self, repo_name: str) -> Optional[str]:
+        raise NotImplementedError()
+
+
+class ShardRing(IShardRing):
+
+    def __init__(self, nodes: list[str], node: str, virtual_nodes: int = 100) -> None:
+        if node not in nodes:
+            raise ValueError(f'Node {node} is not one of the shard nodes {nodes}')
+
+        self._node = node
+        # Every node owns many small ranges, so adding or removing a node moves only its share of the sources
+        points = sorted((_hash(f'{peer}#{index}'), peer) for peer in set(nodes) for index in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [peer for _, peer in points]
+
+        log.info('Created shard ring', node=node, nodes=len(set(nodes)), virtual_nodes=virtual_nodes)
+
+    def owns(self, repo_name: str) -> bool:
+        return self.get_owner(repo_name) == self._node
+
+    def get_owner(self, repo_name: str) -> str:
+        # Repository names are case-insensitive on GitHub, webhook payloads may differ from the config in case
+        index = bisect(self._hashes, _hash(repo_name.lower())) % len(self._hashes)
+        return self._nodes[index]
+
+    def get_peer_url(self, repo_name: str) -> Optional[str]:
+        owner = self.get_owner(repo_name)
+
+        if owner == self._node or not owner.startswith(('http://', 'https://')):
+            return None
+
+        return owner.rstrip('/')
+
+
+def create_shard_ring(shard_index: int, shard_count: int, peers: list[str],
+                      node: Optional[str]) -> Optional[ShardRing]:
+    if peers:
+        if not node:
+            raise ValueError('Shard node URL is required with shard peers')
+
+        return ShardRing(peers, node)
+
+    if shard_count > 1:
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f'Shard index {shard_index} is out of range for {shard_count} shards')
+
+        return ShardRing([f'shard-{index}' for index in range(shard_count)], f'shard-{shard_index}')
+
+    return None
+
+
+def _hash(value: str) -> int:
+    # A stable hash, so every node computes the same ring
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], 'big')
@@ -2,21 +2,44 @@
 # SPDX-FileCopyrightText: 2024 Attila Gombos <attila.gombos@effective-range.com>
 # SPDX-License-Identifier: MIT
 
+from dataclasses import dataclass, field, replace
+from threading import Lock
 from typing import Optional
 
 from context_logger import get_logger
 from package_downloader import IRepositoryProvider, ReleaseConfig
 
-from package_collector import IReleaseSource, ReleaseSource
+from package_collector import (
+    IReleaseSource,
+    ReleaseSource,
+    IRateLimiter,
+    IReleaseStateStore,
+    IMetricsRegistry,
+    ReleaseHistoryConfig,
+    IRequesterProvider,
+)
 
 log = get_logger('SourceRegistry')
 
 
+@dataclass
+class RegistryChanges:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.updated)
+
+
 class ISourceRegistry(object):
 
     def register(self, config: ReleaseConfig) -> IReleaseSource:
         raise NotImplementedError()
 
+    def sync(self, configs: list[ReleaseConfig]) -> RegistryChanges:
+        raise NotImplementedError()
+
     def is_registered(self, repo_name: str) -> bool:
         raise NotImplementedError()
 
@@ -29,29 +52,60 @@ class ISourceRegistry(object):
 
 class SourceRegistry(ISourceRegistry):
 
-    def __init__(self, repository_provider: IRepositoryProvider, github_token: Optional[str] = None) -> None:
+    def __init__(self, repository_provider: IRepositoryProvider, github_token: Optional[str] = None,
+                 rate_limiter: Optional[IRateLimiter] = None, state_store: Optional[IReleaseStateStore] = None,
+                 metrics: Optional[IMetricsRegistry] = None,
+                 history_config: Optional[ReleaseHistoryConfig] = None,
+                 requester_provider: Optional[IRequesterProvider] = None) -> None:
         self._repository_provider = repository_provider
+        self._requester_provider = requester_provider
         self._github_token = github_token
+        self._rate_limiter = rate_limiter
+        self._state_store = state_store
+        self._metrics = metrics
+        self._history_config = history_config
         self._release_sources: dict[str, IReleaseSource] = {}
+        self._lock = Lock()
 
     def register(self, config: ReleaseConfig) -> IReleaseSource:
         repo_name = config.full_name
 
-        source = self._release_sources.get(repo_name)
+        with self._lock:
+            source = self._release_sources.get(repo_name)
 
-        if source:
-            log.warn('Release source already registered', repo=repo_name)
-            return source
+            if source:
+                log.warn('Release source already registered', repo=repo_name)
+                return source
 
-        if not config.token and self._github_token:
-            log.info('Using global GitHub token for release source', repo=repo_name)
-            config.token = self._github_token
+            if not config.token and self._github_token:
+                log.info('Using global GitHub token for release source', repo=repo_name)
 
-        source = ReleaseSource(config, self._repository_provider)
-        self._release_sources[repo_name] = source
-        log.info('Registered release source for repository', repo=repo_name, config=config)
+            return self._add_source(config)
 
-        return source
+    def sync(self, configs: list[ReleaseConfig]) -> RegistryChanges:
+        changes = RegistryChanges()
+        new_configs = {config.full_name: config for config in configs}
+
+        with self._lock:
+            for repo_name in list(self._release_sources):
+                if repo_name not in new_configs:
+                    del self._release_sources[repo_name]
+                    changes.removed.append(repo_name)
+                    log.info('Unregistered release source for repository', repo=repo_name)
+
+            for repo_name, config in new_configs.items():
+                if not (source := self._release_sources.get(repo_name)):
+                    self._add_source(config)
+                    changes.added.append(repo_name)
+                elif self._is_changed(source.get_config(), config):
+                    # A changed source starts over, its release state is restored from the state store
+                    self._add_source(config)
+                    changes.updated.append(repo_name)
+
+        log.info('Synchronized release sources', added=len(changes.added), removed=len(changes.removed),
+                 updated=len(changes.updated), sources=len(self._release_sources))
+
+        return changes
 
     def is_registered(self, repo_name: str) -> bool:
         return self._release_sources.get(repo_name) is not None
@@ -66,4 +120,31 @@ class SourceRegistry(ISourceRegistry):
         return source
 
     def get_all(self) -> list[IReleaseSource]:
-        return list(self._release_sources.values())
+        with self._lock:
+            return list(self._release_sources.values())
+
+    def _add_source(self, config: ReleaseConfig) -> IReleaseSource:
+        if not config.token and self._github_token:
+            config.token = self._github_token
+
+        # Only the sources opted in follow the release history, the others check the latest release only
+        history_config = self._history_config \
+            if self._history_config and self._history_config.matches(config.full_name) else None
+
+        source = ReleaseSource(config, self._repository_provider, self._rate_limiter, self._state_store, self._metrics,
+                               history_config, self._requester_provider)
+        self._release_sources[config.full_name] = source
+        log.info('Registered release source for repository', repo=config.full_name, config=config,
+                 history=history_config is not None)
+
+        return source
+
+    def _is_changed(self, current: ReleaseConfig, config: ReleaseConfig) -> bool:
+        if not config.token and self._github_token:
+            config = replace(config, token=self._github_token)
+
+        # Visibility is resolved from the repository when not configured, that alone is not a change
+        if config.private is None:
+            config = replace(config, private=current.private)
+
+        return current != config
@@ -6,21 +6,36 @@ import hashlib
 import hmac
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from threading import Thread, Event
+from threading import Thread
 from typing import Any, Optional
 
+import requests
 from context_logger import get_logger
 from flask import Flask, request, Response, abort
 from package_downloader import IAssetDownloader
-from tenacity import Retrying, stop_after_attempt, wait_fixed, stop_any, stop_when_event_set
 from waitress.server import create_server
 
-from package_collector import ISourceRegistry
+from package_collector import (
+    ISourceRegistry,
+    IWorkQueue,
+    CoalescingWorkQueue,
+    WorkQueueStats,
+    WorkQueueFullError,
+    IMetricsRegistry,
+    MetricsRegistry,
+    IShardRing,
+    get_retry_delay,
+    download_releases,
+)
+from package_collector.metricsServer import add_metrics_endpoint
 
 log = get_logger('WebhookServer')
 
+FORWARDED_HEADER = 'X-Package-Collector-Forwarded'
+FORWARDED_REQUEST_HEADERS = ['Content-Type', 'X-GitHub-Event', 'X-GitHub-Delivery', 'X-Hub-Signature-256']
+FORWARD_TIMEOUT = 5
+
 
 @dataclass
 class WebhookServerConfig:
@@ -28,6 +43,11 @@ class WebhookServerConfig:
     secret: str
     retry: int
     delay: float
+    workers: int = 3
+    max_delay: float = 600
+    queue_high_water: int = 1000
+    queue_low_water: int = 800
+    retry_after: int = 60
 
 
 class AssetsNotAvailableError(Exception):
@@ -48,25 +68,48 @@ class IWebhookServer(object):
     def is_running(self) -> bool:
         raise NotImplementedError()
 
+    def get_queue_stats(self) -> WorkQueueStats:
+        raise NotImplementedError()
+
 
 class WebhookServer(IWebhookServer):
 
     def __init__(self, source_registry: ISourceRegistry, asset_downloader: IAssetDownloader,
-                 config: WebhookServerConfig) -> None:
+                 config: WebhookServerConfig, work_queue: Optional[IWorkQueue] = None,
+                 metrics: Optional[IMetricsRegistry] = None, shard_ring: Optional[IShardRing] = None) -> None:
         self._source_registry = source_registry
+        self._shard_ring = shard_ring
         self._asset_downloader = asset_downloader
         self._port = config.port
         self._secret = self._get_secret(config.secret)
         self._retry = config.retry
         self._delay = config.delay
+        self._max_delay = max(config.delay, config.max_delay)
         self._app = Flask(__name__)
-        self._server = create_server(self._app, listen=f'*:{self._port}')
+        self._server: Any = None
         self._thread = Thread(target=self._start_server)
         self._is_running = False
-        self._executor = ThreadPoolExecutor(max_workers=3)
-        self._events: dict[str, Event] = {}
+        self._retry_after = config.retry_after
+        self._work_queue = work_queue or CoalescingWorkQueue(
+            config.workers, 'WebhookWorker', config.queue_high_water, config.queue_low_water
+        )
+
+        self._metrics = metrics or MetricsRegistry()
+        self._events_received = self._metrics.counter('package_collector_webhook_events_total',
+                                                      'Received release events by action', ('action',))
+        self._events_merged = self._metrics.counter('package_collector_webhook_merged_total',
+                                                    'Release events merged into a pending download')
+        self._events_rejected = self._metrics.counter('package_collector_webhook_rejected_total',
+                                                      'Release events rejected as the queue was full')
+        self._retries = self._metrics.counter('package_collector_webhook_retries_total',
+                                              'Scheduled download retries')
+        self._events_not_owned = self._metrics.counter('package_collector_webhook_not_owned_total',
+                                                       'Release events of other shards by outcome', ('outcome',))
+        self._metrics.gauge('package_collector_webhook_queue_jobs', 'Webhook download jobs by state',
+                            self._collect_queue_stats, ('state',))
 
         self._set_up_webhook_endpoint()
+        add_metrics_endpoint(self._app, self._metrics)
 
     def __enter__(self) -> 'WebhookServer':
         return self
@@ -76,20 +119,29 @@ class WebhookServer(IWebhookServer):
 
     def start(self) -> None:
         log.info('Starting server', port=self._port)
+        # The port is bound only when the server is started, not when it is created
+        self._server = create_server(self._app, listen=f'*:{self._port}')
+        self._work_queue.start()
         self._thread.start()
 
     def stop(self) -> None:
         log.info('Shutting down')
-        for event in self._events.values():
-            event.set()
-        self._executor.shutdown()
-        self._server.close()
-        self._thread.join()
+        self._work_queue.shutdown()
+
+        if self._server:
+            self._server.close()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
         self._is_running = False
 
     def is_running(self) -> bool:
         return self._is_running
 
+    def get_queue_stats(self) -> WorkQueueStats:
+        return self._work_queue.get_stats()
+
     def _start_server(self) -> None:
         try:
             self._is_running = True
@@ -142,35 +194,112 @@ class WebhookServer(IWebhookServer):
         tag = release['tag_name']
 
         log.info('Processing release', repo=repo_name, action=action, tag=tag)
+        self._events_received.inc(labels=(action,))
 
-        if self._source_registry.is_registered(repo_name):
-            event = self._get_event(repo_name)
-
-            retryer = Retrying(stop=stop_any(stop_after_attempt(self._retry), stop_when_event_set(event)),
-                               wait=wait_fixed(self._delay), reraise=True)
+        if self._shard_ring and not self._shard_ring.owns(repo_name):
+            return self._handle_not_owned(repo_name)
 
-            self._executor.submit(retryer, self._download_asset_from_api, repo_name)
+        if self._source_registry.is_registered(repo_name):
+            try:
+                if self._is_downloadable(release):
+                    private = payload['repository'].get('private')
+                    queued = self._work_queue.submit(
+                        repo_name, lambda: self._download_asset_from_payload(repo_name, release, private)
+                    )
+                else:
+                    queued = self._work_queue.submit(repo_name, lambda: self._download_asset_with_retry(repo_name, 1))
+            except WorkQueueFullError as error:
+                log.warn('Rejecting release event', repo=repo_name, reason=error.message,
+                         retry_after=self._retry_after)
+                self._events_rejected.inc()
+                return Response(status=503, headers={'Retry-After': str(self._retry_after)})
+
+            if not queued:
+                self._events_merged.inc()
+
+            stats = self._work_queue.get_stats()
+            log.debug('Queued release download', repo=repo_name, depth=stats.depth, running=stats.running,
+                      delayed=stats.delayed, merged=stats.merged, rejected=stats.rejected)
 
             return Response(status=200)
         else:
             log.warn('Repository not registered, skipping', repo=repo_name)
             return Response(status=204)
 
+    def _handle_not_owned(self, repo_name: str) -> Response:
+        peer_url = self._shard_ring.get_peer_url(repo_name) if self._shard_ring else None
+
+        # A forwarded event is never forwarded again, so peers with different views of the ring cannot loop
+        if not peer_url or request.headers.get(FORWARDED_HEADER):
+            log.info('Repository owned by another shard, skipping', repo=repo_name)
+            self._events_not_owned.inc(labels=('ignored',))
+            return Response(status=204)
+
+        headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+        headers[FORWARDED_HEADER] = 'true'
+
+        try:
+            response = requests.post(f'{peer_url}/webhook', data=request.data, headers=headers,
+                                     timeout=FORWARD_TIMEOUT)
+            log.info('Forwarded release event to owner shard', repo=repo_name, peer=peer_url,
+                     status=response.status_code)
+            self._events_not_owned.inc(labels=('forwarded',))
+            return Response(status=response.status_code, headers=_get_retry_after(response.headers))
+        except requests.RequestException as error:
+            log.warn('Failed to forward release event', repo=repo_name, peer=peer_url, error=str(error))
+            self._events_not_owned.inc(labels=('failed',))
+            return Response(status=502)
+
+    def _is_downloadable(self, release: dict[str, Any]) -> bool:
+        # Drafts and pre-releases are not served by the latest release endpoint, so they are left to the API check
+        return bool(release.get('assets')) and not release.get('draft') and not release.get('prerelease')
+
+    def _download_asset_from_payload(self, repo_name: str, release_data: dict[str, Any],
+                                     private: Optional[bool]) -> None:
+        source = self._source_registry.get(repo_name)
+        config = source.get_config()
+
+        if config.private is None and private is not None:
+            # The event tells whether the repository is private, so it is not looked up before the download
+            config.private = private
+
+        if source.check_release_data(release_data):
+            download_releases(source, self._asset_downloader)
+        else:
+            log.info('Release already collected', repo=repo_name, tag=release_data['tag_name'])
+
+    def _download_asset_with_retry(self, repo_name: str, attempt: int) -> None:
+        try:
+            self._download_asset_from_api(repo_name)
+        except AssetsNotAvailableError:
+            if attempt >= self._retry:
+                log.warn('Giving up waiting for assets', repo=repo_name, attempts=attempt)
+                return
+
+            delay = get_retry_delay(attempt, self._delay, self._max_delay)
+            log.info('Scheduling retry', repo=repo_name, attempt=attempt + 1, delay=round(delay, 3))
+            self._retries.inc()
+
+            try:
+                # The retry waits in the work queue, and a newer event for the repository takes precedence over it
+                self._work_queue.submit(repo_name, lambda: self._download_asset_with_retry(repo_name, attempt + 1),
+                                        delay, replace=False)
+            except WorkQueueFullError as error:
+                log.warn('Dropping retry', repo=repo_name, attempt=attempt + 1, reason=error.message)
+
+    def _collect_queue_stats(self) -> dict[tuple[str, ...], float]:
+        stats = self._work_queue.get_stats()
+        return {('pending',): stats.depth, ('running',): stats.running, ('delayed',): stats.delayed}
+
     def _download_asset_from_api(self, repo_name: str) -> None:
         source = self._source_registry.get(repo_name)
 
         if source.check_latest_release():
-            if release := source.get_release():
-                self._asset_downloader.download(source.get_config(), release)
+            download_releases(source, self._asset_downloader)
         else:
             log.warn('Assets not available yet', repo=repo_name)
             raise AssetsNotAvailableError('Assets not available yet')
 
-    def _get_event(self, repo_name: str) -> Event:
-        if repo_name in self._events:
-            self._events[repo_name].set()
-
-        event = Event()
-        self._events[repo_name] = event
 
-        return event
+def _get_retry_after(headers: Any) -> dict[str, str]:
+    return {'Retry-After': headers['Retry-After']} if 'Retry-After' in headers else {}
@@ -5,7 +5,7 @@ setup(
     description='Debian package collector to download .deb packages from new releases',
     author='Ferenc Nandor Janky & Attila Gombos',
     author_email='info@effective-range.com',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     scripts=['bin/debian-package-collector.py'],
     data_files=[('config', ['config/debian-package-collector.conf'])],
     use_scm_version=True,
@@ -13,7 +13,8 @@ setup(
     install_requires=[
         'flask',
         'waitress',
-        'tenacity',
+        'aiohttp',
+        'requests',
         'python-context-logger@git+https://github.com/EffectiveRange/python-context-logger.git@latest',
         'debian-package-downloader@git+https://github.com/EffectiveRange/debian-package-downloader.git@latest',
     ],
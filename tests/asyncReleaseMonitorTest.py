@@ -0,0 +1,172 @@
+import asyncio
+import json
+import unittest
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import MagicMock, AsyncMock
+
+from context_logger import setup_logging
+from github.GitRelease import GitRelease
+from github.Requester import Requester
+from package_downloader import IAssetDownloader, ReleaseConfig
+from test_utility import wait_for_assertion
+
+from package_collector import (
+    AsyncReleaseMonitor,
+    IAsyncHttpClient,
+    IRequesterProvider,
+    ISourceRegistry,
+    ReleaseSource,
+)
+
+
+class AsyncReleaseMonitorTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_downloads_release_assets_when_new_releases_found(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=True)
+        source2 = create_source('repo2', is_new_release=False)
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1, source2])
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        release_monitor.stop()
+        asset_downloader.download.assert_called_once_with(source1.config, source1.release)
+        source1.check_release_response.assert_called_once_with(
+            requester_provider.get_requester.return_value, 200, {'etag': '"etag1"'}, '{}'
+        )
+        http_client.get.assert_any_call(
+            'https://api.github.com/repos/owner/repo2/releases/latest',
+            {
+                'Accept': 'application/vnd.github+json',
+                'User-Agent': 'debian-package-collector',
+                'Authorization': 'Bearer token',
+                'If-None-Match': '"etag0"',
+            },
+        )
+        http_client.close.assert_awaited_once()
+
+    def test_resolves_private_flag_when_not_set(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=False)
+        source1.config.private = None
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1])
+        http_client.get.side_effect = [(200, {}, json.dumps({'private': True})), (304, {}, '')]
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        release_monitor.stop()
+        self.assertTrue(source1.config.private)
+        source1.check_release_response.assert_called_once_with(
+            requester_provider.get_requester.return_value, 304, {}, ''
+        )
+
+    def test_skips_source_when_request_fails(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=True)
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1])
+        http_client.get.side_effect = Exception('Connection failed')
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        release_monitor.stop()
+        source1.check_release_response.assert_not_called()
+        asset_downloader.download.assert_not_called()
+
+    def test_not_checks_when_not_started(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=True)
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1])
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        http_client.get.assert_not_called()
+
+    def test_cancels_in_flight_requests_when_stopped(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=True)
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1])
+
+        async def get(url, headers):
+            await asyncio.sleep(60)
+
+        http_client.get.side_effect = get
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+        release_monitor.start()
+        thread = Thread(target=release_monitor.check_all)
+        thread.start()
+        wait_for_assertion(1, http_client.get.assert_called_once)
+
+        # When
+        release_monitor.stop()
+
+        # Then
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        source1.check_release_response.assert_not_called()
+        asset_downloader.download.assert_not_called()
+
+    def test_downloads_release_asset_when_checking_single_source(self):
+        # Given
+        source1 = create_source('repo1', is_new_release=True)
+        source1.check_latest_release.return_value = True
+        source_registry, asset_downloader, requester_provider, http_client = create_components([source1])
+        source_registry.get.return_value = source1
+        release_monitor = AsyncReleaseMonitor(source_registry, asset_downloader, requester_provider, http_client)
+
+        # When
+        release_monitor.check('owner/repo1')
+
+        # Then
+        asset_downloader.download.assert_called_once_with(source1.config, source1.release)
+        http_client.get.assert_not_called()
+
+
+def create_source(repo, is_new_release=True):
+    source = MagicMock(spec=ReleaseSource)
+    source.config = ReleaseConfig(owner='owner', repo=repo, token='token', private=False)
+    source.release = MagicMock(spec=GitRelease)
+    source.get_config.return_value = source.config
+    source.get_release.return_value = source.release
+    source.get_releases.return_value = [source.release]
+    source.get_conditional_headers.return_value = {'If-None-Match': '"etag0"'}
+    source.check_release_response.return_value = is_new_release
+    return source
+
+
+def create_components(sources):
+    source_registry = MagicMock(spec=ISourceRegistry)
+    source_registry.get_all.return_value = sources
+    asset_downloader = MagicMock(spec=IAssetDownloader)
+    requester_provider = MagicMock(spec=IRequesterProvider)
+    requester_provider.get_requester.return_value = MagicMock(spec=Requester)
+    http_client = MagicMock(spec=IAsyncHttpClient)
+    http_client.get = AsyncMock(return_value=(200, {'etag': '"etag1"'}, '{}'))
+    http_client.close = AsyncMock()
+    return source_registry, asset_downloader, requester_provider, http_client
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from benchmarks.benchmarkRunner import BenchmarkResult, _save_baseline, _compare_with_baseline
+
+
+class BenchmarkRunnerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector-benchmark', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_no_regressions_when_results_within_tolerance(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            baseline_path = Path(temp_dir) / 'baseline.json'
+            _save_baseline(baseline_path, [create_result('check_all', 1.0, 100, 1000)])
+            results = [create_result('check_all', 1.2, 110, 1100)]
+
+            # When
+            regressions = _compare_with_baseline(baseline_path, results, 0.25)
+
+            # Then
+            self.assertEqual([], regressions)
+
+    def test_returns_regressions_when_results_exceed_tolerance(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            baseline_path = Path(temp_dir) / 'baseline.json'
+            _save_baseline(baseline_path, [create_result('check_all', 1.0, 100, 1000)])
+            results = [create_result('check_all', 1.3, 126, 1000)]
+
+            # When
+            regressions = _compare_with_baseline(baseline_path, results, 0.25)
+
+            # Then
+            self.assertEqual(['check_all sources=100 cycle_time: 1.3 > 1.0',
+                              'check_all sources=100 api_calls: 126 > 100'], regressions)
+
+    def test_skips_results_without_baseline_and_unmeasured_values(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            baseline_path = Path(temp_dir) / 'baseline.json'
+            _save_baseline(baseline_path, [create_result('check_all', 1.0, 100, 0)])
+            results = [create_result('check_all', 1.0, 100, 5000), create_result('webhook', 9.0, 900, 9000)]
+
+            # When
+            regressions = _compare_with_baseline(baseline_path, results, 0.25)
+
+            # Then
+            self.assertEqual([], regressions)
+
+
+def create_result(scenario, cycle_time, api_calls, peak_rss_kb):
+    return BenchmarkResult(scenario, 100, cycle_time, 100 / cycle_time, api_calls, 0, peak_rss_kb)
+
+
+if __name__ == '__main__':
+    unittest.main()
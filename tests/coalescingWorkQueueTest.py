@@ -0,0 +1,197 @@
+import unittest
+from threading import Event, Thread
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from test_utility import wait_for_assertion
+
+from package_collector import CoalescingWorkQueue, WorkQueueStats, WorkQueueFullError
+
+
+class CoalescingWorkQueueTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_runs_submitted_job(self):
+        # Given
+        job = MagicMock()
+        work_queue = CoalescingWorkQueue(2)
+        work_queue.start()
+
+        # When
+        result = work_queue.submit('owner/repo1', job)
+
+        # Then
+        wait_for_assertion(1, job.assert_called_once)
+        work_queue.shutdown()
+        self.assertTrue(result)
+
+    def test_merges_pending_jobs_of_same_key(self):
+        # Given
+        started, blocker = Event(), Event()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo0', lambda: started.set() or blocker.wait())
+        started.wait(1)
+        job1, job2, job3 = MagicMock(), MagicMock(), MagicMock()
+
+        # When
+        results = [work_queue.submit('owner/repo1', job) for job in [job1, job2, job3]]
+
+        # Then
+        self.assertEqual([True, False, False], results)
+        self.assertEqual(WorkQueueStats(depth=1, running=1, submitted=4, merged=2), work_queue.get_stats())
+        blocker.set()
+        wait_for_assertion(1, job3.assert_called_once)
+        work_queue.shutdown()
+        job1.assert_not_called()
+        job2.assert_not_called()
+
+    def test_runs_job_submitted_while_same_key_running_after_it_finished(self):
+        # Given
+        started, blocker = Event(), Event()
+        calls = []
+
+        def running_job():
+            started.set()
+            blocker.wait()
+            calls.append('running')
+
+        work_queue = CoalescingWorkQueue(2)
+        work_queue.start()
+        work_queue.submit('owner/repo1', running_job)
+        started.wait(1)
+
+        # When
+        work_queue.submit('owner/repo1', lambda: calls.append('next'))
+
+        # Then
+        self.assertEqual(WorkQueueStats(depth=1, running=1, submitted=2, merged=0), work_queue.get_stats())
+        blocker.set()
+        wait_for_assertion(1, lambda: self.assertEqual(['running', 'next'], calls))
+        work_queue.shutdown()
+
+    def test_runs_delayed_job_after_delay_without_blocking_worker(self):
+        # Given
+        delayed_job, job = MagicMock(), MagicMock()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo1', delayed_job, 0.5)
+
+        # When
+        work_queue.submit('owner/repo2', job)
+
+        # Then
+        wait_for_assertion(0.3, job.assert_called_once)
+        delayed_job.assert_not_called()
+        self.assertEqual(1, work_queue.get_stats().delayed)
+        wait_for_assertion(1, delayed_job.assert_called_once)
+        work_queue.shutdown()
+
+    def test_replaces_delayed_job_with_immediate_job_of_same_key(self):
+        # Given
+        delayed_job, job = MagicMock(), MagicMock()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo1', delayed_job, 60)
+
+        # When
+        work_queue.submit('owner/repo1', job)
+
+        # Then
+        wait_for_assertion(1, job.assert_called_once)
+        work_queue.shutdown()
+        delayed_job.assert_not_called()
+
+    def test_keeps_pending_job_when_not_replacing(self):
+        # Given
+        started, blocker = Event(), Event()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo0', lambda: started.set() or blocker.wait())
+        started.wait(1)
+        job, retry_job = MagicMock(), MagicMock()
+        work_queue.submit('owner/repo1', job)
+
+        # When
+        result = work_queue.submit('owner/repo1', retry_job, 0, replace=False)
+
+        # Then
+        self.assertFalse(result)
+        blocker.set()
+        wait_for_assertion(1, job.assert_called_once)
+        work_queue.shutdown()
+        retry_job.assert_not_called()
+
+    def test_rejects_new_jobs_when_high_water_reached_until_drained_to_low_water(self):
+        # Given
+        started, blocker = Event(), Event()
+        work_queue = CoalescingWorkQueue(1, high_water=3, low_water=1)
+        work_queue.start()
+        work_queue.submit('owner/repo0', lambda: started.set() or blocker.wait())
+        started.wait(1)
+        jobs = [MagicMock() for _ in range(3)]
+
+        for index, job in enumerate(jobs):
+            work_queue.submit(f'owner/repo{index + 1}', job, 60)
+
+        # When
+        with self.assertRaises(WorkQueueFullError):
+            work_queue.submit('owner/repo4', MagicMock())
+
+        # Then
+        self.assertFalse(work_queue.submit('owner/repo1', jobs[0], 0))
+        self.assertEqual(WorkQueueStats(depth=3, running=1, submitted=6, merged=1, delayed=2, rejected=1,
+                                        saturated=True), work_queue.get_stats())
+        blocker.set()
+        wait_for_assertion(1, jobs[0].assert_called_once)
+        work_queue.submit('owner/repo2', jobs[1], 0)
+        wait_for_assertion(1, jobs[1].assert_called_once)
+        self.assertTrue(work_queue.submit('owner/repo4', MagicMock()))
+        self.assertFalse(work_queue.get_stats().saturated)
+        work_queue.shutdown()
+
+    def test_continues_when_job_fails(self):
+        # Given
+        job = MagicMock()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo1', MagicMock(side_effect=Exception('Job failed')))
+
+        # When
+        work_queue.submit('owner/repo2', job)
+
+        # Then
+        wait_for_assertion(1, job.assert_called_once)
+        work_queue.shutdown()
+
+    def test_drops_pending_jobs_when_shut_down(self):
+        # Given
+        blocker = Event()
+        job = MagicMock()
+        work_queue = CoalescingWorkQueue(1)
+        work_queue.start()
+        work_queue.submit('owner/repo0', blocker.wait)
+        work_queue.submit('owner/repo1', job)
+
+        # When
+        thread = Thread(target=work_queue.shutdown)
+        thread.start()
+
+        # Then
+        wait_for_assertion(1, lambda: self.assertEqual(0, work_queue.get_stats().depth))
+        blocker.set()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(work_queue.submit('owner/repo1', job))
+        job.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
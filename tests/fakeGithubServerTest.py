@@ -0,0 +1,302 @@
+import hashlib
+import hmac
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import TestCase, mock
+
+import requests
+from context_logger import setup_logging
+
+from benchmarks.fakeGithub import FakeGithub, FakeGithubConfig
+from benchmarks.fakeGithubServer import FakeGithubServer
+from package_collector import ResumableFileDownloader
+
+CONTENT = b'asset1.deb' * 10
+
+
+class FakeGithubServerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('fake-github-server', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_not_modified_latest_release_when_etag_matches(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            etag = client.get('/repos/owner1/repo1/releases/latest').headers['etag']
+
+            # When
+            response = client.get('/repos/owner1/repo1/releases/latest', headers={'If-None-Match': etag})
+
+        # Then
+        self.assertEqual('"owner1/repo1@1.1.0"', etag)
+        self.assertEqual(304, response.status_code)
+
+    def test_returns_latest_release_again_when_new_release_published(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            etag = client.get('/repos/owner1/repo1/releases/latest').headers['etag']
+            github.publish('owner1/repo1', '1.2.0')
+
+            # When
+            response = client.get('/repos/owner1/repo1/releases/latest', headers={'If-None-Match': etag})
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('1.2.0', response.get_json()['tag_name'])
+        self.assertEqual('"owner1/repo1@1.2.0"', response.headers['etag'])
+
+    def test_returns_not_modified_releases_when_etag_matches(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            etag = client.get('/repos/owner1/repo1/releases').headers['etag']
+
+            # When
+            response = client.get('/repos/owner1/repo1/releases', headers={'If-None-Match': etag})
+
+        # Then
+        self.assertEqual('"owner1/repo1@2"', etag)
+        self.assertEqual(304, response.status_code)
+
+    def test_returns_releases_newest_first_by_page(self):
+        # Given
+        github = create_github()
+        github.publish('owner1/repo1', '1.2.0')
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+
+            # When
+            pages = [client.get(f'/repos/owner1/repo1/releases?per_page=2&page={page}') for page in range(1, 4)]
+
+        # Then
+        self.assertEqual([200, 200, 200], [response.status_code for response in pages])
+        self.assertEqual([['1.2.0', '1.1.0'], ['1.0.0'], []],
+                         [[release['tag_name'] for release in response.get_json()] for response in pages])
+
+    def test_returns_not_found_releases_when_repository_unknown(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+
+            # When
+            response = client.get('/repos/owner1/unknown/releases')
+
+        # Then
+        self.assertEqual(404, response.status_code)
+
+    def test_returns_forbidden_with_rate_limit_headers_when_rate_limit_exceeded(self):
+        # Given
+        github = create_github(rate_limit=1)
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            first_response = client.get('/repos/owner1/repo1/releases/latest')
+
+            # When
+            response = client.get('/repos/owner1/repo1/releases/latest')
+
+        # Then
+        self.assertEqual(200, first_response.status_code)
+        self.assertEqual(403, response.status_code)
+        self.assertEqual('API rate limit exceeded', response.get_json()['message'])
+        self.assertEqual('1', response.headers['x-ratelimit-limit'])
+        self.assertEqual('0', response.headers['x-ratelimit-remaining'])
+        self.assertEqual('1', response.headers['x-ratelimit-used'])
+        self.assertIn('x-ratelimit-reset', response.headers)
+
+    def test_sends_signed_release_webhook_when_release_published(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0, 'http://localhost:8080/webhook', 'secret') as server, \
+                mock.patch('benchmarks.fakeGithubServer.requests.post') as post:
+            post.return_value.status_code = 200
+
+            # When
+            server.publish('owner1/repo1', '1.2.0')
+
+        # Then
+        post.assert_called_once()
+        self.assertEqual('http://localhost:8080/webhook', post.call_args.args[0])
+        body = post.call_args.kwargs['data']
+        headers = post.call_args.kwargs['headers']
+        signature = 'sha256=' + hmac.new(b'secret', msg=body, digestmod=hashlib.sha256).hexdigest()
+        self.assertEqual(signature, headers['X-Hub-Signature-256'])
+        self.assertEqual('release', headers['X-GitHub-Event'])
+        payload = json.loads(body)
+        self.assertEqual('published', payload['action'])
+        self.assertEqual('1.2.0', payload['release']['tag_name'])
+        self.assertEqual('owner1/repo1', payload['repository']['full_name'])
+
+    def test_downloads_asset_content_from_asset_url(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['url'].removeprefix('http://localhost'),
+                                  headers={'Accept': 'application/octet-stream'})
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(CONTENT, response.data)
+        self.assertEqual('bytes', response.headers['Accept-Ranges'])
+
+    def test_returns_asset_metadata_from_asset_url_without_octet_stream_accepted(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['url'].removeprefix('http://localhost'))
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(asset, response.get_json())
+
+    def test_downloads_asset_content_from_browser_download_url(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['browser_download_url'].removeprefix('http://localhost'))
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(CONTENT, response.data)
+
+    def test_returns_partial_content_from_asset_url_when_range_requested(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['url'].removeprefix('http://localhost'),
+                                  headers={'Accept': 'application/octet-stream', 'Range': 'bytes=40-'})
+
+        # Then
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(CONTENT[40:], response.data)
+        self.assertEqual('bytes 40-99/100', response.headers['Content-Range'])
+
+    def test_returns_partial_content_from_browser_download_url_when_range_requested(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['browser_download_url'].removeprefix('http://localhost'),
+                                  headers={'Range': 'bytes=10-19'})
+
+        # Then
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(CONTENT[10:20], response.data)
+        self.assertEqual('bytes 10-19/100', response.headers['Content-Range'])
+
+    def test_resumes_partial_download_from_browser_download_url(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            github = create_github()
+            session = requests.Session()
+            responses = []
+            session.hooks['response'].append(lambda response, *args, **kwargs: responses.append(response))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            (Path(temp_dir) / 'asset1.deb.part').write_bytes(CONTENT[:40])
+
+            with FakeGithubServer(github, 0) as server:
+                server.start()
+                asset = get_latest_asset(server._app.test_client())
+                url = asset['browser_download_url'].replace('localhost', f'127.0.0.1:{get_port(server)}')
+                downloader.expect(url, asset['size'], None)
+
+                # When
+                file_path = downloader.download(url)
+
+            # Then
+            self.assertEqual(CONTENT, file_path.read_bytes())
+            self.assertEqual([(206, 'bytes 40-99/100')],
+                             [(response.status_code, response.headers['Content-Range']) for response in responses])
+
+    def test_returns_range_not_satisfiable_when_range_starts_after_content(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+            asset = get_latest_asset(client)
+
+            # When
+            response = client.get(asset['browser_download_url'].removeprefix('http://localhost'),
+                                  headers={'Range': 'bytes=100-'})
+
+        # Then
+        self.assertEqual(416, response.status_code)
+        self.assertEqual('bytes */100', response.headers['Content-Range'])
+
+    def test_returns_not_found_when_downloading_unknown_asset(self):
+        # Given
+        github = create_github()
+
+        with FakeGithubServer(github, 0) as server:
+            client = server._app.test_client()
+
+            # When
+            response = client.get('/owner1/repo1/releases/download/1.1.0/unknown.deb')
+
+        # Then
+        self.assertEqual(404, response.status_code)
+
+
+def create_github(rate_limit=0):
+    github = FakeGithub(FakeGithubConfig(api_url='http://localhost', asset_size=len(CONTENT), rate_limit=rate_limit))
+    github.load({'repositories': [{'owner': 'owner1', 'repo': 'repo1', 'releases': [
+        {'tag_name': '1.0.0', 'assets': ['asset1.deb']},
+        {'tag_name': '1.1.0', 'assets': ['asset1.deb']},
+    ]}]})
+    return github
+
+
+def get_latest_asset(client):
+    return client.get('/repos/owner1/repo1/releases/latest').get_json()['assets'][0]
+
+
+def get_port(server):
+    # Listening on every interface with port 0 binds each address family to its own port
+    return next(port for host, port in server._server.effective_listen if host == '0.0.0.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
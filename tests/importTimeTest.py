@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+
+# Measured at about 0.35 seconds, twice that leaves room for slower build machines, the server stack is caught by
+# checking the imported modules
+IMPORT_TIME_BUDGET = 0.7
+
+MEASURE_IMPORT = '''
+import json, sys, time
+start_time = time.perf_counter()
+import package_collector
+print(json.dumps({'duration': time.perf_counter() - start_time, 'modules': sorted(sys.modules)}))
+'''
+
+
+class ImportTimeTest(TestCase):
+
+    def setUp(self):
+        print()
+
+    def test_imports_package_within_budget(self):
+        # When
+        result = min(measure_import()['duration'] for _ in range(3))
+
+        # Then
+        print(f'Import time: {result:.3f}s')
+        self.assertLess(result, IMPORT_TIME_BUDGET)
+
+    def test_does_not_import_server_stack_with_package(self):
+        # When
+        result = measure_import()['modules']
+
+        # Then
+        for module in ['flask', 'waitress', 'aiohttp', 'package_collector.webhookServer']:
+            self.assertNotIn(module, result)
+
+    def test_imports_server_on_first_use(self):
+        # When
+        from package_collector import WebhookServer
+
+        # Then
+        self.assertEqual('package_collector.webhookServer', WebhookServer.__module__)
+
+
+def measure_import():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run([sys.executable, '-c', MEASURE_IMPORT], env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from threading import Thread
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import MetricsRegistry
+
+
+class MetricsRegistryTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_renders_counter_with_labels(self):
+        # Given
+        metrics = MetricsRegistry()
+        counter = metrics.counter('test_errors_total', 'Test errors', ('type',))
+        counter.inc(labels=('ValueError',))
+        counter.inc(2, labels=('KeyError',))
+
+        # When
+        result = metrics.render()
+
+        # Then
+        self.assertEqual(
+            '# HELP test_errors_total Test errors\n'
+            '# TYPE test_errors_total counter\n'
+            'test_errors_total{type="KeyError"} 2.0\n'
+            'test_errors_total{type="ValueError"} 1.0\n',
+            result,
+        )
+
+    def test_renders_histogram_with_cumulative_buckets(self):
+        # Given
+        metrics = MetricsRegistry()
+        histogram = metrics.histogram('test_seconds', 'Test duration', ('repo',), (0.1, 1.0))
+
+        for value in [0.05, 0.5, 0.7, 5.0]:
+            histogram.observe(value, ('owner/repo1',))
+
+        # When
+        result = metrics.render()
+
+        # Then
+        self.assertEqual(
+            '# HELP test_seconds Test duration\n'
+            '# TYPE test_seconds histogram\n'
+            'test_seconds_bucket{repo="owner/repo1",le="0.1"} 1.0\n'
+            'test_seconds_bucket{repo="owner/repo1",le="1.0"} 3.0\n'
+            'test_seconds_bucket{repo="owner/repo1",le="+Inf"} 4.0\n'
+            'test_seconds_sum{repo="owner/repo1"} 6.25\n'
+            'test_seconds_count{repo="owner/repo1"} 4.0\n',
+            result,
+        )
+
+    def test_renders_gauge_from_callback(self):
+        # Given
+        metrics = MetricsRegistry()
+        metrics.gauge('test_jobs', 'Test jobs', lambda: {('pending',): 3, ('running',): 1}, ('state',))
+
+        # When
+        result = metrics.render()
+
+        # Then
+        self.assertIn('test_jobs{state="pending"} 3.0\ntest_jobs{state="running"} 1.0\n', result)
+
+    def test_sums_counter_updates_of_multiple_threads(self):
+        # Given
+        metrics = MetricsRegistry()
+        counter = metrics.counter('test_total', 'Test counter')
+
+        def increment():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [Thread(target=increment) for _ in range(4)]
+
+        # When
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counter.inc()
+
+        # Then
+        self.assertEqual(4001, counter.get())
+        self.assertIn('test_total 4001.0\n', metrics.render())
+
+    def test_returns_same_metric_when_registered_twice(self):
+        # Given
+        metrics = MetricsRegistry()
+        counter = metrics.counter('test_total', 'Test counter')
+
+        # When
+        result = metrics.counter('test_total', 'Test counter')
+
+        # Then
+        self.assertIs(counter, result)
+
+    def test_raises_error_when_registered_with_other_type(self):
+        # Given
+        metrics = MetricsRegistry()
+        metrics.counter('test_total', 'Test counter')
+
+        # When
+        with self.assertRaises(ValueError) as context:
+            metrics.histogram('test_total', 'Test histogram')
+
+        # Then
+        self.assertIn('counter', str(context.exception))
+
+    def test_escapes_label_values(self):
+        # Given
+        metrics = MetricsRegistry()
+        metrics.counter('test_total', 'Test counter', ('name',)).inc(labels=('a"b\\c\nd',))
+
+        # When
+        result = metrics.render()
+
+        # Then
+        self.assertIn('test_total{name="a\\"b\\\\c\\nd"} 1.0\n', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+
+from package_collector import MetricsServer, IMetricsRegistry
+
+
+class MetricsServerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_startup_and_shutdown(self):
+        # Given
+        metrics = MagicMock(spec=IMetricsRegistry)
+
+        # When
+        with MetricsServer(metrics, 0) as metrics_server:
+            metrics_server.start()
+
+            # Then
+            self.assertTrue(metrics_server.is_running())
+
+        self.assertFalse(metrics_server.is_running())
+
+    def test_returns_rendered_metrics(self):
+        # Given
+        metrics = MagicMock(spec=IMetricsRegistry)
+        metrics.render.return_value = '# TYPE test_total counter\ntest_total 1.0\n'
+
+        with MetricsServer(metrics, 0) as metrics_server:
+            metrics_server.start()
+
+            client = metrics_server._app.test_client()
+
+            # When
+            response = client.get('/metrics')
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/plain; version=0.0.4; charset=utf-8', response.content_type)
+        self.assertEqual('# TYPE test_total counter\ntest_total 1.0\n', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import NotifyingAssetDownloader, IDownloadListener, AssetDownloadError
+
+
+class NotifyingAssetDownloaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_notifies_listeners_of_downloaded_files(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = MagicMock()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = ['asset1.deb', 'asset2.deb']
+        listener1 = MagicMock(spec=IDownloadListener)
+        listener2 = MagicMock(spec=IDownloadListener)
+        downloader = NotifyingAssetDownloader(asset_downloader, [listener1, listener2])
+
+        # When
+        result = downloader.download(config, release)
+
+        # Then
+        self.assertEqual(['asset1.deb', 'asset2.deb'], result)
+        asset_downloader.download.assert_called_once_with(config, release)
+        listener1.on_downloaded.assert_called_once_with(config, ['asset1.deb', 'asset2.deb'])
+        listener2.on_downloaded.assert_called_once_with(config, ['asset1.deb', 'asset2.deb'])
+
+    def test_does_not_notify_listeners_when_nothing_downloaded(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = []
+        listener = MagicMock(spec=IDownloadListener)
+        downloader = NotifyingAssetDownloader(asset_downloader, [listener])
+
+        # When
+        downloader.download(config)
+
+        # Then
+        listener.on_downloaded.assert_not_called()
+
+    def test_notifies_listeners_of_completed_files_when_some_assets_failed(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.side_effect = AssetDownloadError('Failed', {'asset2.deb': 'error'}, ['asset1.deb'])
+        listener = MagicMock(spec=IDownloadListener)
+        downloader = NotifyingAssetDownloader(asset_downloader, [listener])
+
+        # When
+        with self.assertRaises(AssetDownloadError):
+            downloader.download(config)
+
+        # Then
+        listener.on_downloaded.assert_called_once_with(config, ['asset1.deb'])
+
+    def test_notifies_other_listeners_when_one_fails(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = ['asset1.deb']
+        listener1 = MagicMock(spec=IDownloadListener)
+        listener1.on_downloaded.side_effect = Exception('Listener failed')
+        listener2 = MagicMock(spec=IDownloadListener)
+        downloader = NotifyingAssetDownloader(asset_downloader, [listener1, listener2])
+
+        # When
+        result = downloader.download(config)
+
+        # Then
+        self.assertEqual(['asset1.deb'], result)
+        listener2.on_downloaded.assert_called_once_with(config, ['asset1.deb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
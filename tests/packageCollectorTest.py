@@ -1,15 +1,23 @@
 import unittest
-from pathlib import Path
 from threading import Thread
 from unittest import TestCase, mock
 from unittest.mock import MagicMock
 
-from common_utility.jsonLoader import IJsonLoader
 from context_logger import setup_logging
 from package_downloader import ReleaseConfig
 from test_utility import wait_for_assertion
 
-from package_collector import PackageCollector, PackageCollectorConfig, ISourceRegistry, IReleaseMonitor, IWebhookServer
+from package_collector import (
+    PackageCollector,
+    PackageCollectorConfig,
+    ISourceRegistry,
+    IReleaseMonitor,
+    IWebhookServer,
+    IReleaseConfigLoader,
+    RegistryChanges,
+    IShardRing,
+    IReleaseSource,
+)
 
 
 class PackageCollectorTest(TestCase):
@@ -25,13 +33,13 @@ class PackageCollectorTest(TestCase):
         # Given
         release_config1 = ReleaseConfig(owner='owner1', repo='repo1')
         release_config2 = ReleaseConfig(owner='owner2', repo='repo2')
-        config, json_loader, source_registry, release_monitor, webhook_server = create_components(
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
             [release_config1, release_config2]
         )
 
         # When
         with PackageCollector(
-            config, json_loader, source_registry, release_monitor, webhook_server
+            config, config_loader, source_registry, release_monitor, webhook_server
         ) as package_collector:
             Thread(target=package_collector.run).start()
 
@@ -48,11 +56,13 @@ class PackageCollectorTest(TestCase):
 
     def test_run_and_shutdown_when_no_webhook_server(self):
         # Given
-        config, json_loader, source_registry, release_monitor, webhook_server = create_components(enable_webhook=False)
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
+            enable_webhook=False
+        )
 
         # When
         with PackageCollector(
-            config, json_loader, source_registry, release_monitor, webhook_server
+            config, config_loader, source_registry, release_monitor, webhook_server
         ) as package_collector:
             Thread(target=package_collector.run).start()
 
@@ -67,13 +77,13 @@ class PackageCollectorTest(TestCase):
 
     def test_run_and_shutdown_when_no_initial_collection_and_no_monitoring(self):
         # Given
-        config, json_loader, source_registry, release_monitor, webhook_server = create_components(
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
             initial_collect=False, enable_monitor=False
         )
 
         # When
         with PackageCollector(
-            config, json_loader, source_registry, release_monitor, webhook_server
+            config, config_loader, source_registry, release_monitor, webhook_server
         ) as package_collector:
             Thread(target=package_collector.run).start()
 
@@ -87,13 +97,13 @@ class PackageCollectorTest(TestCase):
 
     def test_run_and_shutdown_when_no_webhook_server_and_no_monitoring(self):
         # Given
-        config, json_loader, source_registry, release_monitor, webhook_server = create_components(
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
             enable_webhook=False, enable_monitor=False
         )
 
         # When
         with PackageCollector(
-            config, json_loader, source_registry, release_monitor, webhook_server
+            config, config_loader, source_registry, release_monitor, webhook_server
         ) as package_collector:
             Thread(target=package_collector.run).start()
 
@@ -106,23 +116,135 @@ class PackageCollectorTest(TestCase):
         release_monitor.stop.assert_not_called()
         webhook_server.stop.assert_not_called()
 
+    def test_reload_synchronizes_registry_and_checks_new_sources_when_requested(self):
+        # Given
+        release_config1 = ReleaseConfig(owner='owner1', repo='repo1')
+        release_config2 = ReleaseConfig(owner='owner2', repo='repo2')
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components([release_config1])
+        config_loader.load.side_effect = [[release_config1], [release_config1, release_config2]]
+        source_registry.sync.return_value = RegistryChanges(added=['owner2/repo2'])
+
+        with PackageCollector(
+            config, config_loader, source_registry, release_monitor, webhook_server
+        ) as package_collector:
+            Thread(target=package_collector.run).start()
+            wait_for_assertion(1, release_monitor.check_all.assert_called_once)
+
+            # When
+            package_collector.request_reload()
+
+            # Then
+            wait_for_assertion(1, release_monitor.check.assert_called_once_with, 'owner2/repo2')
+
+            source_registry.sync.assert_called_once_with([release_config1, release_config2])
+
+    def test_reload_skips_registry_when_config_not_modified(self):
+        # Given
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
+            reload_interval=1
+        )
+        config_loader.load.side_effect = [[], None, None]
+
+        with PackageCollector(
+            config, config_loader, source_registry, release_monitor, webhook_server
+        ) as package_collector:
+            Thread(target=package_collector.run).start()
+
+            # When
+            package_collector.request_reload()
+
+            # Then
+            wait_for_assertion(1, lambda: self.assertEqual(2, config_loader.load.call_count))
+
+            source_registry.sync.assert_not_called()
+            release_monitor.check.assert_not_called()
+
+    def test_reload_keeps_running_when_loading_fails(self):
+        # Given
+        release_config1 = ReleaseConfig(owner='owner1', repo='repo1')
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components()
+        config_loader.load.side_effect = [[], Exception('Bad gateway'), [release_config1]]
+        source_registry.sync.return_value = RegistryChanges()
+
+        with PackageCollector(
+            config, config_loader, source_registry, release_monitor, webhook_server
+        ) as package_collector:
+            Thread(target=package_collector.run).start()
+            wait_for_assertion(1, release_monitor.check_all.assert_called_once)
+            package_collector.request_reload()
+            wait_for_assertion(1, lambda: self.assertEqual(2, config_loader.load.call_count))
+
+            # When
+            package_collector.request_reload()
+
+            # Then
+            wait_for_assertion(1, source_registry.sync.assert_called_once_with, [release_config1])
+
+    def test_registers_only_sources_owned_by_shard(self):
+        # Given
+        release_config1 = ReleaseConfig(owner='owner1', repo='repo1')
+        release_config2 = ReleaseConfig(owner='owner2', repo='repo2')
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
+            [release_config1, release_config2]
+        )
+        shard_ring = MagicMock(spec=IShardRing)
+        shard_ring.owns.side_effect = lambda repo_name: repo_name == 'owner2/repo2'
+
+        # When
+        with PackageCollector(
+            config, config_loader, source_registry, release_monitor, webhook_server, shard_ring
+        ) as package_collector:
+            Thread(target=package_collector.run).start()
+
+            # Then
+            wait_for_assertion(1, release_monitor.check_all.assert_called_once)
+
+            source_registry.register.assert_called_once_with(release_config2)
+
+    def test_prefetches_repositories_concurrently_before_initial_collection(self):
+        # Given
+        config, config_loader, source_registry, release_monitor, webhook_server = create_components(
+            prefetch_workers=2
+        )
+        source1 = MagicMock(spec=IReleaseSource)
+        source2 = MagicMock(spec=IReleaseSource)
+        source2.prefetch_repository.side_effect = Exception('Failed to get repository')
+        source_registry.get_all.return_value = [source1, source2]
+        calls = []
+        source1.prefetch_repository.side_effect = lambda: calls.append('prefetch')
+        release_monitor.check_all.side_effect = lambda: calls.append('check_all')
+
+        # When
+        with PackageCollector(
+            config, config_loader, source_registry, release_monitor, webhook_server
+        ) as package_collector:
+            Thread(target=package_collector.run).start()
+
+            # Then
+            wait_for_assertion(1, release_monitor.check_all.assert_called_once)
+
+            self.assertEqual(['prefetch', 'check_all'], calls)
+            source2.prefetch_repository.assert_called_once()
+
 
 def create_components(
     config_list: list[ReleaseConfig] = None,
     initial_collect: bool = True,
     enable_monitor: bool = True,
     enable_webhook: bool = True,
+    reload_interval: int = 0,
+    prefetch_workers: int = 0,
 ):
     if config_list is None:
         config_list = []
-    config = PackageCollectorConfig(Path(''), initial_collect, enable_monitor, enable_webhook)
-    json_loader = MagicMock(spec=IJsonLoader)
-    json_loader.load_list.return_value = config_list
+    config = PackageCollectorConfig(initial_collect, enable_monitor, enable_webhook, reload_interval, prefetch_workers)
+    config_loader = MagicMock(spec=IReleaseConfigLoader)
+    config_loader.load.return_value = config_list
     source_registry = MagicMock(spec=ISourceRegistry)
     release_monitor = MagicMock(spec=IReleaseMonitor)
     webhook_server = MagicMock(spec=IWebhookServer)
 
-    return config, json_loader, source_registry, release_monitor, webhook_server
+    return config, config_loader, source_registry, release_monitor, webhook_server
 
 
 if __name__ == '__main__':
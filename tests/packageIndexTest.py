@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import TestCase
+
+from context_logger import setup_logging
+from package_downloader import ReleaseConfig
+
+from package_collector import PackageIndex, MetricsRegistry, compare_versions
+
+CONFIG = ReleaseConfig(owner='owner1', repo='repo1')
+
+
+class PackageIndexTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_creates_index_of_downloaded_package(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package = create_package(Path(temp_dir) / 'bookworm', 'package1', '1.0.0', 'arm64')
+            package_index = PackageIndex()
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(package)])
+
+            # Then
+            packages = (Path(temp_dir) / 'bookworm/Packages').read_text()
+            self.assertIn('Package: package1\n', packages)
+            self.assertIn('Version: 1.0.0\n', packages)
+            self.assertIn('Description: Package package1\n Long description\n', packages)
+            self.assertIn('Filename: ./package1_1.0.0_arm64.deb\n', packages)
+            self.assertIn(f'Size: {package.stat().st_size}\n', packages)
+            self.assertIn(f'SHA256: {hashlib.sha256(package.read_bytes()).hexdigest()}\n', packages)
+            packages_gz = (Path(temp_dir) / 'bookworm/Packages.gz').read_bytes()
+            self.assertEqual(packages, gzip.decompress(packages_gz).decode())
+            release = (Path(temp_dir) / 'bookworm/Release').read_text()
+            self.assertIn(f' {hashlib.sha256(packages.encode()).hexdigest()} {len(packages)} Packages\n', release)
+            self.assertIn(f' {hashlib.sha256(packages_gz).hexdigest()} {len(packages_gz)} Packages.gz\n', release)
+
+    def test_adds_new_package_without_parsing_indexed_packages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package1 = create_package(Path(temp_dir), 'package1', '1.0.0', 'arm64')
+            PackageIndex().on_downloaded(CONFIG, [str(package1)])
+            package1.write_bytes(b'not a package any more')
+            package2 = create_package(Path(temp_dir), 'package2', '2.0.0', 'all')
+            package_index = PackageIndex()
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(package2)])
+
+            # Then
+            packages = (Path(temp_dir) / 'Packages').read_text()
+            self.assertIn('Filename: ./package1_1.0.0_arm64.deb\n', packages)
+            self.assertIn('Filename: ./package2_2.0.0_all.deb\n', packages)
+            self.assertIn('Description: Package package1\n Long description\n', packages)
+
+    def test_drops_superseded_package_version(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_index = PackageIndex()
+            old_package = create_package(Path(temp_dir), 'package1', '1.0.0', 'arm64')
+            other_arch_package = create_package(Path(temp_dir), 'package1', '1.0.0', 'amd64')
+            package_index.on_downloaded(CONFIG, [str(old_package), str(other_arch_package)])
+            new_package = create_package(Path(temp_dir), 'package1', '1.1.0', 'arm64')
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(new_package)])
+
+            # Then
+            packages = (Path(temp_dir) / 'Packages').read_text()
+            self.assertNotIn('Filename: ./package1_1.0.0_arm64.deb\n', packages)
+            self.assertIn('Filename: ./package1_1.0.0_amd64.deb\n', packages)
+            self.assertIn('Filename: ./package1_1.1.0_arm64.deb\n', packages)
+
+    def test_keeps_newer_package_version_when_older_one_downloaded_later(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_index = PackageIndex()
+            new_package = create_package(Path(temp_dir), 'package1', '1.10.0', 'arm64')
+            package_index.on_downloaded(CONFIG, [str(new_package)])
+            old_package = create_package(Path(temp_dir), 'package1', '1.9.0', 'arm64')
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(old_package)])
+
+            # Then
+            packages = (Path(temp_dir) / 'Packages').read_text()
+            self.assertIn('Filename: ./package1_1.10.0_arm64.deb\n', packages)
+            self.assertNotIn('Filename: ./package1_1.9.0_arm64.deb\n', packages)
+
+    def test_compares_debian_versions(self):
+        # Given
+        versions = ['0.9', '1.0~rc1', '1.0', '1.0-1', '1.0-1+deb12u1', '1.0a', '1.0.1', '1.10', '1:0.1']
+
+        # When
+        results = [compare_versions(version1, version2) for version1, version2 in zip(versions, versions[1:])]
+
+        # Then
+        self.assertEqual([-1] * (len(versions) - 1), results)
+        self.assertEqual(0, compare_versions('1.0', '0:1.0'))
+        self.assertEqual(1, compare_versions('2.0', '1.0-5'))
+
+    def test_scans_directory_without_index_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            existing_package = create_package(Path(temp_dir), 'package1', '1.0.0', 'arm64')
+            os.utime(existing_package, (0, 0))
+            (Path(temp_dir) / 'invalid.deb').write_bytes(b'invalid')
+            package = create_package(Path(temp_dir), 'package2', '1.0.0', 'arm64')
+            package_index = PackageIndex()
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(package)])
+
+            # Then
+            packages = (Path(temp_dir) / 'Packages').read_text()
+            self.assertIn('Filename: ./package1_1.0.0_arm64.deb\n', packages)
+            self.assertIn('Filename: ./package2_1.0.0_arm64.deb\n', packages)
+            self.assertNotIn('invalid.deb', packages)
+
+    def test_updates_index_of_each_directory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package1 = create_package(Path(temp_dir) / 'bookworm', 'package1', '1.0.0', 'all')
+            package2 = create_package(Path(temp_dir) / 'trixie', 'package1', '1.0.0', 'all')
+            package_index = PackageIndex()
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(package1), str(package2), str(Path(temp_dir) / 'file.txt')])
+
+            # Then
+            self.assertIn('Package: package1\n', (Path(temp_dir) / 'bookworm/Packages').read_text())
+            self.assertIn('Package: package1\n', (Path(temp_dir) / 'trixie/Packages').read_text())
+            self.assertFalse((Path(temp_dir) / 'Packages').exists())
+
+    def test_keeps_index_and_records_failure_when_package_is_invalid(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package = create_package(Path(temp_dir), 'package1', '1.0.0', 'arm64')
+            metrics = MetricsRegistry()
+            package_index = PackageIndex(metrics)
+            package_index.on_downloaded(CONFIG, [str(package)])
+            invalid_package = Path(temp_dir) / 'invalid.deb'
+            invalid_package.write_bytes(b'invalid')
+
+            # When
+            package_index.on_downloaded(CONFIG, [str(invalid_package)])
+
+            # Then
+            self.assertIn('Filename: ./package1_1.0.0_arm64.deb\n', (Path(temp_dir) / 'Packages').read_text())
+            self.assertIn('package_collector_index_update_failures_total 1.0\n', metrics.render())
+
+
+def create_package(directory, name, version, architecture):
+    control = (f'Package: {name}\nVersion: {version}\nArchitecture: {architecture}\nMaintainer: Maintainer\n'
+               f'Description: Package {name}\n Long description\n').encode()
+    control_tar = io.BytesIO()
+
+    with tarfile.open(fileobj=control_tar, mode='w:gz') as archive:
+        info = tarfile.TarInfo('./control')
+        info.size = len(control)
+        archive.addfile(info, io.BytesIO(control))
+
+    members = [('debian-binary', b'2.0\n'), ('control.tar.gz', control_tar.getvalue()), ('data.tar.gz', b'data')]
+    content = b'!<arch>\n'
+
+    for member_name, data in members:
+        content += f'{member_name:<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(data):<10}`\n'.encode()
+        content += data + (b'\n' if len(data) % 2 else b'')
+
+    directory.mkdir(parents=True, exist_ok=True)
+    package = directory / f'{name}_{version}_{architecture}.deb'
+    package.write_bytes(content)
+
+    return package
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import PackageStore
+
+DIGEST = 'sha256:abcdef0123456789'
+
+
+class PackageStoreTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_none_when_package_is_not_stored(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+
+            # When
+            result = package_store.get(DIGEST)
+
+            # Then
+            self.assertIsNone(result)
+
+    def test_moves_added_package_into_store(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            file = Path(temp_dir) / 'asset1.deb.part'
+            file.write_bytes(b'content')
+
+            # When
+            result = package_store.add(file, DIGEST)
+
+            # Then
+            self.assertEqual(Path(temp_dir) / '.store/sha256/ab/abcdef0123456789', result)
+            self.assertEqual(result, package_store.get(DIGEST))
+            self.assertEqual(b'content', result.read_bytes())
+            self.assertFalse(file.exists())
+
+    def test_discards_added_package_when_already_stored(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            first = Path(temp_dir) / 'first.part'
+            first.write_bytes(b'content')
+            blob_path = package_store.add(first, DIGEST)
+            second = Path(temp_dir) / 'second.part'
+            second.write_bytes(b'content')
+
+            # When
+            result = package_store.add(second, DIGEST)
+
+            # Then
+            self.assertEqual(blob_path, result)
+            self.assertFalse(second.exists())
+
+    def test_links_stored_package_into_distro_directories(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            file = Path(temp_dir) / 'asset1.deb.part'
+            file.write_bytes(b'content')
+            blob_path = package_store.add(file, DIGEST)
+
+            # When
+            package_store.link(blob_path, Path(temp_dir) / 'bookworm/asset1.deb')
+            package_store.link(blob_path, Path(temp_dir) / 'trixie/asset1.deb')
+
+            # Then
+            self.assertTrue((Path(temp_dir) / 'bookworm/asset1.deb').samefile(blob_path))
+            self.assertTrue((Path(temp_dir) / 'trixie/asset1.deb').samefile(blob_path))
+            self.assertEqual(3, blob_path.stat().st_nlink)
+
+    def test_replaces_existing_file_when_linking(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            file = Path(temp_dir) / 'asset1.deb.part'
+            file.write_bytes(b'content')
+            blob_path = package_store.add(file, DIGEST)
+            target = Path(temp_dir) / 'bookworm/asset1.deb'
+            target.parent.mkdir()
+            target.write_bytes(b'old')
+
+            # When
+            package_store.link(blob_path, target)
+
+            # Then
+            self.assertEqual(b'content', target.read_bytes())
+
+    def test_prunes_packages_not_linked_from_any_directory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            linked = Path(temp_dir) / 'linked.part'
+            linked.write_bytes(b'linked')
+            linked_blob = package_store.add(linked, 'sha256:1111')
+            package_store.link(linked_blob, Path(temp_dir) / 'bookworm/linked.deb')
+            unlinked = Path(temp_dir) / 'unlinked.part'
+            unlinked.write_bytes(b'unlinked')
+            unlinked_blob = package_store.add(unlinked, 'sha256:2222')
+
+            # When
+            result = package_store.prune()
+
+            # Then
+            self.assertEqual(1, result)
+            self.assertTrue(linked_blob.exists())
+            self.assertFalse(unlinked_blob.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
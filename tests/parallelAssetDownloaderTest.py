@@ -0,0 +1,206 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from threading import Lock
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from github.GitRelease import GitRelease
+from github.Requester import Requester
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import ParallelAssetDownloader, AssetDownloadError, MetricsRegistry, IResumableFileDownloader
+
+
+class ParallelAssetDownloaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_downloads_single_asset_release_directly(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release('asset1.deb')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = ['asset1.deb']
+        parallel_downloader = ParallelAssetDownloader(asset_downloader)
+
+        # When
+        result = parallel_downloader.download(config, release)
+
+        # Then
+        self.assertEqual(['asset1.deb'], result)
+        asset_downloader.download.assert_called_once_with(config, release)
+        parallel_downloader.shutdown()
+
+    def test_downloads_each_asset_separately(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release('asset1.deb', 'asset2.deb', 'asset3.deb')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.side_effect = lambda _, asset_release: [asset_release.assets[0].name]
+        parallel_downloader = ParallelAssetDownloader(asset_downloader)
+
+        # When
+        result = parallel_downloader.download(config, release)
+
+        # Then
+        self.assertEqual(['asset1.deb', 'asset2.deb', 'asset3.deb'], result)
+        self.assertEqual(3, asset_downloader.download.call_count)
+        parallel_downloader.shutdown()
+
+    def test_limits_concurrent_downloads_per_release(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release('asset1.deb', 'asset2.deb', 'asset3.deb', 'asset4.deb')
+        asset_downloader = ConcurrencyCountingDownloader()
+        parallel_downloader = ParallelAssetDownloader(asset_downloader, 4, 2)
+
+        # When
+        parallel_downloader.download(config, release)
+
+        # Then
+        self.assertEqual(2, asset_downloader.max_concurrent)
+        parallel_downloader.shutdown()
+
+    def test_raises_error_with_failed_assets_after_downloading_others(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release('asset1.deb', 'asset2.deb', 'asset3.deb')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+
+        def download(_, asset_release):
+            if asset_release.assets[0].name == 'asset2.deb':
+                raise Exception('Download failed')
+            return [asset_release.assets[0].name]
+
+        asset_downloader.download.side_effect = download
+        parallel_downloader = ParallelAssetDownloader(asset_downloader)
+
+        # When
+        with self.assertRaises(AssetDownloadError) as context:
+            parallel_downloader.download(config, release)
+
+        # Then
+        self.assertEqual({'asset2.deb': 'Download failed'}, context.exception.failures)
+        self.assertEqual(3, asset_downloader.download.call_count)
+        parallel_downloader.shutdown()
+
+    def test_records_download_metrics(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release('asset1.deb', 'asset2.deb')
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        metrics = MetricsRegistry()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def download(_, asset_release):
+                name = asset_release.assets[0].name
+                if name == 'asset2.deb':
+                    raise Exception('Download failed')
+                file = Path(temp_dir) / name
+                file.write_bytes(b'0' * 100)
+                return [str(file)]
+
+            asset_downloader.download.side_effect = download
+            parallel_downloader = ParallelAssetDownloader(asset_downloader, metrics=metrics)
+
+            # When
+            with self.assertRaises(AssetDownloadError):
+                parallel_downloader.download(config, release)
+
+        # Then
+        result = metrics.render()
+        self.assertIn('package_collector_downloaded_bytes_total 100.0\n', result)
+        self.assertIn('package_collector_download_failures_total 1.0\n', result)
+        self.assertIn('package_collector_download_seconds_count 2.0\n', result)
+        parallel_downloader.shutdown()
+
+    def test_registers_expected_asset_metadata_before_download(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release_with_urls()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = []
+        file_downloader = MagicMock(spec=IResumableFileDownloader)
+        parallel_downloader = ParallelAssetDownloader(asset_downloader, file_downloader=file_downloader)
+
+        # When
+        parallel_downloader.download(config, release)
+
+        # Then
+        file_downloader.expect.assert_any_call('api-url1', 100, 'sha256:abc', '2024-01-01T00:00:00Z')
+        file_downloader.expect.assert_any_call('download-url1', 100, 'sha256:abc', '2024-01-01T00:00:00Z')
+        parallel_downloader.shutdown()
+
+    def test_forgets_expected_asset_metadata_after_download(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release_with_urls()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.return_value = []
+        file_downloader = MagicMock(spec=IResumableFileDownloader)
+        parallel_downloader = ParallelAssetDownloader(asset_downloader, file_downloader=file_downloader)
+
+        # When
+        parallel_downloader.download(config, release)
+
+        # Then
+        file_downloader.forget.assert_has_calls([mock.call('api-url1'), mock.call('download-url1')])
+        parallel_downloader.shutdown()
+
+    def test_forgets_expected_asset_metadata_when_download_failed(self):
+        # Given
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+        release = create_release_with_urls()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.side_effect = Exception('Download failed')
+        file_downloader = MagicMock(spec=IResumableFileDownloader)
+        parallel_downloader = ParallelAssetDownloader(asset_downloader, file_downloader=file_downloader)
+
+        # When
+        self.assertRaises(Exception, parallel_downloader.download, config, release)
+
+        # Then
+        file_downloader.forget.assert_has_calls([mock.call('api-url1'), mock.call('download-url1')])
+        parallel_downloader.shutdown()
+
+
+class ConcurrencyCountingDownloader(IAssetDownloader):
+
+    def __init__(self):
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._lock = Lock()
+
+    def download(self, config, release=None):
+        with self._lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(0.1)
+        with self._lock:
+            self.concurrent -= 1
+        return []
+
+
+def create_release(*asset_names):
+    data = {'tag_name': '1.0.0', 'url': 'url', 'assets': [{'name': name} for name in asset_names]}
+    return GitRelease(MagicMock(spec=Requester), {}, data, completed=True)
+
+
+def create_release_with_urls():
+    data = {'tag_name': '1.0.0', 'url': 'url', 'assets': [{
+        'name': 'asset1.deb', 'url': 'api-url1', 'browser_download_url': 'download-url1', 'size': 100,
+        'digest': 'sha256:abc', 'updated_at': '2024-01-01T00:00:00Z'
+    }]}
+    return GitRelease(MagicMock(spec=Requester), {}, data, completed=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
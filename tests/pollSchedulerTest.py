@@ -0,0 +1,119 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from package_downloader import ReleaseConfig
+
+from package_collector import PollScheduler, ReleaseSource
+
+
+class PollSchedulerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_new_sources_as_due(self):
+        # Given
+        source1 = create_source('repo1')
+        source2 = create_source('repo2')
+        poll_scheduler = PollScheduler(600, 60, 3600)
+
+        # When
+        result = poll_scheduler.pop_due([source1, source2])
+
+        # Then
+        self.assertEqual([source1, source2], result)
+        self.assertEqual(600, poll_scheduler.get_interval('owner/repo1'))
+
+    def test_not_returns_sources_before_due(self):
+        # Given
+        source1 = create_source('repo1')
+        poll_scheduler = PollScheduler(600, 60, 3600)
+        poll_scheduler.pop_due([source1])
+        poll_scheduler.reschedule(source1, False)
+
+        # When
+        result = poll_scheduler.pop_due([source1])
+
+        # Then
+        self.assertEqual([], result)
+
+    def test_shortens_interval_when_release_changed(self):
+        # Given
+        source1 = create_source('repo1')
+        poll_scheduler = PollScheduler(600, 60, 3600)
+        poll_scheduler.pop_due([source1])
+
+        # When
+        poll_scheduler.reschedule(source1, True)
+
+        # Then
+        self.assertEqual(60, poll_scheduler.get_interval('owner/repo1'))
+
+    def test_backs_off_interval_up_to_maximum_when_release_not_changed(self):
+        # Given
+        source1 = create_source('repo1')
+        poll_scheduler = PollScheduler(600, 60, 3600)
+        poll_scheduler.pop_due([source1])
+
+        # When
+        intervals = []
+        for _ in range(4):
+            poll_scheduler.reschedule(source1, False)
+            intervals.append(poll_scheduler.get_interval('owner/repo1'))
+
+        # Then
+        self.assertEqual([1200, 2400, 3600, 3600], intervals)
+
+    def test_returns_source_again_when_due(self):
+        # Given
+        source1 = create_source('repo1')
+        poll_scheduler = PollScheduler(1, 1, 1)
+        poll_scheduler.pop_due([source1])
+        poll_scheduler._push('owner/repo1', 0, 1)
+
+        # When
+        result = poll_scheduler.pop_due([source1])
+
+        # Then
+        self.assertEqual([source1], result)
+
+    def test_drops_sources_no_longer_registered(self):
+        # Given
+        source1 = create_source('repo1')
+        source2 = create_source('repo2')
+        poll_scheduler = PollScheduler(1, 1, 1)
+        poll_scheduler.pop_due([source1, source2])
+        poll_scheduler._push('owner/repo2', 0, 1)
+
+        # When
+        result = poll_scheduler.pop_due([source1])
+
+        # Then
+        self.assertEqual([], result)
+        self.assertNotIn('owner/repo2', poll_scheduler._due_times)
+
+    def test_returns_minimum_interval_as_tick_interval(self):
+        # Given
+        poll_scheduler = PollScheduler(600, 60, 3600)
+
+        # When
+        result = poll_scheduler.get_tick_interval()
+
+        # Then
+        self.assertEqual(60, result)
+
+
+def create_source(repo):
+    source = MagicMock(spec=ReleaseSource)
+    source.get_config.return_value = ReleaseConfig(owner='owner', repo=repo)
+    return source
+
+
+if __name__ == '__main__':
+    unittest.main()
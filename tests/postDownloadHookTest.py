@@ -0,0 +1,143 @@
+import shlex
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from package_downloader import ReleaseConfig
+
+from package_collector import PostDownloadHook, PostDownloadHookConfig, IWorkQueue, MetricsRegistry
+
+CONFIG = ReleaseConfig(owner='owner1', repo='repo1')
+
+
+class PostDownloadHookTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_runs_hook_once_with_files_of_batch(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            output = Path(temp_dir) / 'output'
+            hook = PostDownloadHook(PostDownloadHookConfig(create_command(output), batch_window=0.2))
+            hook.start()
+
+            # When
+            hook.on_downloaded(CONFIG, ['asset1.deb', 'asset2.deb'])
+            hook.on_downloaded(CONFIG, ['asset3.deb', 'asset1.deb'])
+
+            # Then
+            wait_for(lambda: output.exists())
+            hook.shutdown()
+            self.assertEqual(['asset1.deb asset2.deb asset3.deb'], output.read_text().splitlines())
+
+    def test_starts_batch_window_with_first_download(self):
+        # Given
+        work_queue = MagicMock(spec=IWorkQueue)
+        hook = PostDownloadHook(PostDownloadHookConfig('true', batch_window=5), work_queue)
+
+        # When
+        hook.on_downloaded(CONFIG, ['asset1.deb'])
+
+        # Then
+        work_queue.submit.assert_called_once()
+        self.assertEqual('batch', work_queue.submit.call_args.args[0])
+        self.assertEqual(5, work_queue.submit.call_args.args[2])
+        self.assertFalse(work_queue.submit.call_args.kwargs['replace'])
+
+    def test_retries_failed_hook_with_same_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            output = Path(temp_dir) / 'output'
+            marker = Path(temp_dir) / 'marker'
+            command = create_command(output, fail_once_marker=marker)
+            metrics = MetricsRegistry()
+            hook = PostDownloadHook(PostDownloadHookConfig(command, batch_window=0, delay=0.05), metrics=metrics)
+            hook.start()
+
+            # When
+            hook.on_downloaded(CONFIG, ['asset1.deb'])
+
+            # Then
+            wait_for(lambda: output.exists())
+            hook.shutdown()
+            self.assertEqual(['asset1.deb'], output.read_text().splitlines())
+            result = metrics.render()
+            self.assertIn('package_collector_hook_runs_total{outcome="failure"} 1.0\n', result)
+            self.assertIn('package_collector_hook_runs_total{outcome="success"} 1.0\n', result)
+
+    def test_gives_up_after_max_attempts(self):
+        # Given
+        metrics = MetricsRegistry()
+        hook = PostDownloadHook(PostDownloadHookConfig('false', batch_window=0, retry=2, delay=0.01),
+                                metrics=metrics)
+        hook.start()
+
+        # When
+        hook.on_downloaded(CONFIG, ['asset1.deb'])
+
+        # Then
+        wait_for(lambda: 'outcome="dropped"' in metrics.render())
+        hook.shutdown()
+        result = metrics.render()
+        self.assertIn('package_collector_hook_runs_total{outcome="failure"} 2.0\n', result)
+        self.assertIn('package_collector_hook_runs_total{outcome="dropped"} 1.0\n', result)
+
+    def test_records_failure_when_command_not_found(self):
+        # Given
+        metrics = MetricsRegistry()
+        hook = PostDownloadHook(PostDownloadHookConfig('/non/existent/command', batch_window=0, retry=1),
+                                metrics=metrics)
+        hook.start()
+
+        # When
+        hook.on_downloaded(CONFIG, ['asset1.deb'])
+
+        # Then
+        wait_for(lambda: 'outcome="dropped"' in metrics.render())
+        hook.shutdown()
+        self.assertIn('package_collector_hook_runs_total{outcome="failure"} 1.0\n', metrics.render())
+
+    def test_runs_hook_with_pending_files_on_shutdown(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            output = Path(temp_dir) / 'output'
+            hook = PostDownloadHook(PostDownloadHookConfig(create_command(output), batch_window=60))
+            hook.start()
+            hook.on_downloaded(CONFIG, ['asset1.deb'])
+
+            # When
+            hook.shutdown()
+
+            # Then
+            self.assertEqual(['asset1.deb'], output.read_text().splitlines())
+
+
+def create_command(output, fail_once_marker=None):
+    script = ('import pathlib, sys\n'
+              f'marker = {str(fail_once_marker)!r} if {fail_once_marker is not None} else None\n'
+              'if marker and not pathlib.Path(marker).exists():\n'
+              '    pathlib.Path(marker).touch()\n'
+              '    sys.exit(1)\n'
+              f'with open({str(output)!r}, "a") as file:\n'
+              '    file.write(" ".join(sys.argv[1:]) + "\\n")\n')
+    return shlex.join([sys.executable, '-c', script])
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
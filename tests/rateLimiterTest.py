@@ -0,0 +1,115 @@
+import time
+import unittest
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import RateLimiter
+
+
+class RateLimiterTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_no_delay_when_no_quota_known(self):
+        # Given
+        rate_limiter = RateLimiter()
+
+        # When
+        result = rate_limiter.acquire('token')
+
+        # Then
+        self.assertEqual(0, result)
+
+    def test_returns_no_delay_when_enough_quota(self):
+        # Given
+        rate_limiter = RateLimiter()
+        rate_limiter.update('token', create_headers(4000, time.time() + 600))
+
+        # When
+        result = rate_limiter.acquire('token')
+
+        # Then
+        self.assertEqual(0, result)
+
+    def test_paces_requests_when_quota_low(self):
+        # Given
+        rate_limiter = RateLimiter(reserve=100)
+        rate_limiter.update('token', create_headers(200, time.time() + 100))
+
+        # When
+        first = rate_limiter.acquire('token')
+        second = rate_limiter.acquire('token')
+
+        # Then
+        self.assertEqual(0, first)
+        self.assertAlmostEqual(1.0, second, delta=0.1)
+        stats = list(rate_limiter.get_stats().values())[0]
+        self.assertEqual(2, stats.paced_count)
+        self.assertAlmostEqual(1.0, stats.interval, delta=0.1)
+
+    def test_waits_for_reset_when_quota_exhausted(self):
+        # Given
+        rate_limiter = RateLimiter(reserve=100)
+        rate_limiter.update('token', create_headers(50, time.time() + 300))
+
+        # When
+        result = rate_limiter.acquire('token')
+
+        # Then
+        self.assertAlmostEqual(300, result, delta=1)
+        self.assertEqual(1, list(rate_limiter.get_stats().values())[0].exhausted_count)
+
+    def test_returns_no_delay_after_reset(self):
+        # Given
+        rate_limiter = RateLimiter(reserve=100)
+        rate_limiter.update('token', create_headers(50, time.time() - 1))
+
+        # When
+        result = rate_limiter.acquire('token')
+
+        # Then
+        self.assertEqual(0, result)
+
+    def test_tracks_quota_per_token(self):
+        # Given
+        rate_limiter = RateLimiter(reserve=100)
+        rate_limiter.update('token1', create_headers(50, time.time() + 300))
+
+        # When
+        result = rate_limiter.acquire('token2')
+
+        # Then
+        self.assertEqual(0, result)
+
+    def test_returns_stats_per_resource(self):
+        # Given
+        rate_limiter = RateLimiter()
+        rate_limiter.update('token', create_headers(4000, 1000, 'core'))
+        rate_limiter.update('token', create_headers(3000, 2000, 'graphql'))
+        rate_limiter.update(None, {'etag': 'etag'})
+
+        # When
+        result = rate_limiter.get_stats()
+
+        # Then
+        self.assertEqual({'core', 'graphql'}, {key.split(':')[0] for key in result})
+        self.assertEqual([4000, 3000], [stats.remaining for stats in result.values()])
+
+
+def create_headers(remaining, reset_time, resource='core'):
+    return {
+        'x-ratelimit-limit': '5000',
+        'x-ratelimit-remaining': str(remaining),
+        'x-ratelimit-reset': str(int(reset_time)),
+        'x-ratelimit-resource': resource,
+    }
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import requests
+from common_utility.jsonLoader import IJsonLoader
+from context_logger import setup_logging
+from package_downloader import ReleaseConfig
+
+from package_collector import ReleaseConfigLoader
+
+CONFIG_URL = 'http://localhost:8000/release-config.json'
+
+
+class ReleaseConfigLoaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+        self.temp_dir = TemporaryDirectory()
+        self.download_path = Path(self.temp_dir.name) / 'release-config.json'
+        self.configs = [ReleaseConfig(owner='owner1', repo='repo1')]
+        self.json_loader = MagicMock(spec=IJsonLoader)
+        self.json_loader.load_list.return_value = self.configs
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_loads_downloaded_config(self):
+        # Given
+        session = create_session(create_response(200, b'[]', {'ETag': '"v1"'}))
+        config_loader = ReleaseConfigLoader(CONFIG_URL, self.json_loader, self.download_path, session)
+
+        # When
+        result = config_loader.load()
+
+        # Then
+        self.assertEqual(self.configs, result)
+        session.get.assert_called_once_with(CONFIG_URL, headers={}, timeout=30)
+        self.json_loader.load_list.assert_called_once_with(self.download_path, ReleaseConfig)
+        self.assertEqual(b'[]', self.download_path.read_bytes())
+
+    def test_returns_none_when_downloaded_config_not_modified(self):
+        # Given
+        session = create_session(create_response(200, b'[]', {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024'}),
+                                 create_response(304))
+        config_loader = ReleaseConfigLoader(CONFIG_URL, self.json_loader, self.download_path, session)
+        config_loader.load()
+
+        # When
+        result = config_loader.load()
+
+        # Then
+        self.assertIsNone(result)
+        session.get.assert_called_with(
+            CONFIG_URL, headers={'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024'}, timeout=30
+        )
+        self.json_loader.load_list.assert_called_once()
+
+    def test_downloads_config_again_when_loading_failed(self):
+        # Given
+        session = create_session(create_response(200, b'[', {'ETag': '"v1"'}),
+                                 create_response(200, b'[]', {'ETag': '"v1"'}))
+        self.json_loader.load_list.side_effect = [ValueError('Invalid JSON'), self.configs]
+        config_loader = ReleaseConfigLoader(CONFIG_URL, self.json_loader, self.download_path, session)
+        self.assertRaises(ValueError, config_loader.load)
+
+        # When
+        result = config_loader.load()
+
+        # Then
+        self.assertEqual(self.configs, result)
+        session.get.assert_called_with(CONFIG_URL, headers={}, timeout=30)
+
+    def test_raises_error_when_download_failed(self):
+        # Given
+        session = create_session(create_response(500))
+        config_loader = ReleaseConfigLoader(CONFIG_URL, self.json_loader, self.download_path, session)
+
+        # When
+        self.assertRaises(requests.HTTPError, config_loader.load)
+
+        # Then
+        self.assertFalse(self.download_path.exists())
+
+    def test_returns_none_when_local_config_not_modified(self):
+        # Given
+        config_path = Path(self.temp_dir.name) / 'local-config.json'
+        config_path.write_text('[]')
+        config_loader = ReleaseConfigLoader(str(config_path), self.json_loader, self.download_path)
+        config_loader.load()
+
+        # When
+        result = config_loader.load()
+
+        # Then
+        self.assertIsNone(result)
+        self.json_loader.load_list.assert_called_once_with(config_path, ReleaseConfig)
+
+    def test_loads_local_config_again_when_modified(self):
+        # Given
+        config_path = Path(self.temp_dir.name) / 'local-config.json'
+        config_path.write_text('[]')
+        config_loader = ReleaseConfigLoader(str(config_path), self.json_loader, self.download_path)
+        config_loader.load()
+        config_path.write_text('[{}]')
+        os.utime(config_path, ns=(0, 0))
+
+        # When
+        result = config_loader.load()
+
+        # Then
+        self.assertEqual(self.configs, result)
+        self.assertEqual(2, self.json_loader.load_list.call_count)
+
+
+def create_session(*responses):
+    session = MagicMock(spec=requests.Session)
+    session.get.side_effect = list(responses)
+    return session
+
+
+def create_response(status_code, content=b'', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    response.url = CONFIG_URL
+    return response
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from github.GitRelease import GitRelease
+from package_downloader import IAssetDownloader, ReleaseConfig
+
+from package_collector import IReleaseSource, AssetDownloadError, download_releases
+
+
+class ReleaseDownloaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_downloads_releases_in_order(self):
+        # Given
+        source, release1, release2 = create_source()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+
+        # When
+        download_releases(source, asset_downloader)
+
+        # Then
+        asset_downloader.download.assert_has_calls([mock.call(source.config, release1),
+                                                    mock.call(source.config, release2)])
+
+    def test_commits_downloaded_releases(self):
+        # Given
+        source, release1, release2 = create_source()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+
+        # When
+        download_releases(source, asset_downloader)
+
+        # Then
+        source.commit_release.assert_has_calls([mock.call(release1), mock.call(release2)])
+
+    def test_continues_downloading_and_commits_failed_assets_after_failure(self):
+        # Given
+        source, release1, release2 = create_source()
+        asset_downloader = MagicMock(spec=IAssetDownloader)
+        asset_downloader.download.side_effect = [AssetDownloadError('Failed', {'asset1': 'Download failed'}),
+                                                 Exception('Download failed')]
+
+        # When
+        download_releases(source, asset_downloader)
+
+        # Then
+        asset_downloader.download.assert_has_calls([mock.call(source.config, release1),
+                                                    mock.call(source.config, release2)])
+        source.commit_release.assert_has_calls([mock.call(release1, ['asset1']),
+                                                mock.call(release2, ['asset1', 'asset2'])])
+
+
+def create_source():
+    source = MagicMock(spec=IReleaseSource)
+    source.config = MagicMock(spec=ReleaseConfig)
+    source.config.full_name = 'owner1/repo1'
+    release1 = MagicMock(spec=GitRelease)
+    release1.tag_name = '1.0.0'
+    release2 = MagicMock(spec=GitRelease)
+    release2.tag_name = '1.1.0'
+    release2.raw_data = {'assets': [{'name': 'asset1'}, {'name': 'asset2'}]}
+    source.get_config.return_value = source.config
+    source.get_releases.return_value = [release1, release2]
+    return source, release1, release2
+
+
+if __name__ == '__main__':
+    unittest.main()
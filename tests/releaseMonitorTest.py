@@ -1,4 +1,5 @@
 import unittest
+from threading import Timer
 from unittest import TestCase, mock
 from unittest.mock import MagicMock
 
@@ -7,7 +8,17 @@ from context_logger import setup_logging
 from github.GitRelease import GitRelease
 from package_downloader import IAssetDownloader, ReleaseConfig
 
-from package_collector import ReleaseMonitor, ReleaseSource, ISourceRegistry, IReleaseSource
+from package_collector import (
+    ReleaseMonitor,
+    ReleaseSource,
+    ISourceRegistry,
+    IReleaseSource,
+    IReleasePoller,
+    IRateLimiter,
+    IPollScheduler,
+    AssetDownloadError,
+    MetricsRegistry,
+)
 
 
 class ReleaseMonitorTest(TestCase):
@@ -73,6 +84,163 @@ class ReleaseMonitorTest(TestCase):
             [mock.call(source1.config, source1.release), mock.call(source3.config, source3.release)]
         )
 
+    def test_downloads_all_release_assets_when_new_releases_found_with_multiple_workers(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source2 = create_source(is_new_release=False)
+        source3 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1, source2, source3])
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600, 3)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        asset_downloader.download.assert_has_calls(
+            [mock.call(source1.config, source1.release), mock.call(source3.config, source3.release)], any_order=True
+        )
+        source2.check_latest_release.assert_called_once()
+
+    def test_interrupts_download_when_stopped_with_multiple_workers(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source2 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1, source2])
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600, 2)
+        release_monitor.start()
+        release_monitor.stop()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        asset_downloader.download.assert_not_called()
+
+    def test_downloads_release_assets_of_changed_sources_when_polling_in_batches(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source2 = create_source(is_new_release=False)
+        source3 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1, source2, source3])
+        release_poller = MagicMock(spec=IReleasePoller)
+        release_poller.get_batches.return_value = [[source1, source2], [source3]]
+        release_poller.poll.side_effect = [[source1], [source3]]
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600, 1, release_poller)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        release_poller.poll.assert_has_calls([mock.call([source1, source2]), mock.call([source3])])
+        asset_downloader.download.assert_has_calls(
+            [mock.call(source1.config, source1.release), mock.call(source3.config, source3.release)]
+        )
+        source1.check_latest_release.assert_not_called()
+
+    def test_paces_release_checks_when_rate_limiter_requests_delay(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1])
+        rate_limiter = MagicMock(spec=IRateLimiter)
+        rate_limiter.acquire.return_value = 0.1
+        rate_limiter.get_stats.return_value = {}
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600, 1, None, rate_limiter)
+        release_monitor.start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        rate_limiter.acquire.assert_called_once_with(source1.config.token)
+        asset_downloader.download.assert_called_once_with(source1.config, source1.release)
+
+    def test_interrupts_pacing_when_stopped(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1])
+        rate_limiter = MagicMock(spec=IRateLimiter)
+        rate_limiter.acquire.return_value = 60
+        rate_limiter.get_stats.return_value = {}
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600, 1, None, rate_limiter)
+        release_monitor.start()
+        Timer(0.1, release_monitor.stop).start()
+
+        # When
+        release_monitor.check_all()
+
+        # Then
+        source1.check_latest_release.assert_not_called()
+        asset_downloader.download.assert_not_called()
+
+    def test_skips_periodic_check_when_previous_cycle_still_running(self):
+        # Given
+        source_registry, asset_downloader, monitor_timer = create_components([])
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600)
+        release_monitor.start()
+        release_monitor._cycle_lock.acquire()
+
+        # When
+        release_monitor._check_all_periodic()
+
+        # Then
+        monitor_timer.restart.assert_called_once()
+        source_registry.get_all.assert_not_called()
+
+    def test_records_cycle_duration_and_overrun_when_cycle_exceeds_interval(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, monitor_timer = create_components([source])
+        metrics = MetricsRegistry()
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 0, metrics=metrics)
+        release_monitor.start()
+
+        # When
+        release_monitor._check_all_periodic()
+
+        # Then
+        result = metrics.render()
+        self.assertIn('package_collector_monitor_cycle_seconds_count 1.0\n', result)
+        self.assertIn('package_collector_monitor_overruns_total 1.0\n', result)
+
+    def test_starts_release_monitoring_with_scheduler_tick_interval(self):
+        # Given
+        source_registry, asset_downloader, monitor_timer = create_components([])
+        poll_scheduler = MagicMock(spec=IPollScheduler)
+        poll_scheduler.get_tick_interval.return_value = 60
+        release_monitor = ReleaseMonitor(
+            source_registry, asset_downloader, monitor_timer, 600, poll_scheduler=poll_scheduler
+        )
+
+        # When
+        release_monitor.start()
+
+        # Then
+        monitor_timer.start.assert_called_once_with(60, release_monitor._check_all_periodic)
+
+    def test_checks_only_due_sources_and_reschedules_them_when_timer_triggers(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source2 = create_source(is_new_release=False)
+        source3 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1, source2, source3])
+        poll_scheduler = MagicMock(spec=IPollScheduler)
+        poll_scheduler.pop_due.return_value = [source1, source2]
+        release_monitor = ReleaseMonitor(
+            source_registry, asset_downloader, monitor_timer, 600, poll_scheduler=poll_scheduler
+        )
+        release_monitor.start()
+
+        # When
+        release_monitor._check_all_periodic()
+
+        # Then
+        poll_scheduler.pop_due.assert_called_once_with([source1, source2, source3])
+        poll_scheduler.reschedule.assert_has_calls([mock.call(source1, True), mock.call(source2, False)])
+        asset_downloader.download.assert_called_once_with(source1.config, source1.release)
+        source3.check_latest_release.assert_not_called()
+
     def test_interrupts_download_when_stopped(self):
         # Given
         source1 = create_source(is_new_release=True)
@@ -100,6 +268,23 @@ class ReleaseMonitorTest(TestCase):
         # Then
         asset_downloader.download.assert_called_once_with(source2.config, source2.release)
 
+    def test_downloads_missed_releases_in_order_and_continues_after_failure(self):
+        # Given
+        source = create_source(is_new_release=True)
+        release1 = MagicMock(spec=GitRelease)
+        release2 = MagicMock(spec=GitRelease)
+        source.get_releases.return_value = [release1, release2]
+        source_registry, asset_downloader, monitor_timer = create_components([source], source)
+        asset_downloader.download.side_effect = [Exception('Download failed'), ['asset1.deb']]
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600)
+
+        # When
+        release_monitor.check('owner1/repo1')
+
+        # Then
+        asset_downloader.download.assert_has_calls([mock.call(source.config, release1),
+                                                    mock.call(source.config, release2)])
+
     def test_handles_error_when_new_release_found_and_fails_to_download_assets(self):
         # Given
         source1 = create_source(is_new_release=False)
@@ -114,6 +299,19 @@ class ReleaseMonitorTest(TestCase):
         # Then
         asset_downloader.download.assert_called_once_with(source2.config, source2.release)
 
+    def test_handles_error_when_new_release_found_and_fails_to_download_some_assets(self):
+        # Given
+        source1 = create_source(is_new_release=True)
+        source_registry, asset_downloader, monitor_timer = create_components([source1], source1)
+        asset_downloader.download.side_effect = AssetDownloadError('Failed', {'asset1': 'Download failed'})
+        release_monitor = ReleaseMonitor(source_registry, asset_downloader, monitor_timer, 600)
+
+        # When
+        release_monitor.check('owner1/repo1')
+
+        # Then
+        asset_downloader.download.assert_called_once_with(source1.config, source1.release)
+
     def test_skips_check_when_no_source_registered_for_package(self):
         # Given
         source1 = create_source(is_new_release=False)
@@ -135,6 +333,7 @@ def create_source(is_new_release=True):
     source.check_latest_release.return_value = is_new_release
     source.get_config.return_value = source.config
     source.get_release.return_value = source.release
+    source.get_releases.return_value = [source.release]
     return source
 
 
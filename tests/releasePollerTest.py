@@ -0,0 +1,156 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from github.Requester import Requester
+from package_downloader import ReleaseConfig
+
+from package_collector import GraphqlReleasePoller, IRequesterProvider, ReleaseSource, ReleaseState, AssetIdentity
+
+
+class GraphqlReleasePollerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_splits_sources_into_batches_by_token(self):
+        # Given
+        sources = [create_source(f'repo{index}', token='token1') for index in range(5)]
+        sources.append(create_source('repo5', token='token2'))
+        requester_provider, requester = create_components()
+        release_poller = GraphqlReleasePoller(requester_provider, 2)
+
+        # When
+        result = release_poller.get_batches(sources)
+
+        # Then
+        self.assertEqual([sources[0:2], sources[2:4], sources[4:5], sources[5:6]], result)
+
+    def test_queries_all_sources_in_one_request(self):
+        # Given
+        source1 = create_source('repo1')
+        source2 = create_source('repo2')
+        requester_provider, requester = create_components({'r0': None, 'r1': None})
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        release_poller.poll([source1, source2])
+
+        # Then
+        requester_provider.get_requester.assert_called_once_with('token')
+        requester.requestJsonAndCheck.assert_called_once()
+        variables = requester.requestJsonAndCheck.call_args.kwargs['input']['variables']
+        self.assertEqual({'owner0': 'owner', 'name0': 'repo1', 'owner1': 'owner', 'name1': 'repo2'}, variables)
+
+    def test_checks_only_changed_sources(self):
+        # Given
+        source1 = create_source('repo1', create_state('1.0.0'))
+        source2 = create_source('repo2', create_state('1.0.0'))
+        source3 = create_source('repo3', create_state('1.0.0'))
+        source4 = create_source('repo4')
+        source5 = create_source('repo5', create_state('1.0.0'))
+        requester_provider, requester = create_components({
+            'r0': create_repository('1.0.0'),
+            'r1': create_repository('1.1.0'),
+            'r2': create_repository('1.0.0', ['asset1', 'asset2', 'asset3']),
+            'r3': create_repository('1.0.0'),
+            'r4': create_repository('1.0.0', size=200),
+        })
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        result = release_poller.poll([source1, source2, source3, source4, source5])
+
+        # Then
+        self.assertEqual([source2, source3, source4, source5], result)
+        source1.check_latest_release.assert_not_called()
+
+    def test_skips_source_when_no_release(self):
+        # Given
+        source1 = create_source('repo1')
+        requester_provider, requester = create_components({'r0': {'latestRelease': None}})
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        result = release_poller.poll([source1])
+
+        # Then
+        self.assertEqual([], result)
+        source1.check_latest_release.assert_not_called()
+
+    def test_falls_back_to_rest_when_repository_not_resolved(self):
+        # Given
+        source1 = create_source('repo1', create_state('1.0.0'))
+        requester_provider, requester = create_components({'r0': None})
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        result = release_poller.poll([source1])
+
+        # Then
+        self.assertEqual([source1], result)
+        source1.check_latest_release.assert_called_once()
+
+    def test_falls_back_to_rest_when_query_fails(self):
+        # Given
+        source1 = create_source('repo1', create_state('1.0.0'))
+        source2 = create_source('repo2', create_state('1.0.0'))
+        source2.check_latest_release.return_value = False
+        requester_provider, requester = create_components()
+        requester.requestJsonAndCheck.side_effect = Exception('Query failed')
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        result = release_poller.poll([source1, source2])
+
+        # Then
+        self.assertEqual([source1], result)
+        source2.check_latest_release.assert_called_once()
+
+    def test_falls_back_to_rest_when_no_token(self):
+        # Given
+        source1 = create_source('repo1', token=None)
+        requester_provider, requester = create_components()
+        release_poller = GraphqlReleasePoller(requester_provider)
+
+        # When
+        result = release_poller.poll([source1])
+
+        # Then
+        self.assertEqual([source1], result)
+        requester.requestJsonAndCheck.assert_not_called()
+
+
+def create_state(tag_name, asset_names=('asset1', 'asset2')):
+    return ReleaseState(tag_name, [AssetIdentity(name, 1, 100, '2024-01-01T00:00:00Z') for name in asset_names])
+
+
+def create_repository(tag_name, asset_names=('asset1', 'asset2'), size=100):
+    nodes = [{'name': name, 'size': size, 'updatedAt': '2024-01-01T00:00:00Z'} for name in asset_names]
+    return {'latestRelease': {'tagName': tag_name, 'releaseAssets': {'nodes': nodes}}}
+
+
+def create_source(repo, state=None, token='token'):
+    source = MagicMock(spec=ReleaseSource)
+    source.get_config.return_value = ReleaseConfig(owner='owner', repo=repo, token=token)
+    source.get_state.return_value = state
+    source.check_latest_release.return_value = True
+    return source
+
+
+def create_components(data=None):
+    requester = MagicMock(spec=Requester)
+    requester.graphql_url = 'https://api.github.com/graphql'
+    requester.requestJsonAndCheck.return_value = ({}, {'data': data or {}})
+    requester_provider = MagicMock(spec=IRequesterProvider)
+    requester_provider.get_requester.return_value = requester
+    return requester_provider, requester
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,26 @@
+import json
+import tempfile
 import unittest
-from unittest import TestCase
+from pathlib import Path
+from unittest import TestCase, mock
 from unittest.mock import MagicMock
 
 from context_logger import setup_logging
-from github import UnknownObjectException
-from github.GitRelease import GitRelease
-from github.GitReleaseAsset import GitReleaseAsset
 from github.Repository import Repository
+from github.Requester import Requester
 from package_downloader import IRepositoryProvider, ReleaseConfig
 
-from package_collector import ReleaseSource
+from package_collector import (
+    ReleaseSource,
+    IRateLimiter,
+    IReleaseStateStore,
+    ReleaseStateStore,
+    ReleaseState,
+    AssetIdentity,
+    MetricsRegistry,
+    ReleaseHistoryConfig,
+    IRequesterProvider,
+)
 
 
 class ReleaseSourceTest(TestCase):
@@ -68,7 +79,7 @@ class ReleaseSourceTest(TestCase):
 
         release_source.check_latest_release()
 
-        repository.get_latest_release.return_value = release2
+        set_latest_release(repository, release2)
 
         # When
         result = release_source.check_latest_release()
@@ -80,13 +91,13 @@ class ReleaseSourceTest(TestCase):
         # Given
         release1 = create_release('1.0.0')
         release2 = create_release('1.1.0')
-        release2.assets = []
+        release2['assets'] = []
         config, repository_provider, repository = create_components(release1)
         release_source = ReleaseSource(config, repository_provider)
 
         release_source.check_latest_release()
 
-        repository.get_latest_release.return_value = release2
+        set_latest_release(repository, release2)
 
         # When
         result = release_source.check_latest_release()
@@ -103,7 +114,7 @@ class ReleaseSourceTest(TestCase):
 
         release_source.check_latest_release()
 
-        repository.get_latest_release.return_value = release2
+        set_latest_release(repository, release2)
 
         # When
         result = release_source.check_latest_release()
@@ -116,16 +127,14 @@ class ReleaseSourceTest(TestCase):
         release1 = create_release('1.1.0')
         release2 = create_release('1.1.0')
 
-        new_asset = MagicMock(spec=GitReleaseAsset)
-        new_asset.name = 'asset3'
-        release2.assets.append(new_asset)
+        release2['assets'].append({'name': 'asset3'})
 
         config, repository_provider, repository = create_components(release1)
         release_source = ReleaseSource(config, repository_provider)
 
         release_source.check_latest_release()
 
-        repository.get_latest_release.return_value = release2
+        set_latest_release(repository, release2)
 
         # When
         result = release_source.check_latest_release()
@@ -133,6 +142,404 @@ class ReleaseSourceTest(TestCase):
         # Then
         self.assertTrue(result)
 
+    def test_sends_conditional_request_with_etag_of_previous_response(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        # When
+        release_source.check_latest_release()
+
+        # Then
+        repository.requester.requestJson.assert_called_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases/latest', headers={'If-None-Match': '"etag1"'}
+        )
+
+    def test_returns_false_and_keeps_release_when_not_modified(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+        previous_release = release_source.get_release()
+
+        repository.requester.requestJson.return_value = (304, {'etag': '"etag1"'}, '')
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        self.assertIs(previous_release, release_source.get_release())
+
+    def test_returns_true_when_new_release_found_in_fetched_response(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        release_source = ReleaseSource(config, repository_provider)
+        body = json.dumps(create_release('1.0.0'))
+
+        # When
+        result = release_source.check_release_response(repository.requester, 200, {'etag': '"etag1"'}, body)
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual('1.0.0', release_source.get_release().tag_name)
+        self.assertEqual({'If-None-Match': '"etag1"'}, release_source.get_conditional_headers())
+        repository_provider.get_repository.assert_not_called()
+
+    def test_returns_true_when_new_release_found_in_release_data(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        release_source = ReleaseSource(config, repository_provider)
+
+        # When
+        result = release_source.check_release_data(create_release('1.0.0'))
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual('1.0.0', release_source.get_release().tag_name)
+        self.assertIs(repository.requester, release_source.get_release().requester)
+        repository.requester.requestJson.assert_not_called()
+
+    def test_returns_true_without_repository_lookup_when_release_data_of_known_repository(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        config.private = False
+        config.token = 'token'
+        requester = MagicMock(spec=Requester)
+        requester_provider = MagicMock(spec=IRequesterProvider)
+        requester_provider.get_requester.return_value = requester
+        release_source = ReleaseSource(config, repository_provider, requester_provider=requester_provider)
+
+        # When
+        result = release_source.check_release_data(create_release('1.0.0'))
+
+        # Then
+        self.assertTrue(result)
+        self.assertIs(requester, release_source.get_release().requester)
+        requester_provider.get_requester.assert_called_once_with('token')
+        repository_provider.get_repository.assert_not_called()
+
+    def test_looks_up_repository_for_release_data_when_not_known_if_private(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        requester_provider = MagicMock(spec=IRequesterProvider)
+        release_source = ReleaseSource(config, repository_provider, requester_provider=requester_provider)
+
+        # When
+        result = release_source.check_release_data(create_release('1.0.0'))
+
+        # Then
+        self.assertTrue(result)
+        self.assertIs(repository.requester, release_source.get_release().requester)
+        self.assertEqual(repository.private, config.private)
+        requester_provider.get_requester.assert_not_called()
+
+    def test_returns_false_when_release_data_matches_collected_release(self):
+        # Given
+        release = create_release('1.0.0', with_identity=True)
+        config, repository_provider, repository = create_components(release)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        # When
+        result = release_source.check_release_data(release)
+
+        # Then
+        self.assertFalse(result)
+
+    def test_checks_latest_release_when_release_data_is_older_than_collected_release(self):
+        # Given
+        release1 = {**create_release('1.0.0'), 'published_at': '2024-01-01T00:00:00Z'}
+        release2 = {**create_release('2.0.0'), 'published_at': '2024-02-01T00:00:00Z'}
+        config, repository_provider, repository = create_components(release2)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+        repository.requester.requestJson.return_value = (304, {'etag': '"etag1"'}, '')
+
+        # When
+        result = release_source.check_release_data(release1)
+
+        # Then
+        self.assertFalse(result)
+        self.assertEqual('2.0.0', release_source.get_state().tag_name)
+        repository.requester.requestJson.assert_called_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases/latest', headers={'If-None-Match': '"etag1"'}
+        )
+
+    def test_checks_latest_release_when_publish_time_of_collected_release_is_unknown(self):
+        # Given
+        release = {**create_release('1.1.0'), 'published_at': '2024-02-01T00:00:00Z'}
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+
+        # When
+        result = release_source.check_release_data(release)
+
+        # Then
+        self.assertTrue(result)
+        repository.requester.requestJson.assert_called_once()
+
+    def test_returns_false_when_unexpected_error_status(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        repository.requester.requestJson.return_value = (500, {}, json.dumps({'message': 'Server error'}))
+        release_source = ReleaseSource(config, repository_provider)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        self.assertIsNone(release_source.get_release())
+
+    def test_records_check_latency_and_api_errors(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        repository.requester.requestJson.return_value = (500, {}, json.dumps({'message': 'Server error'}))
+        metrics = MetricsRegistry()
+        release_source = ReleaseSource(config, repository_provider, metrics=metrics)
+
+        # When
+        release_source.check_latest_release()
+
+        # Then
+        result = metrics.render()
+        self.assertIn('package_collector_release_check_seconds_count{repo="owner1/repo1"} 1.0\n', result)
+        self.assertIn('package_collector_api_requests_total{status="500"} 1.0\n', result)
+        self.assertIn('package_collector_api_errors_total{type="GithubException"} 1.0\n', result)
+
+    def test_updates_rate_limiter_with_response_headers(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        config.token = 'token1'
+        rate_limiter = MagicMock(spec=IRateLimiter)
+        release_source = ReleaseSource(config, repository_provider, rate_limiter)
+
+        # When
+        release_source.check_latest_release()
+
+        # Then
+        rate_limiter.update.assert_called_once_with('token1', {'etag': '"etag1"'})
+
+    def test_returns_false_and_updates_rate_limiter_when_rate_limit_exceeded(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        headers = {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '1000'}
+        body = json.dumps({'message': 'API rate limit exceeded'})
+        repository.requester.requestJson.return_value = (403, headers, body)
+        rate_limiter = MagicMock(spec=IRateLimiter)
+        release_source = ReleaseSource(config, repository_provider, rate_limiter)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        rate_limiter.update.assert_called_with(None, headers)
+
+    def test_returns_false_when_same_release_as_restored_state(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        state_store.load.assert_called_once_with('owner1/repo1')
+        state_store.save.assert_not_called()
+        repository.requester.requestJson.assert_called_once_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases/latest', headers={'If-None-Match': '"etag0"'}
+        )
+
+    def test_returns_true_and_saves_state_when_new_release_after_restored_state_committed(self):
+        # Given
+        release = create_release('1.1.0')
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+
+        # When
+        result = release_source.check_latest_release()
+        release_source.commit_release(release_source.get_release())
+
+        # Then
+        self.assertTrue(result)
+        state = ReleaseState('1.1.0', create_identities('asset1', 'asset2'), '"etag1"')
+        state_store.save.assert_called_once_with('owner1/repo1', state)
+        self.assertEqual(state, release_source.get_state())
+
+    def test_does_not_save_state_before_release_committed(self):
+        # Given
+        release = create_release('1.1.0')
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        state_store.save.assert_not_called()
+
+    def test_retries_release_on_next_check_when_download_failed(self):
+        # Given
+        release = create_release('1.1.0')
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+        release_source.check_latest_release()
+
+        # When
+        release_source.commit_release(release_source.get_release(), ['asset1', 'asset2'])
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        state_store.save.assert_called_once_with('owner1/repo1', ReleaseState('1.1.0', [], '"etag0"'))
+        repository.requester.requestJson.assert_called_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases/latest', headers={'If-None-Match': '"etag0"'}
+        )
+
+    def test_retries_only_failed_assets_when_download_partially_failed(self):
+        # Given
+        release = create_release('1.1.0', with_identity=True)
+        config, repository_provider, repository = create_components(release)
+        release_source = ReleaseSource(config, repository_provider)
+        release_source.check_latest_release()
+
+        # When
+        release_source.commit_release(release_source.get_release(), ['asset2'])
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['asset2'], [asset.name for asset in release_source.get_release().assets])
+
+    def test_retries_failed_assets_when_checked_again_before_download_failed(self):
+        # Given
+        release = create_release('1.1.0', with_identity=True)
+        config, repository_provider, repository = create_components(release)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+        release_source.check_latest_release()
+        checked_release = release_source.get_release()
+        repository.requester.requestJson.return_value = (304, {'etag': '"etag1"'}, '')
+        release_source.check_latest_release()
+
+        # When
+        release_source.commit_release(checked_release, ['asset1'])
+        set_latest_release(repository, release)
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['asset1'], [asset.name for asset in release_source.get_release().assets])
+        self.assertEqual(['asset2'], [asset.name for asset in state_store.save.call_args.args[1].assets])
+        repository.requester.requestJson.assert_called_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases/latest', headers={'If-None-Match': '"etag0"'}
+        )
+
+    def test_collects_release_again_after_restart_when_download_failed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            release = create_release('1.1.0')
+            config, repository_provider, repository = create_components(release)
+            state_store = ReleaseStateStore(Path(temp_dir) / 'state.db')
+            state_store.save('owner1/repo1', ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"'))
+            release_source = ReleaseSource(config, repository_provider, state_store=state_store)
+            release_source.check_latest_release()
+            release_source.commit_release(release_source.get_release(), ['asset1', 'asset2'])
+
+            # When
+            result = ReleaseSource(config, repository_provider, state_store=state_store).check_latest_release()
+
+            # Then
+            self.assertTrue(result)
+
+    def test_returns_true_with_only_changed_assets_when_asset_reuploaded(self):
+        # Given
+        release1 = create_release('1.1.0', with_identity=True)
+        release2 = create_release('1.1.0', with_identity=True)
+        release2['assets'][1].update({'id': 3, 'updated_at': '2024-01-02T00:00:00Z'})
+        config, repository_provider, repository = create_components(release1)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        set_latest_release(repository, release2)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['asset2'], [asset.name for asset in release_source.get_release().assets])
+        self.assertEqual(
+            [
+                AssetIdentity('asset1', 1, 100, '2024-01-01T00:00:00Z'),
+                AssetIdentity('asset2', 3, 100, '2024-01-02T00:00:00Z'),
+            ],
+            release_source.get_state().assets,
+        )
+
+    def test_returns_false_when_same_release_and_same_asset_identities(self):
+        # Given
+        release1 = create_release('1.1.0', with_identity=True)
+        release2 = create_release('1.1.0', with_identity=True)
+        release2['assets'][0]['download_count'] = 10
+        config, repository_provider, repository = create_components(release1)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        set_latest_release(repository, release2, '"etag2"')
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+
+    def test_returns_true_when_asset_digest_changed(self):
+        # Given
+        release1 = create_release('1.1.0', with_identity=True)
+        release1['assets'][0]['digest'] = 'sha256:aaaa'
+        release2 = create_release('1.1.0', with_identity=True)
+        release2['assets'][0]['digest'] = 'sha256:bbbb'
+        config, repository_provider, repository = create_components(release1)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        set_latest_release(repository, release2)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['asset1'], [asset.name for asset in release_source.get_release().assets])
+
     def test_not_updates_config_when_private_flag_is_set(self):
         # Given
         release = create_release('1.0.0')
@@ -179,6 +586,34 @@ class ReleaseSourceTest(TestCase):
         self.assertTrue(config.private)
         repository_provider.get_repository.assert_called_once_with(config)
 
+    def test_uses_prefetched_repository_when_checking_release(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        repository.private = True
+        release_source = ReleaseSource(config, repository_provider)
+
+        # When
+        release_source.prefetch_repository()
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertTrue(config.private)
+        repository_provider.get_repository.assert_called_once_with(config)
+
+    def test_raises_error_when_failed_to_prefetch_repository(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        repository_provider.get_repository.side_effect = Exception('Failed to get repository')
+        release_source = ReleaseSource(config, repository_provider)
+
+        # When
+        self.assertRaises(Exception, release_source.prefetch_repository)
+
+        # Then
+        self.assertIsNone(config.private)
+
     def test_returns_config(self):
         # Given
         release = create_release('1.0.0')
@@ -204,28 +639,323 @@ class ReleaseSourceTest(TestCase):
         result = release_source.get_release()
 
         # Then
-        self.assertEqual(release, result)
+        self.assertEqual('1.0.0', result.tag_name)
+        self.assertEqual(['asset1', 'asset2'], [asset.name for asset in result.assets])
         self.assertTrue(config.private)
 
+    def test_returns_missed_releases_in_order_when_history_enabled(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/*']))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.1.0', '1.2.0'], [release.tag_name for release in release_source.get_releases()])
+        self.assertEqual('1.2.0', release_source.get_release().tag_name)
+        self.assertEqual('1.2.0', release_source.get_state().tag_name)
+        repository.requester.requestJson.assert_called_once_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases', {'per_page': 10, 'page': 1}, {})
+
+    def test_saves_missed_releases_with_previous_validators_when_committed(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/*']))
+        release_source.check_latest_release()
+
+        # When
+        for release in release_source.get_releases():
+            release_source.commit_release(release)
+
+        # Then
+        state_store.save.assert_has_calls([
+            mock.call('owner1/repo1', ReleaseState('1.1.0', create_identities('asset1', 'asset2'), '"etag0"')),
+            mock.call('owner1/repo1', ReleaseState('1.2.0', create_identities('asset1', 'asset2'), '"etag1"')),
+        ])
+
+    def test_keeps_state_on_missed_release_when_its_download_failed(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/*']))
+        release_source.check_latest_release()
+        release1, release2 = release_source.get_releases()
+
+        # When
+        release_source.commit_release(release1, ['asset2'])
+        release_source.commit_release(release2)
+
+        # Then
+        state = ReleaseState('1.1.0', create_identities('asset1'), '"etag0"')
+        state_store.save.assert_called_once_with('owner1/repo1', state)
+        self.assertEqual(state, release_source.get_state())
+        self.assertEqual({'If-None-Match': '"etag0"'}, release_source.get_conditional_headers())
+
+    def test_retries_failed_assets_of_missed_release_before_newer_releases(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/*']))
+        release_source.check_latest_release()
+        release1, release2 = release_source.get_releases()
+        release_source.commit_release(release1, ['asset2'])
+        release_source.commit_release(release2)
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual([('1.1.0', ['asset2']), ('1.2.0', ['asset1', 'asset2'])],
+                         [(release.tag_name, [asset.name for asset in release.assets])
+                          for release in release_source.get_releases()])
+
+    def test_paginates_release_history_until_collected_release(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        set_releases(repository, [[create_release('1.3.0'), create_release('1.2.0')],
+                                  [create_release('1.1.0'), create_release('1.0.0')],
+                                  [create_release('0.9.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1'], page_size=2))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.1.0', '1.2.0', '1.3.0'],
+                         [release.tag_name for release in release_source.get_releases()])
+        self.assertEqual(2, repository.requester.requestJson.call_count)
+
+    def test_stops_paginating_release_history_at_max_pages(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        set_releases(repository, [[create_release('1.3.0')], [create_release('1.2.0')], [create_release('1.1.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1'], page_size=1, max_pages=2))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.2.0', '1.3.0'], [release.tag_name for release in release_source.get_releases()])
+        self.assertEqual(2, repository.requester.requestJson.call_count)
+
+    def test_keeps_validators_when_listing_later_page_of_release_history_fails(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"')
+        set_releases(repository, [[create_release('1.3.0'), create_release('1.2.0')]])
+        request_json = repository.requester.requestJson.side_effect
+        repository.requester.requestJson.side_effect = lambda verb, url, parameters, headers: \
+            (502, {}, '') if parameters['page'] == 2 else request_json(verb, url, parameters, headers)
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1'], page_size=2))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        self.assertEqual({'If-None-Match': '"etag0"'}, release_source.get_conditional_headers())
+
+    def test_stops_listing_release_history_at_release_older_than_collected_one(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.1.0', create_identities('asset1', 'asset2'), None, None,
+                                                     '2024-02-01T00:00:00Z')
+        set_releases(repository, [[{**create_release('1.3.0'), 'published_at': '2024-04-01T00:00:00Z'},
+                                   {**create_release('1.2.0'), 'published_at': '2024-03-01T00:00:00Z'}],
+                                  [{**create_release('1.0.0'), 'published_at': '2024-01-01T00:00:00Z'},
+                                   {**create_release('0.9.0'), 'published_at': '2023-12-01T00:00:00Z'}],
+                                  [{**create_release('0.8.0'), 'published_at': '2023-11-01T00:00:00Z'}]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1'], page_size=2))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.2.0', '1.3.0'], [release.tag_name for release in release_source.get_releases()])
+        self.assertEqual(2, repository.requester.requestJson.call_count)
+
+    def test_returns_only_newest_release_when_history_enabled_and_nothing_collected(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1']))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.2.0'], [release.tag_name for release in release_source.get_releases()])
+
+    def test_skips_drafts_and_prereleases_in_release_history(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        set_releases(repository, [[{**create_release('1.3.0'), 'draft': True},
+                                   {**create_release('1.2.0-rc1'), 'prerelease': True},
+                                   create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1']))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.1.0'], [release.tag_name for release in release_source.get_releases()])
+
+    def test_collects_prereleases_when_enabled(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'))
+        set_releases(repository, [[{**create_release('1.1.0-rc1'), 'prerelease': True}, create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1'], prereleases=True))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.1.0-rc1'], [release.tag_name for release in release_source.get_releases()])
+
+    def test_returns_false_when_release_history_not_modified(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        set_releases(repository, [[create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1']))
+        release_source.check_latest_release()
+        repository.requester.requestJson.side_effect = None
+        repository.requester.requestJson.return_value = (304, {'etag': '"etag1"'}, '')
 
-def create_release(tag_name):
-    release = MagicMock(spec=GitRelease)
-    release.tag_name = tag_name
-    asset1 = MagicMock(spec=GitReleaseAsset)
-    asset1.name = 'asset1'
-    asset2 = MagicMock(spec=GitReleaseAsset)
-    asset2.name = 'asset2'
-    release.assets = [asset1, asset2]
-    return release
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertFalse(result)
+        repository.requester.requestJson.assert_called_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases', {'per_page': 10, 'page': 1},
+            {'If-None-Match': '"etag1"'})
+
+    def test_returns_true_with_changed_assets_of_collected_release_in_history(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1'))
+        set_releases(repository, [[create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1']))
+
+        # When
+        result = release_source.check_latest_release()
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['asset2'], [asset.name for asset in release_source.get_releases()[0].assets])
+
+    def test_lists_release_history_when_new_release_found_in_release_data(self):
+        # Given
+        config, repository_provider, repository = create_components()
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', create_identities('asset1', 'asset2'), '"etag0"', None,
+                                                     '2024-01-01T00:00:00Z')
+        set_releases(repository, [[create_release('1.2.0'), create_release('1.1.0'), create_release('1.0.0')]])
+        release_source = ReleaseSource(config, repository_provider, state_store=state_store,
+                                       history_config=ReleaseHistoryConfig(['owner1/repo1']))
+
+        # When
+        result = release_source.check_release_data({**create_release('1.2.0'), 'published_at': '2024-03-01T00:00:00Z'})
+
+        # Then
+        self.assertTrue(result)
+        self.assertEqual(['1.1.0', '1.2.0'], [release.tag_name for release in release_source.get_releases()])
+        repository.requester.requestJson.assert_called_once_with(
+            'GET', 'https://api.github.com/repos/owner1/repo1/releases', {'per_page': 10, 'page': 1}, {})
+        self.assertEqual({'If-None-Match': '"etag0"'}, release_source.get_conditional_headers())
+
+    def test_returns_latest_release_as_only_release_without_history(self):
+        # Given
+        release = create_release('1.0.0')
+        config, repository_provider, repository = create_components(release)
+        release_source = ReleaseSource(config, repository_provider)
+
+        release_source.check_latest_release()
+
+        # When
+        result = release_source.get_releases()
+
+        # Then
+        self.assertEqual(['1.0.0'], [release.tag_name for release in result])
+
+
+def create_release(tag_name, with_identity=False):
+    assets = [{'name': 'asset1'}, {'name': 'asset2'}]
+    if with_identity:
+        for index, asset in enumerate(assets):
+            asset.update({'id': index + 1, 'size': 100, 'updated_at': '2024-01-01T00:00:00Z'})
+    return {'tag_name': tag_name, 'assets': assets}
+
+
+def create_identities(*names):
+    return [AssetIdentity(name) for name in names]
+
+
+def set_latest_release(repository, latest_release, etag='"etag1"'):
+    if latest_release:
+        repository.requester.requestJson.return_value = (200, {'etag': etag}, json.dumps(latest_release))
+    else:
+        repository.requester.requestJson.return_value = (404, {}, json.dumps({'message': 'Not Found'}))
+
+
+def set_releases(repository, pages, etag='"etag1"'):
+    def request_json(verb, url, parameters, headers):
+        page = parameters['page']
+        return 200, {'etag': etag}, json.dumps(pages[page - 1] if page <= len(pages) else [])
+
+    repository.requester.requestJson.side_effect = request_json
 
 
 def create_components(latest_release=None):
     config = ReleaseConfig(owner='owner1', repo='repo1')
     repository = MagicMock(spec=Repository)
-    if latest_release:
-        repository.get_latest_release.return_value = latest_release
-    else:
-        repository.get_latest_release.side_effect = UnknownObjectException(404, message='No release found')
+    repository.url = 'https://api.github.com/repos/owner1/repo1'
+    repository.requester = MagicMock(spec=Requester)
+    repository.requester.createException.side_effect = Requester.createException
+    set_latest_release(repository, latest_release)
     repository_provider = MagicMock(spec=IRepositoryProvider)
     repository_provider.get_repository.return_value = repository
 
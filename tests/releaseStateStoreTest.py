@@ -0,0 +1,122 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import ReleaseStateStore, ReleaseState, AssetIdentity
+
+
+class ReleaseStateStoreTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / 'state' / 'collector.db'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_returns_none_when_no_state_saved(self):
+        # Given
+        state_store = ReleaseStateStore(self.db_path)
+
+        # When
+        result = state_store.load('owner1/repo1')
+
+        # Then
+        self.assertIsNone(result)
+        state_store.close()
+
+    def test_returns_saved_state(self):
+        # Given
+        state_store = ReleaseStateStore(self.db_path)
+        state = ReleaseState(
+            '1.0.0',
+            [AssetIdentity('asset1', 1, 100, '2024-01-01T00:00:00Z', 'sha256:abcd'), AssetIdentity('asset2', 2, 200)],
+            '"etag1"',
+            'Mon, 01 Jan 2024 00:00:00 GMT',
+            '2024-01-01T00:00:00Z',
+        )
+        state_store.save('owner1/repo1', state)
+
+        # When
+        result = state_store.load('owner1/repo1')
+
+        # Then
+        self.assertEqual(state, result)
+        state_store.close()
+
+    def test_returns_saved_state_after_reopen(self):
+        # Given
+        state_store = ReleaseStateStore(self.db_path)
+        state_store.save('owner1/repo1', ReleaseState('1.0.0', [AssetIdentity('asset1')]))
+        state_store.save('owner1/repo1', ReleaseState('1.1.0', [AssetIdentity('asset1'), AssetIdentity('asset2')]))
+        state_store.close()
+        state_store = ReleaseStateStore(self.db_path)
+
+        # When
+        result = state_store.load('owner1/repo1')
+
+        # Then
+        self.assertEqual(ReleaseState('1.1.0', [AssetIdentity('asset1'), AssetIdentity('asset2')]), result)
+        state_store.close()
+
+    def test_returns_legacy_state_with_asset_names_only(self):
+        # Given
+        state_store = ReleaseStateStore(self.db_path)
+        state_store._connection.execute(
+            'INSERT INTO release_state (repo, tag_name, assets, updated_at) VALUES (?, ?, ?, ?)',
+            ('owner1/repo1', '1.0.0', '["asset1", "asset2"]', 0)
+        )
+
+        # When
+        result = state_store.load('owner1/repo1')
+
+        # Then
+        self.assertEqual(ReleaseState('1.0.0', [AssetIdentity('asset1'), AssetIdentity('asset2')]), result)
+        state_store.close()
+
+    def test_adds_publish_time_to_state_stored_without_it(self):
+        # Given
+        self.db_path.parent.mkdir(parents=True)
+        connection = sqlite3.connect(self.db_path)
+        connection.execute('CREATE TABLE release_state (repo TEXT PRIMARY KEY, tag_name TEXT NOT NULL, '
+                           'assets TEXT NOT NULL, etag TEXT, last_modified TEXT, updated_at REAL NOT NULL)')
+        connection.execute('INSERT INTO release_state (repo, tag_name, assets, etag, updated_at) '
+                           'VALUES (?, ?, ?, ?, ?)', ('owner1/repo1', '1.0.0', '[{"name": "asset1"}]', '"etag1"', 0))
+        connection.commit()
+        connection.close()
+        state_store = ReleaseStateStore(self.db_path)
+
+        # When
+        loaded = state_store.load('owner1/repo1')
+        state_store.save('owner1/repo1', ReleaseState('1.1.0', [AssetIdentity('asset1')], None, None,
+                                                      '2024-01-01T00:00:00Z'))
+
+        # Then
+        self.assertEqual(ReleaseState('1.0.0', [AssetIdentity('asset1')], '"etag1"'), loaded)
+        self.assertEqual('2024-01-01T00:00:00Z', state_store.load('owner1/repo1').published_at)
+        state_store.close()
+
+    def test_deletes_state(self):
+        # Given
+        state_store = ReleaseStateStore(self.db_path)
+        state_store.save('owner1/repo1', ReleaseState('1.0.0', [AssetIdentity('asset1')]))
+
+        # When
+        state_store.delete('owner1/repo1')
+
+        # Then
+        self.assertIsNone(state_store.load('owner1/repo1'))
+        state_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+from github import Github
+from package_downloader import ReleaseConfig
+
+from package_collector import ApiRepositoryProvider, IRequesterProvider
+
+
+class ApiRepositoryProviderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_returns_repository_fetched_with_token_requester(self):
+        # Given
+        requester = Github(base_url='http://localhost:8000').requester
+        requester.requestJsonAndCheck = MagicMock()
+        requester.requestJsonAndCheck.return_value = ({}, {
+            'id': 1, 'full_name': 'owner1/repo1', 'private': True, 'url': 'http://localhost:8000/repos/owner1/repo1'
+        })
+        requester_provider = MagicMock(spec=IRequesterProvider)
+        requester_provider.get_requester.return_value = requester
+        repository_provider = ApiRepositoryProvider(requester_provider)
+
+        # When
+        result = repository_provider.get_repository(ReleaseConfig(owner='owner1', repo='repo1', token='token1'))
+
+        # Then
+        requester_provider.get_requester.assert_called_once_with('token1')
+        requester.requestJsonAndCheck.assert_called_once_with('GET', '/repos/owner1/repo1')
+        self.assertEqual('owner1/repo1', result.full_name)
+        self.assertTrue(result.private)
+        self.assertEqual('http://localhost:8000/repos/owner1/repo1', result.url)
+        self.assertIs(requester, result.requester)
+
+
+if __name__ == '__main__':
+    unittest.main()
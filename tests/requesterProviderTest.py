@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import RequesterProvider
+
+
+class RequesterProviderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+        os.environ['TEST_TOKEN'] = 'test_token'
+
+    def setUp(self):
+        print()
+
+    def test_returns_cached_requester_for_same_token(self):
+        # Given
+        requester_provider = RequesterProvider()
+        requester = requester_provider.get_requester('token1')
+
+        # When
+        result = requester_provider.get_requester('token1')
+
+        # Then
+        self.assertIs(requester, result)
+
+    def test_returns_different_requester_for_different_token(self):
+        # Given
+        requester_provider = RequesterProvider()
+        requester = requester_provider.get_requester('token1')
+
+        # When
+        result = requester_provider.get_requester('token2')
+
+        # Then
+        self.assertIsNot(requester, result)
+
+    def test_resolves_token_from_environment(self):
+        # Given
+        requester_provider = RequesterProvider()
+        requester = requester_provider.get_requester('test_token')
+
+        # When
+        result = requester_provider.get_requester('$TEST_TOKEN')
+
+        # Then
+        self.assertIs(requester, result)
+
+    def test_uses_configured_api_url(self):
+        # Given
+        requester_provider = RequesterProvider('http://localhost:8000')
+
+        # When
+        result = requester_provider.get_requester('token1')
+
+        # Then
+        self.assertEqual('http://localhost:8000/graphql', result.graphql_url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,313 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from context_logger import setup_logging
+
+from package_collector import ResumableFileDownloader, DownloadVerificationError, PackageStore
+
+URL = 'https://github.com/owner1/repo1/releases/download/1.0.0/asset1.deb'
+CONTENT = b'0123456789' * 10
+DIGEST = f'sha256:{hashlib.sha256(CONTENT).hexdigest()}'
+
+
+class ResumableFileDownloaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_downloads_and_verifies_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session, chunk_size=16)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL, 'dist/asset1.deb', {'Accept': 'application/octet-stream'})
+
+            # Then
+            self.assertEqual(Path(temp_dir) / 'dist/asset1.deb', result)
+            self.assertEqual(CONTENT, result.read_bytes())
+            self.assertFalse((Path(temp_dir) / 'dist/asset1.deb.part').exists())
+            session.get.assert_called_once_with(URL, headers={'Accept': 'application/octet-stream'}, stream=True,
+                                                timeout=60)
+
+    def test_downloads_file_without_expected_metadata(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(Path(temp_dir) / 'asset1.deb', result)
+            self.assertEqual(CONTENT, result.read_bytes())
+
+    def test_resumes_partial_download_with_range_request(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb.part').write_bytes(CONTENT[:40])
+            session = create_session(create_response(206, CONTENT[40:]))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            session.get.assert_called_once_with(URL, headers={'Range': 'bytes=40-'}, stream=True, timeout=60)
+
+    def test_restarts_download_when_server_ignores_range(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb.part').write_bytes(CONTENT[:40])
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+
+    def test_completes_download_when_partial_file_is_already_complete(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb.part').write_bytes(CONTENT)
+            session = create_session(create_response(416, b''))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+
+    def test_discards_partial_download_without_expected_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb.part').write_bytes(b'stale')
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            session.get.assert_called_once_with(URL, headers={}, stream=True, timeout=60)
+
+    def test_raises_error_and_removes_partial_file_when_digest_does_not_match(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), f'sha256:{hashlib.sha256(b"other").hexdigest()}')
+
+            # When
+            with self.assertRaises(DownloadVerificationError):
+                downloader.download(URL)
+
+            # Then
+            self.assertFalse((Path(temp_dir) / 'asset1.deb').exists())
+            self.assertFalse((Path(temp_dir) / 'asset1.deb.part').exists())
+
+    def test_raises_error_when_download_is_truncated(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            session = create_session(create_response(200, CONTENT[:50]))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), None)
+
+            # When
+            with self.assertRaises(DownloadVerificationError):
+                downloader.download(URL)
+
+            # Then
+            self.assertFalse((Path(temp_dir) / 'asset1.deb').exists())
+
+    def test_skips_existing_file_with_expected_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb').write_bytes(CONTENT)
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(Path(temp_dir) / 'asset1.deb', result)
+            session.get.assert_not_called()
+
+    def test_downloads_existing_file_again_when_size_differs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb').write_bytes(CONTENT[:10])
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            session.get.assert_called_once()
+
+    def test_downloads_existing_file_again_when_digest_differs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb').write_bytes(b'9876543210' * 10)
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            session.get.assert_called_once()
+
+    def test_downloads_existing_file_again_when_asset_updated_after_it_was_written(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb').write_bytes(b'9876543210' * 10)
+            os.utime(Path(temp_dir) / 'asset1.deb', (0, 0))
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), None, '2024-01-01T00:00:00Z')
+
+            # When
+            result = downloader.download(URL)
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            session.get.assert_called_once()
+
+    def test_skips_existing_file_written_after_asset_was_updated(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            (Path(temp_dir) / 'asset1.deb').write_bytes(CONTENT)
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+            downloader.expect(URL, len(CONTENT), None, '2024-01-01T00:00:00Z')
+
+            # When
+            downloader.download(URL)
+
+            # Then
+            session.get.assert_not_called()
+
+    def test_stores_downloaded_file_and_links_it(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session, package_store=package_store)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+
+            # When
+            result = downloader.download(URL, 'bookworm/asset1.deb')
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            self.assertTrue(result.samefile(package_store.get(DIGEST)))
+
+    def test_links_stored_file_without_downloading_again(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session, package_store=package_store)
+            downloader.expect(URL, len(CONTENT), DIGEST)
+            downloader.download(URL, 'bookworm/asset1.deb')
+
+            # When
+            result = downloader.download(URL, 'trixie/asset1.deb')
+
+            # Then
+            self.assertEqual(CONTENT, result.read_bytes())
+            self.assertTrue(result.samefile(Path(temp_dir) / 'bookworm/asset1.deb'))
+            session.get.assert_called_once()
+
+    def test_links_stored_file_of_asset_without_reported_digest(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session, package_store=package_store)
+            downloader.expect(URL, len(CONTENT), None)
+            downloader.download(URL, 'bookworm/asset1.deb')
+
+            # When
+            result = downloader.download(URL, 'trixie/asset1.deb')
+
+            # Then
+            self.assertTrue(result.samefile(Path(temp_dir) / 'bookworm/asset1.deb'))
+            session.get.assert_called_once()
+
+    def test_downloads_again_after_expected_metadata_forgotten(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            package_store = PackageStore(Path(temp_dir) / '.store')
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session, package_store=package_store)
+            downloader.expect(URL, len(CONTENT), None)
+            downloader.download(URL, 'bookworm/asset1.deb')
+
+            # When
+            downloader.forget(URL)
+            downloader.download(URL, 'trixie/asset1.deb')
+
+            # Then
+            self.assertEqual(2, session.get.call_count)
+            self.assertEqual({}, downloader._expected)
+
+    def test_keeps_no_metadata_of_unexpected_download(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Given
+            session = create_session(create_response(200, CONTENT))
+            downloader = ResumableFileDownloader(Path(temp_dir), session)
+
+            # When
+            downloader.download(URL)
+
+            # Then
+            self.assertEqual({}, downloader._expected)
+
+
+def create_session(response):
+    session = MagicMock()
+    session.get.return_value.__enter__.return_value = response
+    return session
+
+
+def create_response(status_code, content):
+    response = MagicMock()
+    response.status_code = status_code
+    response.iter_content.side_effect = lambda chunk_size: [content[index:index + chunk_size]
+                                                            for index in range(0, len(content), chunk_size)]
+    if status_code >= 400 and status_code != 416:
+        response.raise_for_status.side_effect = Exception(f'HTTP {status_code}')
+    return response
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import get_retry_delay
+
+
+class RetryBackoffTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_increases_retry_delay_exponentially_with_jitter(self):
+        # When
+        delays = [get_retry_delay(attempt, 10, 60) for attempt in range(1, 6)]
+
+        # Then
+        for delay, backoff in zip(delays, [10, 20, 40, 60, 60]):
+            self.assertTrue(backoff / 2 <= delay <= backoff)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest import TestCase
+
+from context_logger import setup_logging
+
+from package_collector import ShardRing, create_shard_ring
+
+REPO_NAMES = [f'owner{index % 10}/repo{index}' for index in range(1000)]
+
+
+class ShardRingTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setup_logging('debian-package-collector', 'DEBUG', warn_on_overwrite=False)
+
+    def setUp(self):
+        print()
+
+    def test_every_repository_is_owned_by_exactly_one_node(self):
+        # Given
+        nodes = ['shard-0', 'shard-1', 'shard-2']
+        shard_rings = [ShardRing(nodes, node) for node in nodes]
+
+        # When
+        owners = [[ring.owns(repo_name) for ring in shard_rings] for repo_name in REPO_NAMES]
+
+        # Then
+        for owned in owners:
+            self.assertEqual(1, owned.count(True))
+
+        for index in range(len(nodes)):
+            self.assertGreater(sum(owned[index] for owned in owners), len(REPO_NAMES) / len(nodes) / 2)
+
+    def test_adding_node_moves_only_its_share_of_repositories(self):
+        # Given
+        shard_ring = ShardRing(['shard-0', 'shard-1', 'shard-2'], 'shard-0')
+        extended_ring = ShardRing(['shard-0', 'shard-1', 'shard-2', 'shard-3'], 'shard-0')
+
+        # When
+        moved = [name for name in REPO_NAMES if shard_ring.get_owner(name) != extended_ring.get_owner(name)]
+
+        # Then
+        self.assertTrue(all(extended_ring.get_owner(name) == 'shard-3' for name in moved))
+        self.assertLess(len(moved), len(REPO_NAMES) / 2)
+
+    def test_ownership_ignores_repository_name_case(self):
+        # Given
+        shard_ring = ShardRing(['shard-0', 'shard-1'], 'shard-0')
+
+        # When
+        result = [shard_ring.get_owner(name.upper()) == shard_ring.get_owner(name) for name in REPO_NAMES]
+
+        # Then
+        self.assertTrue(all(result))
+
+    def test_returns_peer_url_of_other_owner(self):
+        # Given
+        peers = ['http://collector-0:8080/', 'http://collector-1:8080/']
+        shard_ring = ShardRing(peers, peers[0])
+        repo_name = next(name for name in REPO_NAMES if not shard_ring.owns(name))
+
+        # When
+        result = shard_ring.get_peer_url(repo_name)
+
+        # Then
+        self.assertEqual('http://collector-1:8080', result)
+
+    def test_returns_no_peer_url_when_sharded_by_index(self):
+        # Given
+        shard_ring = create_shard_ring(0, 2, [], None)
+        repo_name = next(name for name in REPO_NAMES if not shard_ring.owns(name))
+
+        # When
+        result = shard_ring.get_peer_url(repo_name)
+
+        # Then
+        self.assertIsNone(result)
+
+    def test_returns_no_ring_when_not_sharded(self):
+        # When
+        result = create_shard_ring(0, 1, [], None)
+
+        # Then
+        self.assertIsNone(result)
+
+    def test_raises_error_when_shard_index_out_of_range(self):
+        # When
+        self.assertRaises(ValueError, create_shard_ring, 2, 2, [], None)
+
+        # Then
+        # Exception is raised
+
+    def test_raises_error_when_node_is_not_a_peer(self):
+        # When
+        self.assertRaises(ValueError, create_shard_ring, 0, 1, ['http://collector-0:8080'], 'http://other:8080')
+
+        # Then
+        # Exception is raised
+
+
+if __name__ == '__main__':
+    unittest.main()
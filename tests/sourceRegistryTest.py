@@ -5,7 +5,15 @@ from unittest.mock import MagicMock
 from context_logger import setup_logging
 from package_downloader import ReleaseConfig, IRepositoryProvider
 
-from package_collector import SourceRegistry
+from package_collector import (
+    SourceRegistry,
+    IReleaseStateStore,
+    ReleaseState,
+    AssetIdentity,
+    RegistryChanges,
+    ReleaseHistoryConfig,
+    IRequesterProvider,
+)
 
 
 class SourceRegistryTest(TestCase):
@@ -32,6 +40,32 @@ class SourceRegistryTest(TestCase):
         self.assertEqual(source_registry._release_sources.get('owner1/repo1'), result)
         self.assertEqual('token', result.get_config().token)
 
+    def test_returns_source_following_release_history_when_matching_history_sources(self):
+        # Given
+        repository_provider = MagicMock(spec=IRepositoryProvider)
+        history_config = ReleaseHistoryConfig(['Owner1/*'])
+        source_registry = SourceRegistry(repository_provider, history_config=history_config)
+
+        # When
+        result1 = source_registry.register(ReleaseConfig(owner='owner1', repo='repo1'))
+        result2 = source_registry.register(ReleaseConfig(owner='owner2', repo='repo1'))
+
+        # Then
+        self.assertIs(history_config, result1._history_config)
+        self.assertIsNone(result2._history_config)
+
+    def test_returns_source_using_requester_provider(self):
+        # Given
+        repository_provider = MagicMock(spec=IRepositoryProvider)
+        requester_provider = MagicMock(spec=IRequesterProvider)
+        source_registry = SourceRegistry(repository_provider, requester_provider=requester_provider)
+
+        # When
+        result = source_registry.register(ReleaseConfig(owner='owner1', repo='repo1'))
+
+        # Then
+        self.assertIs(requester_provider, result._requester_provider)
+
     def test_returns_source_when_registered_again(self):
         # Given
         repository_provider = MagicMock(spec=IRepositoryProvider)
@@ -47,6 +81,21 @@ class SourceRegistryTest(TestCase):
         self.assertEqual(source, result)
         self.assertEqual('token1', result.get_config().token)
 
+    def test_returns_source_with_restored_state_when_registered(self):
+        # Given
+        repository_provider = MagicMock(spec=IRepositoryProvider)
+        state_store = MagicMock(spec=IReleaseStateStore)
+        state_store.load.return_value = ReleaseState('1.0.0', [AssetIdentity('asset1')])
+        source_registry = SourceRegistry(repository_provider, state_store=state_store)
+        config = ReleaseConfig(owner='owner1', repo='repo1')
+
+        # When
+        result = source_registry.register(config)
+
+        # Then
+        state_store.load.assert_called_once_with('owner1/repo1')
+        self.assertEqual(ReleaseState('1.0.0', [AssetIdentity('asset1')]), result.get_state())
+
     def test_returns_true_when_source_is_registered(self):
         # Given
         repository_provider = MagicMock(spec=IRepositoryProvider)
@@ -113,6 +162,44 @@ class SourceRegistryTest(TestCase):
         self.assertIn(source1, result)
         self.assertIn(source2, result)
 
+    def test_sync_adds_removes_and_updates_sources(self):
+        # Given
+        repository_provider = MagicMock(spec=IRepositoryProvider)
+        source_registry = SourceRegistry(repository_provider, 'token')
+        source1 = source_registry.register(ReleaseConfig(owner='owner1', repo='repo1'))
+        source_registry.register(ReleaseConfig(owner='owner2', repo='repo2'))
+        source_registry.register(ReleaseConfig(owner='owner3', repo='repo3'))
+
+        configs = [
+            ReleaseConfig(owner='owner1', repo='repo1'),
+            ReleaseConfig(owner='owner3', repo='repo3', matcher='*arm64.deb'),
+            ReleaseConfig(owner='owner4', repo='repo4'),
+        ]
+
+        # When
+        result = source_registry.sync(configs)
+
+        # Then
+        self.assertEqual(RegistryChanges(['owner4/repo4'], ['owner2/repo2'], ['owner3/repo3']), result)
+        self.assertIs(source1, source_registry.get('owner1/repo1'))
+        self.assertFalse(source_registry.is_registered('owner2/repo2'))
+        self.assertEqual('*arm64.deb', source_registry.get('owner3/repo3').get_config().matcher)
+        self.assertEqual('token', source_registry.get('owner4/repo4').get_config().token)
+
+    def test_sync_keeps_source_when_only_resolved_visibility_differs(self):
+        # Given
+        repository_provider = MagicMock(spec=IRepositoryProvider)
+        source_registry = SourceRegistry(repository_provider)
+        source = source_registry.register(ReleaseConfig(owner='owner1', repo='repo1'))
+        source.get_config().private = True
+
+        # When
+        result = source_registry.sync([ReleaseConfig(owner='owner1', repo='repo1')])
+
+        # Then
+        self.assertFalse(result.has_changes())
+        self.assertIs(source, source_registry.get('owner1/repo1'))
+
 
 if __name__ == '__main__':
     unittest.main()
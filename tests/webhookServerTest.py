@@ -3,8 +3,9 @@ import hmac
 import json
 import os
 import unittest
+from threading import Event
 from typing import Any
-from unittest import TestCase
+from unittest import TestCase, mock
 from unittest.mock import MagicMock
 
 from context_logger import setup_logging
@@ -12,7 +13,17 @@ from github.GitRelease import GitRelease
 from package_downloader import ReleaseConfig, IAssetDownloader
 from test_utility import wait_for_assertion
 
-from package_collector import WebhookServer, IReleaseSource, ISourceRegistry, ReleaseSource, WebhookServerConfig
+from package_collector import (
+    WebhookServer,
+    IReleaseSource,
+    ISourceRegistry,
+    ReleaseSource,
+    WebhookServerConfig,
+    IWorkQueue,
+    WorkQueueFullError,
+    MetricsRegistry,
+    IShardRing,
+)
 
 
 class WebhookServerTest(TestCase):
@@ -40,6 +51,17 @@ class WebhookServerTest(TestCase):
 
         self.assertFalse(webhook_server.is_running())
 
+    def test_binds_port_only_when_started(self):
+        # Given
+        source_registry, asset_downloader, config = create_components()
+
+        # When
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            # Then
+            self.assertIsNone(webhook_server._server)
+
+        self.assertFalse(webhook_server.is_running())
+
     def test_returns_403_when_no_signature(self):
         # Given
         source_registry, asset_downloader, config = create_components()
@@ -170,6 +192,90 @@ class WebhookServerTest(TestCase):
 
             # Then
             wait_for_assertion(1, asset_downloader.download.assert_called_once_with, source.config, source.release)
+            source.check_release_data.assert_called_once_with(release['release'])
+            source.check_latest_release.assert_not_called()
+
+        self.assertEqual(200, response.status_code)
+
+    def test_sets_private_flag_from_payload_before_downloading_release(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, config = create_components(source)
+
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+            release['repository']['private'] = True
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': create_signature('secret', release),
+                'X-GitHub-Event': 'release',
+            }
+
+            # When
+            client.post('/webhook', json=release, headers=headers)
+
+            # Then
+            wait_for_assertion(1, asset_downloader.download.assert_called_once_with, source.config, source.release)
+            self.assertTrue(source.config.private)
+
+    def test_returns_200_and_skips_download_when_release_from_payload_already_collected(self):
+        # Given
+        source = create_source(is_new_release=False)
+        source_registry, asset_downloader, config = create_components(source)
+        config.secret = '$TEST_SECRET'
+
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': create_signature('test_secret', release),
+                'X-GitHub-Event': 'release',
+            }
+
+            # When
+            response = client.post('/webhook', json=release, headers=headers)
+
+            # Then
+            wait_for_assertion(1, source.check_release_data.assert_called_once_with, release['release'])
+            asset_downloader.download.assert_not_called()
+            source.check_latest_release.assert_not_called()
+
+        self.assertEqual(200, response.status_code)
+
+    def test_returns_200_and_downloads_asset_from_api_when_prerelease_published(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, config = create_components(source)
+        config.secret = '$TEST_SECRET'
+
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+            release['release']['prerelease'] = True
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': create_signature('test_secret', release),
+                'X-GitHub-Event': 'release',
+            }
+
+            # When
+            response = client.post('/webhook', json=release, headers=headers)
+
+            # Then
+            wait_for_assertion(1, asset_downloader.download.assert_called_once_with, source.config, source.release)
+            source.check_latest_release.assert_called_once()
+            source.check_release_data.assert_not_called()
 
         self.assertEqual(200, response.status_code)
 
@@ -204,6 +310,7 @@ class WebhookServerTest(TestCase):
     def test_returns_200_and_downloads_asset_after_delay_when_no_assets_and_second_request_arrives_with_no_assets(self):
         # Given
         source = create_source()
+        source.check_latest_release.side_effect = [False, True]
         source_registry, asset_downloader, config = create_components(source)
         config.secret = '$TEST_SECRET'
 
@@ -227,13 +334,14 @@ class WebhookServerTest(TestCase):
 
             # Then
             wait_for_assertion(2, asset_downloader.download.assert_called_once_with, source.config, source.release)
-            source.check_latest_release.assert_called_once()
+            self.assertEqual(2, source.check_latest_release.call_count)
 
         self.assertEqual(200, response.status_code)
 
-    def test_returns_200_and_downloads_asset_after_delay_when_no_assets_and_second_request_arrives_with_assets(self):
+    def test_returns_200_and_downloads_asset_from_payload_when_no_assets_and_second_request_arrives_with_assets(self):
         # Given
         source = create_source()
+        source.check_latest_release.return_value = False
         source_registry, asset_downloader, config = create_components(source)
         config.secret = '$TEST_SECRET'
 
@@ -264,11 +372,91 @@ class WebhookServerTest(TestCase):
             response = client.post('/webhook', json=release, headers=headers)
 
             # Then
-            wait_for_assertion(2, asset_downloader.download.assert_called_once_with, source.config, source.release)
-            source.check_latest_release.assert_called_once()
+            wait_for_assertion(1, asset_downloader.download.assert_called_once_with, source.config, source.release)
+            source.check_release_data.assert_called_once_with(release['release'])
 
         self.assertEqual(200, response.status_code)
 
+    def test_returns_200_and_merges_events_of_same_repository_while_queued(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, config = create_components(source)
+        config.secret = '$TEST_SECRET'
+        config.workers = 1
+        blocker = Event()
+        asset_downloader.download.side_effect = lambda *args: blocker.wait(1)
+
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            releases = [create_release() for _ in range(4)]
+
+            for release, action in zip(releases, ['published', 'released', 'edited', 'edited']):
+                release['action'] = action
+
+            client.post('/webhook', json=releases[0], headers=create_headers(releases[0]))
+            wait_for_assertion(1, asset_downloader.download.assert_called_once)
+
+            # When
+            responses = [client.post('/webhook', json=release, headers=create_headers(release)).status_code
+                         for release in releases[1:]]
+
+            # Then
+            stats = webhook_server.get_queue_stats()
+            blocker.set()
+            wait_for_assertion(1, lambda: self.assertEqual(2, asset_downloader.download.call_count))
+
+        self.assertEqual([200, 200, 200], responses)
+        self.assertEqual(1, stats.depth)
+        self.assertEqual(2, stats.merged)
+
+    def test_returns_503_with_retry_after_when_queue_is_full(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, config = create_components(source)
+        config.secret = '$TEST_SECRET'
+        work_queue = MagicMock(spec=IWorkQueue)
+        work_queue.submit.side_effect = WorkQueueFullError('Work queue is full')
+
+        with WebhookServer(source_registry, asset_downloader, config, work_queue) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+
+            # When
+            response = client.post('/webhook', json=release, headers=create_headers(release))
+
+        # Then
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('60', response.headers['Retry-After'])
+        asset_downloader.download.assert_not_called()
+
+    def test_returns_metrics_of_received_events_and_queue(self):
+        # Given
+        source = create_source()
+        source_registry, asset_downloader, config = create_components(source)
+        config.secret = '$TEST_SECRET'
+        metrics = MetricsRegistry()
+
+        with WebhookServer(source_registry, asset_downloader, config, metrics=metrics) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+            client.post('/webhook', json=release, headers=create_headers(release))
+            wait_for_assertion(1, asset_downloader.download.assert_called_once)
+
+            # When
+            response = client.get('/metrics')
+
+        # Then
+        self.assertEqual(200, response.status_code)
+        result = response.get_data(as_text=True)
+        self.assertIn('package_collector_webhook_events_total{action="published"} 1.0\n', result)
+        self.assertIn('package_collector_webhook_queue_jobs{state="pending"} 0.0\n', result)
+
     def test_returns_200_and_downloads_asset_after_retry(self):
         # Given
         source = create_source()
@@ -281,6 +469,7 @@ class WebhookServerTest(TestCase):
 
             client = webhook_server._app.test_client()
             release = create_release()
+            release['release']['assets'] = []
 
             headers = {
                 'Content-Type': 'application/json',
@@ -297,6 +486,40 @@ class WebhookServerTest(TestCase):
 
         self.assertEqual(200, response.status_code)
 
+    def test_returns_200_and_downloads_other_release_while_retry_is_delayed(self):
+        # Given
+        source1 = create_source()
+        source1.check_latest_release.return_value = False
+        source2 = create_source()
+        source2.config = ReleaseConfig(owner='owner1', repo='repo2', matcher='*.deb', token='$TEST_TOKEN')
+        source2.get_config.return_value = source2.config
+        source_registry, asset_downloader, config = create_components(source1)
+        source_registry.get.side_effect = lambda repo_name: source1 if repo_name == 'owner1/repo1' else source2
+        config.secret = '$TEST_SECRET'
+        config.workers = 1
+        config.delay = 60
+
+        with WebhookServer(source_registry, asset_downloader, config) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release1 = create_release()
+            release1['release']['assets'] = []
+            client.post('/webhook', json=release1, headers=create_headers(release1))
+            wait_for_assertion(1, lambda: self.assertEqual(1, webhook_server.get_queue_stats().delayed))
+
+            release2 = create_release()
+            release2['repository']['full_name'] = 'owner1/repo2'
+
+            # When
+            response = client.post('/webhook', json=release2, headers=create_headers(release2))
+
+            # Then
+            wait_for_assertion(1, asset_downloader.download.assert_called_once_with, source2.config, source2.release)
+            source1.check_latest_release.assert_called_once()
+
+        self.assertEqual(200, response.status_code)
+
     def test_returns_200_and_stops_after_retries(self):
         # Given
         source = create_source()
@@ -309,6 +532,7 @@ class WebhookServerTest(TestCase):
 
             client = webhook_server._app.test_client()
             release = create_release()
+            release['release']['assets'] = []
 
             headers = {
                 'Content-Type': 'application/json',
@@ -320,8 +544,8 @@ class WebhookServerTest(TestCase):
             response = client.post('/webhook', json=release, headers=headers)
 
             # Then
+            wait_for_assertion(1, source.check_latest_release.assert_called)
             asset_downloader.download.assert_not_called()
-            source.check_latest_release.assert_called()
 
         self.assertEqual(200, response.status_code)
 
@@ -337,6 +561,7 @@ class WebhookServerTest(TestCase):
 
             client = webhook_server._app.test_client()
             release = create_release()
+            release['release']['assets'] = []
 
             headers = {
                 'Content-Type': 'application/json',
@@ -350,8 +575,8 @@ class WebhookServerTest(TestCase):
             response = client.post('/webhook', json=release, headers=headers)
 
             # Then
+            wait_for_assertion(1, source.check_latest_release.assert_called)
             asset_downloader.download.assert_not_called()
-            source.check_latest_release.assert_called()
 
         self.assertEqual(200, response.status_code)
 
@@ -427,6 +652,103 @@ class WebhookServerTest(TestCase):
         # Then
         self.assertEqual(204, response.status_code)
 
+    def test_returns_204_and_skips_download_when_repo_owned_by_other_shard(self):
+        # Given
+        source_registry, asset_downloader, config = create_components(create_source())
+        shard_ring = MagicMock(spec=IShardRing)
+        shard_ring.owns.return_value = False
+        shard_ring.get_peer_url.return_value = None
+
+        with WebhookServer(source_registry, asset_downloader, config, shard_ring=shard_ring) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': create_signature('secret', release),
+                'X-GitHub-Event': 'release',
+            }
+
+            # When
+            response = client.post('/webhook', json=release, headers=headers)
+
+        # Then
+        self.assertEqual(204, response.status_code)
+        shard_ring.owns.assert_called_once_with('owner1/repo1')
+        source_registry.is_registered.assert_not_called()
+        asset_downloader.download.assert_not_called()
+
+    @mock.patch('package_collector.webhookServer.requests.post')
+    def test_forwards_event_to_owner_shard(self, post):
+        # Given
+        source_registry, asset_downloader, config = create_components(create_source())
+        shard_ring = MagicMock(spec=IShardRing)
+        shard_ring.owns.return_value = False
+        shard_ring.get_peer_url.return_value = 'http://collector-2:8080'
+        post.return_value = MagicMock(status_code=503, headers={'Retry-After': '60'})
+
+        with WebhookServer(source_registry, asset_downloader, config, shard_ring=shard_ring) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+            signature = create_signature('secret', release)
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': signature,
+                'X-GitHub-Event': 'release',
+            }
+
+            # When
+            response = client.post('/webhook', json=release, headers=headers)
+
+        # Then
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('60', response.headers['Retry-After'])
+        post.assert_called_once_with(
+            'http://collector-2:8080/webhook',
+            data=json.dumps(release, sort_keys=True).encode(),
+            headers={
+                'Content-Type': 'application/json',
+                'X-GitHub-Event': 'release',
+                'X-Hub-Signature-256': signature,
+                'X-Package-Collector-Forwarded': 'true',
+            },
+            timeout=5,
+        )
+        asset_downloader.download.assert_not_called()
+
+    @mock.patch('package_collector.webhookServer.requests.post')
+    def test_returns_204_and_does_not_forward_already_forwarded_event(self, post):
+        # Given
+        source_registry, asset_downloader, config = create_components(create_source())
+        shard_ring = MagicMock(spec=IShardRing)
+        shard_ring.owns.return_value = False
+        shard_ring.get_peer_url.return_value = 'http://collector-2:8080'
+
+        with WebhookServer(source_registry, asset_downloader, config, shard_ring=shard_ring) as webhook_server:
+            webhook_server.start()
+
+            client = webhook_server._app.test_client()
+            release = create_release()
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Hub-Signature-256': create_signature('secret', release),
+                'X-GitHub-Event': 'release',
+                'X-Package-Collector-Forwarded': 'true',
+            }
+
+            # When
+            response = client.post('/webhook', json=release, headers=headers)
+
+        # Then
+        self.assertEqual(204, response.status_code)
+        post.assert_not_called()
+
 
 def create_release() -> dict[str, Any]:
     return {
@@ -436,6 +758,14 @@ def create_release() -> dict[str, Any]:
     }
 
 
+def create_headers(release: dict[str, Any]) -> dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'X-Hub-Signature-256': create_signature('test_secret', release),
+        'X-GitHub-Event': 'release',
+    }
+
+
 def create_signature(secret: str, release: dict[str, Any]) -> str:
     mac = hmac.new(secret.encode(), msg=json.dumps(release, sort_keys=True).encode(), digestmod=hashlib.sha256)
     return f'sha256={mac.hexdigest()}'
@@ -446,8 +776,10 @@ def create_source(is_new_release=True):
     source.config = ReleaseConfig(owner='owner1', repo='repo1', matcher='*.deb', token='$TEST_TOKEN')
     source.release = MagicMock(spec=GitRelease)
     source.check_latest_release.return_value = is_new_release
+    source.check_release_data.return_value = is_new_release
     source.get_config.return_value = source.config
     source.get_release.return_value = source.release
+    source.get_releases.return_value = [source.release]
     return source
 
 